@@ -97,10 +97,11 @@ else:
 print("\n6️⃣ 检查全局配置...")
 try:
     from xps_to_pmx import mapping_ui
-    config = mapping_ui._GLOBAL_CONFIG.get('config')
+    config = mapping_ui.get_config()
     if config:
         print(f"   ✅ 全局配置存在")
         print(f"      骨骼映射数: {len(config.bone_mappings)}")
+        print(f"      会话数: {len(mapping_ui._GLOBAL_CONFIG['sessions'])}")
     else:
         print("   ⚠️ 全局配置为空（需要运行 Auto Map Bones）")
 except Exception as e:
@@ -1,8 +1,11 @@
 """
 详细分析两个骨骼的父子关系链
+（骨架先读成 ArmatureSnapshot，之后的分析不再访问 RNA）
 """
 
 import bpy
+import numpy as np
+from xps_to_pmx.mapping.snapshot import ArmatureSnapshot
 
 def get_armature_from_collection(collection_name):
     coll = bpy.data.collections.get(collection_name)
@@ -13,50 +16,38 @@ def get_armature_from_collection(collection_name):
             return obj
     return None
 
-def get_parent_chain(bone):
+def get_parent_chain(snap, bone_name):
     """获取骨骼的完整父链"""
-    chain = []
-    current = bone
-    while current:
-        chain.insert(0, current.name)
-        current = current.parent
-    return chain
+    return snap.chain(bone_name)
 
-def show_spine_hierarchy(armature, root_bone_names):
+def show_spine_hierarchy(snap, root_bone_names):
     """显示脊椎链的完整层次结构"""
-    print(f"\n【{armature.name} - 脊椎层次结构】\n")
-    
+    print(f"\n【{snap.name} - 脊椎层次结构】\n")
+
+    heads = snap.world_heads
+    lengths = np.linalg.norm(snap.world_tails - heads, axis=1)
+    keywords = ["abdomen", "chest", "neck", "head", "upper", "lower",
+                "上", "下", "首", "腰", "身", "頭"]
+
     for root_name in root_bone_names:
-        root = armature.data.bones.get(root_name)
-        if not root:
+        root = snap.index.get(root_name)
+        if root is None:
             print(f"❌ {root_name} 不存在\n")
             continue
         
         # 显示根骨骼
         print(f"📍 {root_name}")
         
-        # 递归显示子骨骼
-        def show_children(bone, indent=1):
-            children = [b for b in armature.data.bones if b.parent == bone]
-            children.sort(key=lambda b: b.head.z, reverse=True)  # 按Z高度排序
-            
-            for child in children:
-                # 只显示脊椎相关的
-                if any(kw in child.name.lower() for kw in 
-                       ["abdomen", "chest", "neck", "head", "upper", "lower", 
-                        "上", "下", "首", "腰", "身", "頭"]):
-                    prefix = "  " * indent + "├─ "
-                    mw = armature.matrix_world
-                    head = (mw @ child.head_local)
-                    length = ((mw @ child.tail_local) - head).length
-                    
-                    # 获取该骨骼的权重顶点数
-                    weight_info = ""
-                    
-                    print(f"{prefix}{child.name:25} [长度:{length:6.3f}]")
-                    show_children(child, indent + 1)
-        
-        show_children(root)
+        # 显式栈代替递归；子骨骼按Z高度从高到低
+        stack = [(root, 0)]
+        while stack:
+            index, indent = stack.pop()
+            if indent:
+                print(f"{'  ' * indent + '├─ '}{snap.names[index]:25} [长度:{lengths[index]:6.3f}]")
+            children = [c for c in snap.children[index]
+                        if any(kw in snap.names[c].lower() for kw in keywords)]  # 只显示脊椎相关的
+            children.sort(key=lambda c: heads[c, 2])
+            stack.extend((c, indent + 1) for c in children)
 
 def analyze_hierarchy_alignment(arm_xps, arm_mmd):
     """分析两个骨骼系统的父子关系对齐"""
@@ -74,11 +65,9 @@ def analyze_hierarchy_alignment(arm_xps, arm_mmd):
     print("-" * 50)
     
     for bone_name in xps_spine:
-        b = arm_xps.data.bones.get(bone_name)
-        if b:
-            parent_name = b.parent.name if b.parent else "无"
-            chain = get_parent_chain(b)
-            depth = len(chain) - 1
+        if bone_name in arm_xps:
+            parent_name = arm_xps.parent_name(bone_name) or "无"
+            depth = int(arm_xps.depth[arm_xps.index[bone_name]])
             print(f"{bone_name:20} | {parent_name:20} | {depth:4}")
     
     print("\n" + "=" * 50)
@@ -87,18 +76,16 @@ def analyze_hierarchy_alignment(arm_xps, arm_mmd):
     print("-" * 50)
     
     for bone_name in mmd_spine:
-        b = arm_mmd.data.bones.get(bone_name)
-        if b:
-            parent_name = b.parent.name if b.parent else "无"
-            chain = get_parent_chain(b)
-            depth = len(chain) - 1
+        if bone_name in arm_mmd:
+            parent_name = arm_mmd.parent_name(bone_name) or "无"
+            depth = int(arm_mmd.depth[arm_mmd.index[bone_name]])
             print(f"{bone_name:20} | {parent_name:20} | {depth:4}")
     
     # 分析链长度
     print("\n【链长度分析】\n")
     
-    xps_chain = get_parent_chain(arm_xps.data.bones.get("head"))
-    mmd_chain = get_parent_chain(arm_mmd.data.bones.get("頭"))
+    xps_chain = get_parent_chain(arm_xps, "head")
+    mmd_chain = get_parent_chain(arm_mmd, "頭")
     
     print(f"XPS 'head' 的完整父链 (深度{len(xps_chain)-1}):")
     print(" → ".join(xps_chain))
@@ -112,12 +99,9 @@ def analyze_hierarchy_alignment(arm_xps, arm_mmd):
     print("-" * 85)
     
     for i, (xps_bone, mmd_bone) in enumerate(zip(xps_spine, mmd_spine)):
-        xps_b = arm_xps.data.bones.get(xps_bone)
-        mmd_b = arm_mmd.data.bones.get(mmd_bone)
-        
-        if xps_b and mmd_b:
-            xps_parent = xps_b.parent.name if xps_b.parent else "无"
-            mmd_parent = mmd_b.parent.name if mmd_b.parent else "无"
+        if xps_bone in arm_xps and mmd_bone in arm_mmd:
+            xps_parent = arm_xps.parent_name(xps_bone) or "无"
+            mmd_parent = arm_mmd.parent_name(mmd_bone) or "无"
             
             match = "✓" if (xps_parent in mmd_parent or mmd_parent in xps_parent) else "✗"
             print(f"{xps_bone:25} | {xps_parent:15} {match} | {mmd_bone:25} | {mmd_parent:15}")
@@ -129,6 +113,10 @@ def main():
     if not arm_xps or not arm_mmd:
         print("❌ 找不到骨架")
         return
+
+    # 各读取一次骨架
+    arm_xps = ArmatureSnapshot.from_armature(arm_xps)
+    arm_mmd = ArmatureSnapshot.from_armature(arm_mmd)
     
     print("=" * 100)
     print("【XPS vs MMD - 骨骼父子关系详细分析】")
@@ -3,20 +3,20 @@
 修复 standard_xps.json 以匹配增强的 BoneMapping 数据结构
 """
 
+import importlib.util
 import json
 from pathlib import Path
 
-def load_mmd_standard():
-    """加载 MMD 标准骨骼库"""
-    mmd_file = Path(r"E:\mywork\Convert-to-MMD\xps_to_pmx\mapping\presets\mmd_standard_skeleton.json")
-    with open(mmd_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+SKELETON_MODULE = Path(__file__).resolve().parent / "xps_to_pmx" / "mapping" / "skeleton.py"
 
-    # 建立快速查询表
-    lookup = {}
-    for mmd_name, bone_def in data.get('bones', {}).items():
-        lookup[mmd_name] = bone_def
-    return lookup
+
+def load_mmd_standard():
+    """加载 MMD 标准骨骼库（与插件共用 mapping/skeleton.py 的缓存结构）"""
+    # 直接按路径加载，避免导入 xps_to_pmx 包时依赖 bpy
+    spec = importlib.util.spec_from_file_location("mmd_skeleton", SKELETON_MODULE)
+    skeleton = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(skeleton)
+    return skeleton.load_mmd_skeleton() or {}
 
 def fix_preset():
     """修复 standard_xps.json"""
@@ -1,6 +1,7 @@
 import bpy
 from mathutils import Vector
 from . import weight_monitor
+from ..shared import modes
 
 
 class OBJECT_OT_split_spine_shoulder(bpy.types.Operator):
@@ -18,8 +19,7 @@ class OBJECT_OT_split_spine_shoulder(bpy.types.Operator):
         # 收集切分前的权重总和用于验证
         pre_weights = self._collect_weights(context, obj, ["上半身2"])
 
-        if context.mode != 'EDIT_ARMATURE':
-            bpy.ops.object.mode_set(mode='EDIT')
+        modes.set_mode('EDIT', obj)
 
         edit_bones = obj.data.edit_bones
         split_count = 0
@@ -127,7 +127,7 @@ class OBJECT_OT_split_spine_shoulder(bpy.types.Operator):
 
             split_count += 1
 
-        bpy.ops.object.mode_set(mode='OBJECT')
+        modes.set_mode('OBJECT', obj)
 
         # 同步顶点组改名（左肩→肩.L 等）
         for scene_obj in context.scene.objects:
@@ -4,10 +4,11 @@ from functools import lru_cache
 
 @lru_cache(maxsize=None)
 def load_bone_presets():
+    """把 mmd_bone_group 编译成 分组→骨骼列表 和 骨骼→分组 两个字典（只执行一次）"""
     from ..bone_map_and_group import mmd_bone_group
-    all_bones = set()
     try:
-        valid_groups = []
+        preset_dict = {}
+        bone_to_group = {}
         for group in mmd_bone_group:
             if not isinstance(group, dict):
                 continue
@@ -15,23 +16,32 @@ def load_bone_presets():
                 continue
             if not isinstance(group['bones'], list):
                 continue
-            valid_groups.append(group)
+            bones = preset_dict.setdefault(group['name'], [])
+            for b in group['bones']:
+                b = b.strip()
+                # 同一骨骼出现在多个分组时以第一个为准
+                if b and b not in bone_to_group:
+                    bone_to_group[b] = group['name']
+                    bones.append(b)
 
-        if not valid_groups:
+        if not preset_dict:
             raise ValueError("bone_map_and_group.py中未找到有效的骨骼分组配置")
-
-        preset_dict = {}
-        for p in valid_groups:
-            if p['name'] not in preset_dict:
-                cleaned_bones = list({b.strip() for b in p['bones'] if b.strip()})
-                preset_dict[p['name']] = cleaned_bones
-        all_bones.update(*(p['bones'] for p in valid_groups))
-        return preset_dict, all_bones
+        return preset_dict, bone_to_group
     except Exception as e:
         print(f"加载骨骼分组配置失败: {str(e)}")
-    return {}, set()
+    return {}, {}
 
-BONE_GROUP_PRESETS, PRESET_BONES = load_bone_presets()
+OTHER_GROUP = 'other'
+
+
+def partition_bones(bone_names):
+    """按预设分组归类骨骼（每根骨骼一次字典查找），未列出的骨骼归入 other；保持预设分组顺序"""
+    group_presets, bone_to_group = load_bone_presets()
+    found = {}
+    for name in bone_names:
+        found.setdefault(bone_to_group.get(name, OTHER_GROUP), []).append(name)
+    order = list(group_presets) + [OTHER_GROUP]
+    return {group: found[group] for group in order if group in found}
 
 class OBJECT_OT_create_bone_group(bpy.types.Operator):
     bl_idname = "object.create_bone_group"
@@ -50,7 +60,7 @@ class OBJECT_OT_create_bone_group(bpy.types.Operator):
             self.report({'ERROR'}, "未选择骨架对象")
             return {'CANCELLED'}
 
-        if self.use_presets and not BONE_GROUP_PRESETS:
+        if self.use_presets and not load_bone_presets()[0]:
             self.report({'ERROR'}, "未找到有效的骨骼分组配置，请检查bone_map_and_group.py文件")
             return {'CANCELLED'}
 
@@ -65,71 +75,39 @@ class OBJECT_OT_create_bone_group(bpy.types.Operator):
     def create_bone_collections(self, obj):
         if not (armature := getattr(obj, 'data', None)):
             return
-        
-        # 预生成骨骼名称字典加速查询
-        bone_dict = {b.name: b for b in armature.bones}
-        
+
         # 批量删除集合操作
         if collections := getattr(armature, 'collections', None):
             # 适配Blender 4.0+的删除方式
             for coll in list(collections):
                 collections.remove(coll)
-        
-        # 使用集合差集优化剩余骨骼计算
-        remaining_bones = set(bone_dict.keys()) - PRESET_BONES
-        print(f'预设应包含骨骼数量: {len(PRESET_BONES)} 实际骨骼数量: {len(bone_dict)} 初始剩余骨骼数量: {len(remaining_bones)}')
-        
-        # 批量创建集合并分配骨骼
-        for group_name, bones in BONE_GROUP_PRESETS.items():
-            if valid_bones := [b for b in bones if b in bone_dict]:
-                coll = armature.collections.new(group_name)
-                for b in valid_bones:
-                    coll.assign(bone_dict[b])
-                remaining_bones -= set(valid_bones)
-            print(f'处理分组【{group_name}】后剩余骨骼数量: {len(remaining_bones)}')
-
-        # 优化other分组处理
-        if remaining_bones:
-            coll = armature.collections.new('other')
-            for b in remaining_bones:
-                coll.assign(bone_dict[b])
+
+        # 一次遍历完成归类，再按分组批量创建集合并分配骨骼
+        members = partition_bones(b.name for b in armature.bones)
+        print(f'预设应包含骨骼数量: {len(PRESET_BONES)} 实际骨骼数量: {len(armature.bones)} '
+              f'未分组骨骼数量: {len(members.get(OTHER_GROUP, ()))}')
+        for group_name, bones in members.items():
+            coll = armature.collections.new(group_name)
+            for b in bones:
+                coll.assign(armature.bones[b])
 
     def create_bone_groups(self, obj):
-        # 使用预生成的骨骼字典
-        bone_dict = {b.name: b for b in obj.data.bones}
-        
+        members = partition_bones(b.name for b in obj.data.bones)
+
         # 批量创建骨骼组
-        groups_to_create = [g for g in BONE_GROUP_PRESETS 
-                          if g not in obj.pose.bone_groups]
-        
+        groups_to_create = [g for g in members if g not in obj.pose.bone_groups]
+
         with bpy.context.temp_override(selected_objects=[obj],
                                       active_object=obj):
             for group_name in groups_to_create:
                 bpy.ops.pose.group_add()
                 obj.pose.bone_groups[-1].name = group_name
-        
+
         # 使用字典加速查找
         group_dict = {g.name: g for g in obj.pose.bone_groups}
-        
+
         # 批量分配骨骼组
-        for group_name, bones in BONE_GROUP_PRESETS.items():
-            if group_name in group_dict:
-                for b in bones:
-                    if pose_bone := obj.pose.bones.get(b):
-                        pose_bone.bone_group = group_dict[group_name]
-        
-        # 优化remaining_bones计算
-        # 获取所有预设分组中的骨骼
-        assigned_bones = set()
-        for group_bones in BONE_GROUP_PRESETS.values():
-            assigned_bones.update(group_bones)
-        
-        # 计算未分配骨骼
-        remaining_bones = set(bone_dict.keys()) - assigned_bones
-        print(f'总骨骼数: {len(bone_dict)} 已分配: {len(assigned_bones)} 未分配: {len(remaining_bones)}')
-        
-        if remaining_bones:
-            other_group = group_dict.get('other') or obj.pose.bone_groups.new(name='other')
-            for b in remaining_bones:
-                if pose_bone := obj.pose.bones.get(b):
-                    pose_bone.bone_group = other_group
+        for group_name, bones in members.items():
+            for b in bones:
+                obj.pose.bones[b].bone_group = group_dict[group_name]
+        print(f'总骨骼数: {len(obj.data.bones)} 未分组: {len(members.get(OTHER_GROUP, ()))}')
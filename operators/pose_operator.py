@@ -1,29 +1,139 @@
 import bpy
 import math
+import numpy as np
 from mathutils import Matrix
 from ..bone_utils import apply_armature_transforms
+from ..shared import modes, skinning, snapshot
+from ..shared.snapshot import ArmatureSnapshot
 
 ARM_BEND_THRESHOLD = 3.0  # 超过此角度（度）认为有弯曲问题
 
+# 方向夹角的叉积长度低于此值视为已对齐（不旋转）
+_ALIGNED_EPS = 1e-6
 
-def _bend_angle(bone_a, bone_b):
-    """计算两根骨骼方向的弯曲角度（0=笔直，正值=有弯曲）"""
-    if not bone_a or not bone_b:
-        return 0.0
-    d_a = (bone_a.tail - bone_a.head).normalized()
-    d_b = (bone_b.tail - bone_b.head).normalized()
-    dot = max(-1.0, min(1.0, d_a.dot(d_b)))
-    return math.degrees(math.acos(dot))  # 0=方向相同=笔直
 
+# ─── 手臂关节分析（NumPy，一次算完所有手臂链） ───────────────────────────────
 
-def _rot_to_align(from_vec, to_vec):
-    """返回将 from_vec 旋转到 to_vec 的 4x4 旋转矩阵，若已对齐返回 None"""
-    axis = from_vec.cross(to_vec)
-    if axis.length < 1e-6:
-        return None
-    axis = axis.normalized()
-    dot = max(-1.0, min(1.0, from_vec.dot(to_vec)))
-    return Matrix.Rotation(math.acos(dot), 4, axis)
+def _arm_chains(scene):
+    """[(side, upper, lower, hand), ...]，未设置的骨骼为空字符串"""
+    return [
+        ("左", getattr(scene, "left_upper_arm_bone", ""),
+               getattr(scene, "left_lower_arm_bone", ""),
+               getattr(scene, "left_hand_bone", "")),
+        ("右", getattr(scene, "right_upper_arm_bone", ""),
+               getattr(scene, "right_lower_arm_bone", ""),
+               getattr(scene, "right_hand_bone", "")),
+    ]
+
+
+def _chain_indices(snap, chains):
+    """(C, 3) 的 上臂/前臂/手 骨骼索引，不存在为 -1"""
+    return np.array([
+        [snap.index.get(name, -1) if name else -1 for name in chain[1:]]
+        for chain in chains
+    ], dtype=np.int64).reshape(-1, 3)
+
+
+def _unit(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def _bend_angles(d_a, d_b):
+    """两组单位方向的夹角（度，0=笔直）"""
+    dots = np.clip(np.einsum('ij,ij->i', d_a, d_b), -1.0, 1.0)
+    return np.degrees(np.arccos(dots))
+
+
+def _rotations_to_align(from_vecs, to_vecs):
+    """
+    把 from_vecs 旋转到 to_vecs 的 (N, 3, 3) 旋转矩阵（Rodrigues），以及是否需要旋转的掩码；
+    已对齐（叉积长度 < _ALIGNED_EPS）的行为单位矩阵
+    """
+    axes = np.cross(from_vecs, to_vecs)
+    sin = np.linalg.norm(axes, axis=1)
+    needed = sin >= _ALIGNED_EPS
+    axes = np.divide(axes, sin[:, None], out=np.zeros_like(axes), where=needed[:, None])
+    cos = np.clip(np.einsum('ij,ij->i', from_vecs, to_vecs), -1.0, 1.0)
+    angle = np.where(needed, np.arccos(cos), 0.0)
+
+    k = np.zeros((len(axes), 3, 3))
+    k[:, 0, 1], k[:, 0, 2] = -axes[:, 2], axes[:, 1]
+    k[:, 1, 0], k[:, 1, 2] = axes[:, 2], -axes[:, 0]
+    k[:, 2, 0], k[:, 2, 1] = -axes[:, 1], axes[:, 0]
+    rot = (np.eye(3) + np.sin(angle)[:, None, None] * k
+           + (1.0 - np.cos(angle))[:, None, None] * (k @ k))
+    return rot, needed
+
+
+def _pivot_transforms(rot, pivots):
+    """绕 pivots 旋转 rot 的 (N, 4, 4) 仿射矩阵"""
+    m = np.tile(np.eye(4), (len(rot), 1, 1))
+    m[:, :3, :3] = rot
+    m[:, :3, 3] = pivots - np.einsum('nij,nj->ni', rot, pivots)
+    return m
+
+
+def arm_bend_angles(snap, chains):
+    """
+    一次算出所有手臂链的弯曲角度。
+    返回 (C, 2) 数组：[:, 0]=肘（上臂-前臂），[:, 1]=腕（前臂-手）；缺骨骼的为 0
+    """
+    idx = _chain_indices(snap, chains)
+    dirs = _unit(snap.tails - snap.heads)
+    d = dirs[idx]  # -1 取到最后一根骨骼，下面用掩码清零
+    angles = np.stack([_bend_angles(d[:, 0], d[:, 1]),
+                       _bend_angles(d[:, 1], d[:, 2])], axis=1)
+    valid = np.stack([(idx[:, 0] >= 0) & (idx[:, 1] >= 0),
+                      (idx[:, 1] >= 0) & (idx[:, 2] >= 0)], axis=1)
+    return np.where(valid, angles, 0.0)
+
+
+def plan_arm_corrections(snap, chains, elbow=True, wrist=True):
+    """
+    把肘、腕修复合成一组骨架空间变换，只需烘焙一次。
+
+    肘：前臂绕自身头部旋转到上臂方向。
+    腕：手先随前臂的修正移动，再绕（移动后的）头部旋转到修正后的前臂方向，
+        即手的变换 = T_腕 @ T_肘。
+
+    返回 (transforms, fixed)：
+      transforms: [(bone_name, 4x4 ndarray)]，父骨骼在前
+      fixed: {"elbow": [side, ...], "wrist": [side, ...]}
+    """
+    idx = _chain_indices(snap, chains)
+    sides = [chain[0] for chain in chains]
+    dirs = _unit(snap.tails - snap.heads)
+    d = dirs[idx]
+    heads = snap.heads[idx]
+
+    has_elbow = elbow & (idx[:, 0] >= 0) & (idx[:, 1] >= 0)
+    has_wrist = wrist & (idx[:, 1] >= 0) & (idx[:, 2] >= 0)
+
+    rot_e, need_e = _rotations_to_align(d[:, 1], d[:, 0])
+    rot_e[~has_elbow] = np.eye(3)
+    need_e &= has_elbow
+    t_elbow = _pivot_transforms(rot_e, heads[:, 1])
+
+    # 手的方向、头部先跟随肘的修正；目标是修正后的前臂方向
+    d_hand = np.einsum('nij,nj->ni', rot_e, d[:, 2])
+    target = np.einsum('nij,nj->ni', rot_e, d[:, 1])
+    hand_pivot = np.einsum('nij,nj->ni', t_elbow[:, :3, :3], heads[:, 2]) + t_elbow[:, :3, 3]
+    rot_w, need_w = _rotations_to_align(d_hand, target)
+    need_w &= has_wrist
+    t_hand = _pivot_transforms(rot_w, hand_pivot) @ t_elbow
+
+    transforms = []
+    for c in np.flatnonzero(need_e):
+        transforms.append((snap.names[idx[c, 1]], t_elbow[c]))
+    for c in np.flatnonzero(need_w):
+        transforms.append((snap.names[idx[c, 2]], t_hand[c]))
+
+    fixed = {
+        "elbow": [sides[c] for c in np.flatnonzero(has_elbow)],
+        "wrist": [sides[c] for c in np.flatnonzero(has_wrist)],
+    }
+    return transforms, fixed
 
 
 class OBJECT_OT_check_arm_straightness(bpy.types.Operator):
@@ -38,39 +148,18 @@ class OBJECT_OT_check_arm_straightness(bpy.types.Operator):
             return {'CANCELLED'}
 
         scene = context.scene
-        left_upper  = getattr(scene, "left_upper_arm_bone",  "")
-        left_lower  = getattr(scene, "left_lower_arm_bone",  "")
-        right_upper = getattr(scene, "right_upper_arm_bone", "")
-        right_lower = getattr(scene, "right_lower_arm_bone", "")
-        left_hand   = getattr(scene, "left_hand_bone",  "")
-        right_hand  = getattr(scene, "right_hand_bone", "")
-
-        if not any([left_upper, left_lower, right_upper, right_lower]):
+        chains = _arm_chains(scene)
+        if not any(upper or lower for _, upper, lower, _ in chains):
             self.report({'ERROR'}, "请先在骨骼映射中设置腕/ひじ骨骼")
             return {'CANCELLED'}
 
-        bpy.ops.object.mode_set(mode='EDIT')
-        eb = obj.data.edit_bones
-
-        elbow_bends = {}
-        wrist_bends = {}
-        for side, upper_name, lower_name, hand_name in [
-            ("左", left_upper, left_lower, left_hand),
-            ("右", right_upper, right_lower, right_hand),
-        ]:
-            upper = eb.get(upper_name)
-            lower = eb.get(lower_name)
-            hand  = eb.get(hand_name) if hand_name else None
-            elbow_bends[side] = _bend_angle(upper, lower)
-            wrist_bends[side] = _bend_angle(lower, hand)
-
-        bpy.ops.object.mode_set(mode='OBJECT')
-
-        left_elbow  = elbow_bends.get("左", 0.0)
-        right_elbow = elbow_bends.get("右", 0.0)
-        left_wrist  = wrist_bends.get("左", 0.0)
-        right_wrist = wrist_bends.get("右", 0.0)
-        has_problem = any(v > ARM_BEND_THRESHOLD for v in [left_elbow, right_elbow, left_wrist, right_wrist])
+        # 离开 Edit Mode 时编辑会写回 data.bones，快照读到的就是最新静置姿态
+        with modes.mode(obj, 'OBJECT'):
+            snap = ArmatureSnapshot.from_armature(obj)
+        bends = arm_bend_angles(snap, chains)
+
+        (left_elbow, left_wrist), (right_elbow, right_wrist) = bends.tolist()
+        has_problem = bool((bends > ARM_BEND_THRESHOLD).any())
 
         scene.arm_check_done        = True
         scene.arm_check_has_problem = has_problem
@@ -88,148 +177,96 @@ class OBJECT_OT_check_arm_straightness(bpy.types.Operator):
         return {'FINISHED'}
 
 
-def _apply_pose_rotations(context, obj, pose_bone_rots):
+def _apply_pose_transforms(context, obj, transforms):
     """
-    在 POSE 模式对指定骨骼施加旋转，然后通过「复制修改器→应用→armature_apply」
-    将姿态烘焙进网格静置姿态。
-    pose_bone_rots: [(bone_name, rot_matrix), ...]  rot_matrix=None 跳过
+    在 POSE 模式按骨架空间变换修改骨骼姿态，用 NumPy 蒙皮把姿态烘焙进网格，
+    再通过 armature_apply 设为新的静置姿态（整组修正只烘焙一次）。
+    transforms: [(bone_name, 4x4 ndarray)]，父骨骼在前
     返回 True/False
     """
-    # 收集可用网格（无 shape keys）
-    meshes = []
-    for mesh_obj in bpy.data.objects:
-        if mesh_obj.type == 'MESH':
-            for mod in mesh_obj.modifiers:
-                if mod.type == 'ARMATURE' and mod.object == obj:
-                    if not mesh_obj.data.shape_keys:
-                        meshes.append(mesh_obj)
-                    break
-
-    temp_mesh = None
-    if not meshes:
-        bpy.ops.mesh.primitive_cube_add(size=0.5)
-        temp_mesh = context.active_object
-        temp_mesh.name = "CTMMD_TEMP_FIX"
-        mod = temp_mesh.modifiers.new(name="Armature", type='ARMATURE')
-        mod.object = obj
-        meshes.append(temp_mesh)
-
-    # 为每个网格添加复制修改器
-    TAG = "_ctmmd_fix_copy"
-    for mesh_obj in meshes:
-        for mod in mesh_obj.modifiers:
-            if mod.type == 'ARMATURE' and mod.object == obj:
-                cp = mesh_obj.modifiers.new(name=mod.name + TAG, type='ARMATURE')
-                cp.object = obj
-                cp.use_vertex_groups  = mod.use_vertex_groups
-                cp.use_bone_envelopes = mod.use_bone_envelopes
-                break
-
-    # POSE 模式施加旋转
-    context.view_layer.objects.active = obj
-    bpy.ops.object.mode_set(mode='POSE')
+    modes.set_mode('POSE', obj)
     bpy.ops.pose.select_all(action='DESELECT')
 
     pb = obj.pose.bones
-    applied = []
-    for bone_name, rot_mat in pose_bone_rots:
-        if rot_mat is None or not bone_name:
-            continue
+    # 先读出所有当前矩阵，再依次写入
+    targets = []
+    for bone_name, transform in transforms:
         b = pb.get(bone_name)
         if b:
-            b.matrix = rot_mat @ b.matrix
-            applied.append(bone_name)
+            targets.append((b, Matrix((transform @ np.array(b.matrix)).tolist())))
 
-    context.view_layer.update()
-
-    if not applied:
-        # 清理复制修改器再退出
-        bpy.ops.object.mode_set(mode='OBJECT')
-        for mesh_obj in meshes:
-            for mod in list(mesh_obj.modifiers):
-                if TAG in mod.name:
-                    mesh_obj.modifiers.remove(mod)
-        if temp_mesh:
-            bpy.data.objects.remove(temp_mesh, do_unlink=True)
+    if not targets:
+        modes.set_mode('OBJECT', obj)
         return False
 
-    # 对每个网格应用复制修改器（烘焙当前姿态变形）
-    try:
-        for mesh_obj in meshes:
-            context.view_layer.objects.active = mesh_obj
-            for mod in list(mesh_obj.modifiers):
-                if mod.type == 'ARMATURE' and mod.object == obj and TAG in mod.name:
-                    bpy.ops.object.modifier_apply(modifier=mod.name)
-                    break
-    except RuntimeError as e:
-        raise e
+    for b, matrix in targets:
+        b.matrix = matrix
+        # 子骨骼的 matrix 相对父骨骼姿态换算，写下一根之前先更新父级
+        context.view_layer.update()
+
+    _bake_pose_and_apply_rest(context, obj)
+    return True
+
+
+def _bake_pose_and_apply_rest(context, obj):
+    """把当前姿态烘焙进所有受该骨架变形的网格，然后应用为静置姿态（需在 POSE 模式调用）"""
+    context.view_layer.update()
+    skinning.bake_pose(obj)
 
-    # 切回骨架，应用当前姿态为新静置姿态
-    context.view_layer.objects.active = obj
-    bpy.ops.object.mode_set(mode='POSE')
     bpy.ops.pose.select_all(action='SELECT')
     bpy.ops.pose.armature_apply()
-    bpy.ops.object.mode_set(mode='OBJECT')
+    # 静置姿态的头尾都变了，缓存快照的有效性键看不出来
+    snapshot.invalidate(obj)
+    modes.set_mode('OBJECT', obj)
 
-    if temp_mesh:
-        bpy.data.objects.remove(temp_mesh, do_unlink=True)
 
-    return True
+_JOINT_LABELS = {"elbow": "肘", "wrist": "腕"}
 
 
-class OBJECT_OT_fix_elbow_straightness(bpy.types.Operator):
-    """将前臂对齐到上臂方向，消除肘关节弯曲，烘焙到静置姿态"""
-    bl_idname = "object.fix_elbow_straightness"
-    bl_label = "0b. 修复肘关节弯曲"
+def _fix_arm_joints(op, context, elbow, wrist):
+    """修复选中的关节（肘/腕/两者），所有修正合并为一次烘焙"""
+    obj = context.active_object
+    if not obj or obj.type != 'ARMATURE':
+        op.report({'ERROR'}, "请选择骨架对象")
+        return {'CANCELLED'}
 
-    def execute(self, context):
-        obj = context.active_object
-        if not obj or obj.type != 'ARMATURE':
-            self.report({'ERROR'}, "请选择骨架对象")
-            return {'CANCELLED'}
+    scene = context.scene
+    label = "+".join(_JOINT_LABELS[j] for j, on in (("elbow", elbow), ("wrist", wrist)) if on)
 
-        scene = context.scene
-        left_upper  = getattr(scene, "left_upper_arm_bone", "")
-        left_lower  = getattr(scene, "left_lower_arm_bone", "")
-        right_upper = getattr(scene, "right_upper_arm_bone", "")
-        right_lower = getattr(scene, "right_lower_arm_bone", "")
-
-        bpy.ops.object.mode_set(mode='EDIT')
-        eb = obj.data.edit_bones
-        rots = []
-        fixed_sides = []
-        for side, upper_name, lower_name in [
-            ("左", left_upper, left_lower),
-            ("右", right_upper, right_lower),
-        ]:
-            upper = eb.get(upper_name)
-            lower = eb.get(lower_name)
-            if not upper or not lower:
-                continue
-            d_upper = (upper.tail - upper.head).normalized()
-            d_lower = (lower.tail - lower.head).normalized()
-            rots.append((lower_name, _rot_to_align(d_lower, d_upper)))
-            fixed_sides.append(side)
-        bpy.ops.object.mode_set(mode='OBJECT')
-
-        if not rots:
-            self.report({'WARNING'}, "未找到上臂/前臂骨骼，请检查骨骼映射")
-            return {'CANCELLED'}
+    modes.set_mode('OBJECT', obj)
+    snap = ArmatureSnapshot.from_armature(obj)
+    transforms, fixed = plan_arm_corrections(snap, _arm_chains(scene), elbow=elbow, wrist=wrist)
 
-        try:
-            ok = _apply_pose_rotations(context, obj, rots)
-        except RuntimeError as e:
-            self.report({'ERROR'}, f"应用修改器失败：{e}")
-            return {'CANCELLED'}
+    if not any(fixed.values()):
+        missing = "上臂/前臂" if elbow else "前臂/手腕"
+        op.report({'WARNING'}, f"未找到{missing}骨骼，请检查骨骼映射")
+        return {'CANCELLED'}
 
-        if not ok:
-            self.report({'INFO'}, "肘关节已笔直，无需修复")
-            return {'FINISHED'}
+    try:
+        ok = _apply_pose_transforms(context, obj, transforms)
+    except RuntimeError as e:
+        op.report({'ERROR'}, f"应用修改器失败：{e}")
+        return {'CANCELLED'}
 
-        scene.arm_check_done = False
-        self.report({'INFO'}, f"已修复 {'/'.join(fixed_sides)} 肘关节弯曲，网格已同步更新")
+    if not ok:
+        op.report({'INFO'}, f"{label}关节已笔直，无需修复")
         return {'FINISHED'}
 
+    scene.arm_check_done = False
+    done = "，".join(f"{'/'.join(sides)} {_JOINT_LABELS[joint]}"
+                    for joint, sides in fixed.items() if sides)
+    op.report({'INFO'}, f"已修复 {done} 关节弯曲，网格已同步更新")
+    return {'FINISHED'}
+
+
+class OBJECT_OT_fix_elbow_straightness(bpy.types.Operator):
+    """将前臂对齐到上臂方向，消除肘关节弯曲，烘焙到静置姿态"""
+    bl_idname = "object.fix_elbow_straightness"
+    bl_label = "0b. 修复肘关节弯曲"
+
+    def execute(self, context):
+        return _fix_arm_joints(self, context, elbow=True, wrist=False)
+
 
 class OBJECT_OT_fix_wrist_straightness(bpy.types.Operator):
     """将手腕对齐到前臂方向，消除腕关节弯曲，烘焙到静置姿态"""
@@ -237,64 +274,19 @@ class OBJECT_OT_fix_wrist_straightness(bpy.types.Operator):
     bl_label = "0c. 修复腕关节弯曲"
 
     def execute(self, context):
-        obj = context.active_object
-        if not obj or obj.type != 'ARMATURE':
-            self.report({'ERROR'}, "请选择骨架对象")
-            return {'CANCELLED'}
-
-        scene = context.scene
-        left_lower  = getattr(scene, "left_lower_arm_bone", "")
-        right_lower = getattr(scene, "right_lower_arm_bone", "")
-        left_hand   = getattr(scene, "left_hand_bone", "")
-        right_hand  = getattr(scene, "right_hand_bone", "")
-
-        bpy.ops.object.mode_set(mode='EDIT')
-        eb = obj.data.edit_bones
-        rots = []
-        fixed_sides = []
-        for side, lower_name, hand_name in [
-            ("左", left_lower, left_hand),
-            ("右", right_lower, right_hand),
-        ]:
-            lower = eb.get(lower_name)
-            hand  = eb.get(hand_name) if hand_name else None
-            if not lower or not hand:
-                continue
-            # 手腕对齐前臂方向（不是上臂，因为肘可能已经先修复）
-            d_lower = (lower.tail - lower.head).normalized()
-            d_hand  = (hand.tail  - hand.head).normalized()
-            rots.append((hand_name, _rot_to_align(d_hand, d_lower)))
-            fixed_sides.append(side)
-        bpy.ops.object.mode_set(mode='OBJECT')
-
-        if not rots:
-            self.report({'WARNING'}, "未找到前臂/手腕骨骼，请检查骨骼映射")
-            return {'CANCELLED'}
-
-        try:
-            ok = _apply_pose_rotations(context, obj, rots)
-        except RuntimeError as e:
-            self.report({'ERROR'}, f"应用修改器失败：{e}")
-            return {'CANCELLED'}
-
-        if not ok:
-            self.report({'INFO'}, "腕关节已笔直，无需修复")
-            return {'FINISHED'}
-
-        scene.arm_check_done = False
-        self.report({'INFO'}, f"已修复 {'/'.join(fixed_sides)} 腕关节弯曲，网格已同步更新")
-        return {'FINISHED'}
+        return _fix_arm_joints(self, context, elbow=False, wrist=True)
 
 
 class OBJECT_OT_fix_arm_straightness(bpy.types.Operator):
-    """一键修复肘+腕关节弯曲（等同于依次执行0b和0c）"""
+    """一键修复肘+腕关节弯曲（肘、腕的修正合并后只烘焙一次）"""
     bl_idname = "object.fix_arm_straightness"
     bl_label = "0b+c 一键修复肘+腕"
 
     def execute(self, context):
-        bpy.ops.object.fix_elbow_straightness()
-        bpy.ops.object.fix_wrist_straightness()
-        return {'FINISHED'}
+        with modes.stage("修复肘+腕"):
+            result = _fix_arm_joints(self, context, elbow=True, wrist=True)
+        print(modes.format_report("修复肘+腕"))
+        return result
 # 新增的T-Pose到A-Pose转换操作符
 class OBJECT_OT_convert_to_apose(bpy.types.Operator):
     """将骨架转换为 A-Pose 并应用为新的静置姿态"""
@@ -322,65 +314,17 @@ class OBJECT_OT_convert_to_apose(bpy.types.Operator):
             self.report({'ERROR'}, "请先在UI中设置要转换的骨骼")
             return {'CANCELLED'}
 
-        # 1. 确保在对象模式
-        bpy.ops.object.mode_set(mode='OBJECT')
-
-        # 2. 找到所有使用这个骨骼的网格对象，并检查形态键
-        meshes_with_armature = []
-        for mesh_obj in bpy.data.objects:
-            if mesh_obj.type == 'MESH':
-                for modifier in mesh_obj.modifiers:
-                    if modifier.type == 'ARMATURE' and modifier.object == obj:
-                        # 检查是否有形态键
-                        if not mesh_obj.data.shape_keys:
-                            meshes_with_armature.append(mesh_obj)
-                        break
-
-        # 检查是否找到可用的网格
-        if not meshes_with_armature:
-            # 创建临时测试网格
-            try:
-                bpy.ops.mesh.primitive_cube_add(size=0.5)
-                temp_mesh = context.active_object
-                temp_mesh.name = "CTMMD_TEMP_MESH"
-                
-                # 添加骨架修改器
-                modifier = temp_mesh.modifiers.new(name="Armature", type='ARMATURE')
-                modifier.object = obj
-                
-                # 添加到可用网格列表
-                meshes_with_armature.append(temp_mesh)
-                
-                # 标记为临时网格
-                temp_mesh["is_temp_mesh"] = True
-                
-            except Exception as e:
-                self.report({'ERROR'}, f"创建临时网格失败：{str(e)}")
-                return {'CANCELLED'}
-
-        # 3. 为每个网格复制骨骼修改器，但保留原始修改器
-        for mesh_obj in meshes_with_armature:
-            for modifier in mesh_obj.modifiers:
-                if modifier.type == 'ARMATURE' and modifier.object == obj:
-                    # 复制修改器
-                    new_modifier = mesh_obj.modifiers.new(name=modifier.name + "_copy", type='ARMATURE')
-                    new_modifier.object = modifier.object
-                    new_modifier.use_vertex_groups = modifier.use_vertex_groups
-                    new_modifier.use_bone_envelopes = modifier.use_bone_envelopes
-                    break
-
-        # 4. 切换到姿态模式设置A-Pose
-        context.view_layer.objects.active = obj
-        bpy.ops.object.mode_set(mode='POSE')
-
-        # 5. 清除所有现有姿态
+        # 1. 切换到姿态模式设置A-Pose（已在姿态模式时不切换）
+        modes.set_mode('POSE', obj)
+
+        # 2. 清除所有现有姿态
         bpy.ops.pose.select_all(action='SELECT')
         bpy.ops.pose.rot_clear()
         bpy.ops.pose.scale_clear()
         bpy.ops.pose.loc_clear()
         bpy.ops.pose.select_all(action='DESELECT')
 
-        # 6. 为骨骼设置A-Pose旋转
+        # 3. 为骨骼设置A-Pose旋转
         pose_bones = obj.pose.bones
         converted_bones = []
 
@@ -404,32 +348,10 @@ class OBJECT_OT_convert_to_apose(bpy.types.Operator):
             self.report({'WARNING'}, "没有找到匹配的骨骼可以转换")
             return {'CANCELLED'}
 
-        # 7. 更新视图以确保姿态已应用
-        context.view_layer.update()
-
-        # 8. 应用第二个修改器（复制的修改器）来调整网格姿态
-        try:
-            for mesh_obj in meshes_with_armature:
-                context.view_layer.objects.active = mesh_obj
-                for modifier in mesh_obj.modifiers:
-                    if modifier.type == 'ARMATURE' and modifier.object == obj and "_copy" in modifier.name:
-                        bpy.ops.object.modifier_apply(modifier=modifier.name)
-                        break
-        except RuntimeError as e:
-            self.report({'ERROR'}, f"应用修改器时出错：{str(e)}")
-            return {'CANCELLED'}
-
-        # 9. 切换回骨骼对象
-        context.view_layer.objects.active = obj
-        bpy.ops.object.mode_set(mode='POSE')
-
-        # 10. 应用当前姿态为新的静置姿态
-        bpy.ops.pose.armature_apply()
-
-        # 11. 清理临时创建的网格
-        for mesh_obj in meshes_with_armature:
-            if mesh_obj.get("is_temp_mesh"):
-                bpy.data.objects.remove(mesh_obj, do_unlink=True)
+        # 4. 把姿态烘焙进网格，并应用为新的静置姿态
+        _bake_pose_and_apply_rest(context, obj)
+        # 和以前一样停在姿态模式，方便继续调整
+        modes.set_mode('POSE', obj)
 
         self.report({'INFO'}, f"已完成A-Pose转换并应用为新的静置姿态")
         return {'FINISHED'}
\ No newline at end of file
@@ -1,5 +1,6 @@
 import bpy
 from mathutils import Vector
+from ..shared import modes
 
 
 class OBJECT_OT_add_twist_bones(bpy.types.Operator):
@@ -13,8 +14,7 @@ class OBJECT_OT_add_twist_bones(bpy.types.Operator):
             self.report({'ERROR'}, "请选择骨架对象")
             return {'CANCELLED'}
 
-        if context.mode != 'EDIT_ARMATURE':
-            bpy.ops.object.mode_set(mode='EDIT')
+        modes.set_mode('EDIT', obj)
 
         edit_bones = obj.data.edit_bones
         created = 0
@@ -108,12 +108,10 @@ class OBJECT_OT_add_twist_bones(bpy.types.Operator):
                                       parent_name=wrist_bone.name, use_deform=False)
                 if b: created += 1
 
-        bpy.ops.object.mode_set(mode='OBJECT')
-
-        # 添加扭转约束（在 pose mode）
-        bpy.ops.object.mode_set(mode='POSE')
+        # 添加扭转约束（在 pose mode，直接从 Edit Mode 切换）
+        modes.set_mode('POSE', obj)
         self._add_twist_constraints(obj)
-        bpy.ops.object.mode_set(mode='OBJECT')
+        modes.set_mode('OBJECT', obj)
 
         self.report({'INFO'}, f"扭转骨骼创建完成，共 {created} 个骨骼")
         return {'FINISHED'}
@@ -0,0 +1,28 @@
+"""
+Helpers shared with the xps_to_pmx addon.
+与 xps_to_pmx 插件共用的辅助模块（内置副本）。
+
+The "Convert to MMD" addon and xps_to_pmx are installed as two separate
+addons, so the root addon cannot import ``..xps_to_pmx``: that relative import
+only works when xps_to_pmx sits inside this folder, runs xps_to_pmx's whole
+``__init__`` (UI panels, mapping system) and, when xps_to_pmx is also enabled
+on its own, loads a second copy of every module with its own caches.
+
+The modules the root operators need are therefore vendored here:
+
+- modes:    shared object-mode manager (skipped / merged ``mode_set`` calls)
+- skinning: NumPy linear-blend skinning used to bake a pose into meshes
+- snapshot: immutable ``ArmatureSnapshot`` and the per-armature snapshot cache
+
+They are copies of ``xps_to_pmx/modes.py``, ``xps_to_pmx/skinning.py`` and
+``xps_to_pmx/mapping/snapshot.py``; the only code difference is the snapshot
+import in ``modes._switch``. Change both copies together.
+
+The snapshot caches of the two addons are separate. Root operators that edit
+bones invalidate this copy; xps_to_pmx drops its own snapshots of armatures
+edited elsewhere from its depsgraph handler (``mapping_ui``).
+"""
+
+from . import modes, skinning, snapshot
+
+__all__ = ['modes', 'skinning', 'snapshot']
@@ -0,0 +1,337 @@
+"""
+Vectorized linear-blend skinning (LBS) for baking a pose into meshes.
+用 NumPy 将当前姿态烘焙进网格（线性混合蒙皮），替代「复制修改器 → 应用」。
+
+The Armature modifier computes, per vertex:
+
+    co' = Σ_j w_j · (M_j · co) / Σ_j w_j      (if Σ w > 0.0001, else co)
+
+where ``M_j`` is bone j's deform matrix (pose @ rest⁻¹), expressed in the mesh's
+object space. This module evaluates that formula for all vertices at once:
+coordinates and bone matrices are read with ``foreach_get``, weights are read
+once into flat (vertex, bone, weight) arrays, and the result is written back
+with a single ``foreach_set``.
+
+Because the blend is linear, each vertex's deformation collapses to one
+affine matrix ``A_i = Σ w_j M_j / Σ w_j``. These per-vertex matrices are built
+once and then applied to the vertex coordinates and to every shape key block
+as a batched (K, N, 3) operation, so morphs stay consistent with the new rest
+pose and the cost grows linearly with the number of keys.
+
+Only vertex-group deformation is reproduced (no envelopes, no preserve volume),
+which is what XPS / MMD rigs use.
+
+Vendored copy of ``xps_to_pmx/skinning.py`` (see ``shared/__init__.py``).
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import bpy
+except ImportError:  # pure math helpers stay usable outside Blender
+    bpy = None
+
+# Same cut-off as Blender's armature_deform
+_MIN_CONTRIB = 0.0001
+
+# Shape key blocks transformed per batch (bounds the (K, N, 3) buffer)
+SHAPE_KEY_CHUNK = 32
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Pure math
+# ─────────────────────────────────────────────────────────────────────────────
+
+def to_mesh_space(matrices: np.ndarray, armature_world: np.ndarray,
+                  mesh_world: np.ndarray) -> np.ndarray:
+    """Convert armature-space deform matrices (B, 4, 4) to a mesh's object space."""
+    premat = np.linalg.inv(armature_world) @ mesh_world
+    postmat = np.linalg.inv(premat)
+    return postmat @ matrices @ premat
+
+
+def blend_matrices(n: int, vert_idx: np.ndarray, bone_idx: np.ndarray,
+                   weights: np.ndarray, matrices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Collapse bone influences into one affine matrix per vertex.
+
+    Args:
+        n: Number of vertices
+        vert_idx: (R,) vertex index of each influence
+        bone_idx: (R,) bone index of each influence (into ``matrices``)
+        weights: (R,) weight of each influence
+        matrices: (B, 4, 4) deform matrices in mesh space
+
+    Returns:
+        (blended, mask): ``blended`` is (M, 3, 4) for the M vertices selected by
+        the boolean (N,) ``mask``; vertices outside the mask are not deformed
+    """
+    contrib = np.bincount(vert_idx, weights=weights, minlength=n)
+    mask = contrib > _MIN_CONTRIB
+
+    weighted = matrices[bone_idx, :3, :].reshape(-1, 12) * weights[:, None]
+    accum = np.empty((n, 12), dtype=np.float64)
+    for k in range(12):
+        accum[:, k] = np.bincount(vert_idx, weights=weighted[:, k], minlength=n)
+
+    blended = (accum[mask] / contrib[mask, None]).reshape(-1, 3, 4)
+    return blended, mask
+
+
+def apply_blended(blended: np.ndarray, co: np.ndarray) -> np.ndarray:
+    """Apply per-vertex affine matrices to (..., M, 3) coordinates.
+
+    A leading axis batches several coordinate sets (e.g. shape key blocks)
+    through the same matrices. The computation runs in ``co``'s dtype.
+    """
+    m = blended.astype(co.dtype, copy=False)
+    # Column-wise multiply-add broadcasts over the batch axis and is several
+    # times faster than einsum for large (K, N, 3) batches
+    out = co[..., 0, None] * m[:, :, 0]
+    out += co[..., 1, None] * m[:, :, 1]
+    out += co[..., 2, None] * m[:, :, 2]
+    out += m[:, :, 3]
+    return out
+
+
+def skin_coordinates(co: np.ndarray, vert_idx: np.ndarray, bone_idx: np.ndarray,
+                     weights: np.ndarray, matrices: np.ndarray) -> np.ndarray:
+    """Apply linear-blend skinning to rest coordinates.
+
+    Args:
+        co: (N, 3) rest coordinates in mesh space, or (K, N, 3) for a batch
+        vert_idx: (R,) vertex index of each influence
+        bone_idx: (R,) bone index of each influence (into ``matrices``)
+        weights: (R,) weight of each influence
+        matrices: (B, 4, 4) deform matrices in mesh space
+
+    Returns:
+        Skinned coordinates, same shape as ``co``; vertices without influence
+        are unchanged
+    """
+    result = co.astype(np.float64, copy=True)
+    if len(vert_idx) == 0:
+        return result
+    blended, mask = blend_matrices(co.shape[-2], vert_idx, bone_idx, weights, matrices)
+    result[..., mask, :] = apply_blended(blended, result[..., mask, :])
+    return result
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Blender data access (bulk)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _read_matrices(collection, attr: str) -> np.ndarray:
+    """Read a 4x4 matrix property of every item with one foreach_get."""
+    buf = np.empty(len(collection) * 16, dtype=np.float32)
+    collection.foreach_get(attr, buf)
+    # RNA matrices are stored column-major
+    return buf.reshape(-1, 4, 4).transpose(0, 2, 1).astype(np.float64)
+
+
+def _matrix_to_numpy(matrix) -> np.ndarray:
+    return np.array([list(row) for row in matrix], dtype=np.float64)
+
+
+def bone_deform_matrices(armature) -> Tuple[List[str], np.ndarray]:
+    """Return (bone names, (B, 4, 4) armature-space deform matrices).
+
+    The deform matrix maps a rest-pose point to its posed position:
+    ``pose_bone.matrix @ bone.matrix_local⁻¹``.
+    """
+    bones = armature.data.bones
+    pose_bones = armature.pose.bones
+    names = [bone.name for bone in bones]
+    rest = _read_matrices(bones, 'matrix_local')
+    # pose.bones and data.bones share order, but look up by name to be safe
+    pose = _read_matrices(pose_bones, 'matrix')
+    pose_names = [pb.name for pb in pose_bones]
+    if pose_names != names:
+        order = {name: i for i, name in enumerate(pose_names)}
+        pose = pose[[order[name] for name in names]]
+    return names, pose @ np.linalg.inv(rest)
+
+
+def read_vertex_weights(mesh_obj, bone_index: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Read all vertex weights that reference a deform bone.
+
+    This is the one per-element loop left in baking. Blender's Python API
+    has no ``foreach_get`` for deform weights: ``MeshVertex.groups`` is a
+    separate collection per vertex, and the dvert layer is not exposed as
+    a mesh attribute. So each (vertex, group) pair is read as a Python
+    tuple and converted with a single ``np.array`` call. The bone lookup
+    and filtering that follow are vectorized.
+
+    Args:
+        mesh_obj: Mesh object
+        bone_index: Deform bone name -> index into the matrix array
+
+    Returns:
+        (vert_idx, bone_idx, weights) flat arrays, one entry per influence
+    """
+    group_to_bone = np.full(max(len(mesh_obj.vertex_groups), 1), -1, dtype=np.int64)
+    for vg in mesh_obj.vertex_groups:
+        idx = bone_index.get(vg.name)
+        if idx is not None:
+            group_to_bone[vg.index] = idx
+
+    influences = [
+        (v.index, g.group, g.weight)
+        for v in mesh_obj.data.vertices
+        for g in v.groups
+    ]
+    if not influences:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float64)
+
+    data = np.array(influences, dtype=np.float64)
+    vert_idx = data[:, 0].astype(np.int64)
+    group_idx = data[:, 1].astype(np.int64)
+    weights = data[:, 2]
+
+    valid = group_idx < len(group_to_bone)
+    bone_idx = np.full(len(group_idx), -1, dtype=np.int64)
+    bone_idx[valid] = group_to_bone[group_idx[valid]]
+    keep = (bone_idx >= 0) & (weights > 0.0)
+    return vert_idx[keep], bone_idx[keep], weights[keep]
+
+
+def read_coordinates(points) -> np.ndarray:
+    """Read ``co`` of a vertex or shape key point collection as (N, 3)."""
+    co = np.empty(len(points) * 3, dtype=np.float32)
+    points.foreach_get('co', co)
+    return co.reshape(-1, 3).astype(np.float64)
+
+
+def write_coordinates(points, co: np.ndarray) -> None:
+    """Write (N, 3) coordinates to a vertex or shape key point collection."""
+    points.foreach_set('co', co.astype(np.float32).ravel())
+
+
+def armature_modifier(mesh_obj, armature):
+    """Return the mesh's Armature modifier driven by ``armature`` (or None)."""
+    for mod in mesh_obj.modifiers:
+        if mod.type == 'ARMATURE' and mod.object == armature:
+            return mod
+    return None
+
+
+def deformed_meshes(armature) -> List:
+    """Return mesh objects deformed by the armature through vertex groups."""
+    meshes = []
+    for obj in bpy.data.objects:
+        if obj.type != 'MESH':
+            continue
+        mod = armature_modifier(obj, armature)
+        if mod is None or not mod.use_vertex_groups:
+            continue
+        meshes.append(obj)
+    return meshes
+
+
+def _bake_shape_keys(key_blocks, blended: np.ndarray, mask: np.ndarray,
+                     chunk_size: int = SHAPE_KEY_CHUNK) -> None:
+    """Transform every shape key block with the same per-vertex matrices.
+
+    Keys are processed in (chunk, N, 3) batches to bound memory use.
+    """
+    n = int(mask.shape[0])
+    blended = blended.astype(np.float32)
+    full = bool(mask.all())
+    for start in range(0, len(key_blocks), chunk_size):
+        blocks = key_blocks[start:start + chunk_size]
+        flat = np.empty((len(blocks), n * 3), dtype=np.float32)
+        for row, block in zip(flat, blocks):
+            block.data.foreach_get('co', row)
+        batch = flat.reshape(len(blocks), n, 3)
+        if full:
+            batch = apply_blended(blended, batch)
+        else:
+            batch[:, mask] = apply_blended(blended, batch[:, mask])
+        for row, block in zip(batch, blocks):
+            block.data.foreach_set('co', row.ravel())
+
+
+def bake_mesh(mesh_obj, armature, names: List[str], matrices: np.ndarray) -> int:
+    """Bake the armature's current pose into one mesh's rest coordinates.
+
+    Args:
+        mesh_obj: Mesh object to deform
+        armature: Armature object driving it
+        names: Bone names (order of ``matrices``)
+        matrices: (B, 4, 4) armature-space deform matrices
+
+    Returns:
+        Number of vertices that moved
+    """
+    deform_names = {bone.name for bone in armature.data.bones if bone.use_deform}
+    bone_index = {name: i for i, name in enumerate(names) if name in deform_names}
+
+    vert_idx, bone_idx, weights = read_vertex_weights(mesh_obj, bone_index)
+    if len(vert_idx) == 0:
+        return 0
+
+    mesh = mesh_obj.data
+    mesh_matrices = to_mesh_space(
+        matrices,
+        _matrix_to_numpy(armature.matrix_world),
+        _matrix_to_numpy(mesh_obj.matrix_world),
+    )
+    blended, mask = blend_matrices(len(mesh.vertices), vert_idx, bone_idx, weights, mesh_matrices)
+
+    co = read_coordinates(mesh.vertices)
+    skinned = co.copy()
+    skinned[mask] = apply_blended(blended, co[mask])
+    moved = int(np.count_nonzero(np.any(np.abs(skinned - co) > 1e-7, axis=1)))
+    if not moved:
+        return 0
+
+    write_coordinates(mesh.vertices, skinned)
+    if mesh.shape_keys:
+        _bake_shape_keys(list(mesh.shape_keys.key_blocks), blended, mask)
+    mesh.update()
+    return moved
+
+
+def bake_pose(armature, meshes: Optional[List] = None) -> Dict[str, int]:
+    """Bake the armature's current pose into all meshes it deforms.
+
+    Call this before ``pose.armature_apply`` so the meshes keep their shape
+    when the pose becomes the new rest pose. The pose must be evaluated
+    (``view_layer.update()``) before calling.
+
+    Linked duplicates share one mesh datablock, so each mesh is baked once,
+    through the first object using it. The other objects are skipped (0 in
+    the result) with a warning: baking them too would deform the shared
+    coordinates twice. Any object using the mesh sees the baked result,
+    including objects not in ``meshes``.
+
+    Args:
+        armature: Armature object
+        meshes: Meshes to bake (defaults to ``deformed_meshes(armature)``)
+
+    Returns:
+        Mesh name -> number of moved vertices
+    """
+    if meshes is None:
+        meshes = deformed_meshes(armature)
+    if not meshes:
+        return {}
+
+    names, matrices = bone_deform_matrices(armature)
+    baked: Dict[str, int] = {}
+    baked_by: Dict[int, str] = {}   # mesh datablock -> object it was baked through
+    for mesh_obj in meshes:
+        key = mesh_obj.data.as_pointer()
+        if key in baked_by:
+            print(f"   ⚠ {mesh_obj.name} 与 {baked_by[key]} 共用网格 {mesh_obj.data.name}，"
+                  f"已烘焙过，跳过")
+            baked[mesh_obj.name] = 0
+            continue
+        baked_by[key] = mesh_obj.name
+        if mesh_obj.data.users > 1:
+            print(f"   ⚠ 网格 {mesh_obj.data.name} 有 {mesh_obj.data.users} 个使用者，"
+                  f"按 {mesh_obj.name} 的变换烘焙")
+        baked[mesh_obj.name] = bake_mesh(mesh_obj, armature, names, matrices)
+    return baked
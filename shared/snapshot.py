@@ -0,0 +1,412 @@
+"""Immutable, bpy-free snapshot of an armature's rest skeleton.
+
+Analysis code (skeleton detection, bone checks, hierarchy comparisons) used to
+walk ``armature.data.bones`` through the RNA API again for every question it
+asked. An ``ArmatureSnapshot`` reads everything once, with bulk
+``foreach_get`` calls where RNA allows it:
+
+- bone names and parent indices (-1 for roots)
+- head / tail positions in armature space (``head_local`` / ``tail_local``)
+- bone rolls (derived from ``matrix_local``, as Blender does)
+- the deform mask (``use_deform``)
+
+and keeps them as read-only NumPy arrays. Snapshots are immutable, hashable by
+their skeleton fingerprint, picklable (safe to send to worker processes) and
+can be built from plain lists for tests or headless scripts.
+
+``snapshot_of`` keeps the last snapshot of each armature object and only
+checks a cheap key (object / data identity, bone count, name, world matrix)
+before reusing it, so UI panels that ask on every redraw do not re-read the
+bones. Edits the key cannot see (renames, moved or re-parented bones) must
+call ``invalidate``: ``modes`` does so on every switch into or out of Edit
+Mode, ``renaming`` after bone renames, and a depsgraph handler for armature
+data updates made by the user.
+
+Usage:
+    snap = snapshot.snapshot_of(armature)     # or ArmatureSnapshot(...)
+    bone = snap.get("左腕")
+    bone.parent.name, bone.head, snap.depth[bone.index]
+
+Vendored copy of ``xps_to_pmx/mapping/snapshot.py`` (see ``shared/__init__.py``).
+"""
+
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Armature objects whose last snapshot is kept
+MAX_CACHED_SNAPSHOTS = 16
+
+# object key -> (validity key, ArmatureSnapshot)
+_SNAPSHOTS: 'OrderedDict[Any, Tuple[tuple, ArmatureSnapshot]]' = OrderedDict()
+
+def _frozen(values, dtype, shape=None) -> np.ndarray:
+    array = np.array(values, dtype=dtype)
+    if shape is not None:
+        array = array.reshape(shape)
+    array.flags.writeable = False
+    return array
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Roll (same convention as Blender's mat3_vec_to_roll)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _align_y_matrices(axes: np.ndarray) -> np.ndarray:
+    """Rotation matrices (N, 3, 3) taking +Y to each normalized axis with zero roll.
+
+    Mirrors Blender's ``vec_roll_to_mat3_normalized`` (roll = 0).
+    """
+    x, y, z = axes[:, 0], axes[:, 1], axes[:, 2]
+    theta = 1.0 + y
+    theta_alt = x * x + z * z
+    # Near -Y the closed form loses precision; Blender switches to a series
+    near = theta <= 6.1e-3
+    theta = np.where(near, theta_alt * 0.5 + theta_alt * theta_alt * 0.125, theta)
+    degenerate = near & (theta_alt <= 2.5e-4 ** 2)
+    theta = np.where(degenerate, 1.0, theta)
+
+    m = np.empty((len(axes), 3, 3))
+    m[:, 0, 0] = 1.0 - x * x / theta
+    m[:, 1, 1] = y
+    m[:, 2, 2] = 1.0 - z * z / theta
+    m[:, 0, 2] = m[:, 2, 0] = -x * z / theta
+    m[:, 1, 0] = -x
+    m[:, 0, 1] = x
+    m[:, 2, 1] = z
+    m[:, 1, 2] = -z
+    if degenerate.any():
+        m[degenerate] = np.diag((-1.0, -1.0, 1.0))
+    return m
+
+
+def rolls_from_matrices(matrices: np.ndarray) -> np.ndarray:
+    """Return bone rolls (radians) from (N, 3, 3) or (N, 4, 4) rest matrices."""
+    rot = np.asarray(matrices, dtype=np.float64)[:, :3, :3]
+    if not len(rot):
+        return np.zeros(0)
+    axes = rot[:, :, 1]
+    axes = axes / np.maximum(np.linalg.norm(axes, axis=1), 1e-12)[:, None]
+    # roll matrix = align⁻¹ @ rot (align is orthonormal, so inverse = transpose)
+    roll_mat = np.matmul(_align_y_matrices(axes).transpose(0, 2, 1), rot)
+    return np.arctan2(roll_mat[:, 0, 2], roll_mat[:, 2, 2])
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Snapshot
+# ─────────────────────────────────────────────────────────────────────────────
+
+class SnapshotBone:
+    """Read-only view of one bone in a snapshot (attribute names follow bpy Bone)."""
+
+    __slots__ = ('_snap', 'index')
+
+    def __init__(self, snap: 'ArmatureSnapshot', index: int):
+        self._snap = snap
+        self.index = index
+
+    @property
+    def name(self) -> str:
+        return self._snap.names[self.index]
+
+    @property
+    def parent(self) -> Optional['SnapshotBone']:
+        parent = int(self._snap.parents[self.index])
+        return SnapshotBone(self._snap, parent) if parent >= 0 else None
+
+    @property
+    def children(self) -> List['SnapshotBone']:
+        return [SnapshotBone(self._snap, i) for i in self._snap.children[self.index]]
+
+    @property
+    def head(self) -> np.ndarray:
+        return self._snap.heads[self.index]
+
+    @property
+    def tail(self) -> np.ndarray:
+        return self._snap.tails[self.index]
+
+    head_local = head
+    tail_local = tail
+
+    @property
+    def roll(self) -> float:
+        return float(self._snap.rolls[self.index])
+
+    @property
+    def use_deform(self) -> bool:
+        return bool(self._snap.deform[self.index])
+
+    @property
+    def length(self) -> float:
+        return float(self._snap.lengths[self.index])
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, SnapshotBone) and other._snap is self._snap
+                and other.index == self.index)
+
+    def __hash__(self) -> int:
+        return hash((id(self._snap), self.index))
+
+    def __repr__(self) -> str:
+        return f"SnapshotBone({self.name!r})"
+
+
+class ArmatureSnapshot:
+    """Frozen copy of an armature's bones.
+
+    Attributes:
+        name: Armature object name
+        names: Bone names (tuple, in armature order)
+        index: Read-only mapping bone name -> index
+        parents: (N,) int32 parent indices, -1 for roots
+        heads: (N, 3) rest heads in armature space
+        tails: (N, 3) rest tails in armature space
+        rolls: (N,) bone rolls in radians
+        deform: (N,) bool deform mask
+        matrix_world: (4, 4) armature object world matrix
+        children: Per bone, tuple of child indices
+        order: (N,) indices with parents before children
+        depth: (N,) distance from the bone's root (roots are 0)
+        lengths: (N,) rest lengths
+    """
+
+    __slots__ = ('name', 'names', 'index', 'parents', 'heads', 'tails', 'rolls', 'deform',
+                 'matrix_world', 'children', 'order', 'depth', 'lengths', '_fingerprint')
+
+    def __init__(self, names: Sequence[str], parents: Sequence[int],
+                 heads, tails, rolls=None, deform=None,
+                 name: str = "", matrix_world=None):
+        count = len(names)
+        parents = _frozen(parents, np.int32)
+        if len(parents) != count:
+            raise ValueError("parents must have one entry per bone")
+
+        children: List[List[int]] = [[] for _ in range(count)]
+        roots = []
+        for i, parent in enumerate(parents.tolist()):
+            if 0 <= parent < count and parent != i:
+                children[parent].append(i)
+            else:
+                roots.append(i)
+
+        # Breadth-first from the roots (iterative, no recursion limit)
+        depth = np.zeros(count, dtype=np.int32)
+        order = list(roots)
+        head = 0
+        while head < len(order):
+            i = order[head]
+            head += 1
+            for child in children[i]:
+                depth[child] = depth[i] + 1
+                order.append(child)
+        if len(order) < count:
+            # Bones on a parent cycle are unreachable from any root
+            seen = set(order)
+            order.extend(i for i in range(count) if i not in seen)
+        depth.flags.writeable = False
+
+        heads = _frozen(heads, np.float64, (count, 3))
+        tails = _frozen(tails, np.float64, (count, 3))
+        set_ = object.__setattr__
+        set_(self, 'name', name)
+        set_(self, 'names', tuple(names))
+        set_(self, 'index', MappingProxyType({bone_name: i for i, bone_name in enumerate(names)}))
+        set_(self, 'parents', parents)
+        set_(self, 'heads', heads)
+        set_(self, 'tails', tails)
+        set_(self, 'rolls', _frozen(np.zeros(count) if rolls is None else rolls, np.float64, (count,)))
+        set_(self, 'deform', _frozen(np.ones(count) if deform is None else deform, bool, (count,)))
+        set_(self, 'matrix_world', _frozen(np.eye(4) if matrix_world is None else matrix_world,
+                                           np.float64, (4, 4)))
+        set_(self, 'children', tuple(tuple(c) for c in children))
+        set_(self, 'order', _frozen(order, np.int32))
+        set_(self, 'depth', depth)
+        set_(self, 'lengths', _frozen(np.linalg.norm(tails - heads, axis=1), np.float64))
+        set_(self, '_fingerprint', None)
+
+    @classmethod
+    def from_armature(cls, armature) -> 'ArmatureSnapshot':
+        """Read an armature object's rest bones with bulk property reads."""
+        bones = armature.data.bones
+        count = len(bones)
+        names = [bone.name for bone in bones]
+        index = {bone_name: i for i, bone_name in enumerate(names)}
+        # Pointer properties cannot be read with foreach_get
+        parents = [index[bone.parent.name] if bone.parent else -1 for bone in bones]
+
+        heads = np.empty(count * 3, dtype=np.float32)
+        tails = np.empty(count * 3, dtype=np.float32)
+        matrices = np.empty(count * 16, dtype=np.float32)
+        deform = np.empty(count, dtype=bool)
+        bones.foreach_get('head_local', heads)
+        bones.foreach_get('tail_local', tails)
+        bones.foreach_get('matrix_local', matrices)
+        bones.foreach_get('use_deform', deform)
+        # RNA matrices are stored column-major
+        matrices = matrices.reshape(-1, 4, 4).transpose(0, 2, 1)
+
+        return cls(
+            names, parents, heads, tails,
+            rolls=rolls_from_matrices(matrices),
+            deform=deform,
+            name=armature.name,
+            matrix_world=[list(row) for row in armature.matrix_world],
+        )
+
+    # ─── Immutability / pickling ─────────────────────────────────────────────
+
+    def __setattr__(self, key, value):
+        raise AttributeError("ArmatureSnapshot is immutable")
+
+    def __reduce__(self):
+        return (ArmatureSnapshot, (self.names, self.parents, self.heads, self.tails,
+                                   self.rolls, self.deform, self.name, self.matrix_world))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ArmatureSnapshot):
+            return NotImplemented
+        return (self.names == other.names
+                and np.array_equal(self.parents, other.parents)
+                and np.array_equal(self.heads, other.heads)
+                and np.array_equal(self.tails, other.tails)
+                and np.array_equal(self.rolls, other.rolls)
+                and np.array_equal(self.deform, other.deform))
+
+    def __hash__(self) -> int:
+        return hash(self.fingerprint)
+
+    # ─── Lookup ──────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[SnapshotBone]:
+        return (SnapshotBone(self, i) for i in range(len(self.names)))
+
+    def __contains__(self, bone_name) -> bool:
+        return bone_name in self.index
+
+    def __getitem__(self, bone_name: str) -> SnapshotBone:
+        return SnapshotBone(self, self.index[bone_name])
+
+    def get(self, bone_name: str, default=None) -> Optional[SnapshotBone]:
+        i = self.index.get(bone_name)
+        return SnapshotBone(self, i) if i is not None else default
+
+    def parent_name(self, bone_name: str) -> Optional[str]:
+        """Return the parent's name (None for roots and unknown bones)."""
+        i = self.index.get(bone_name)
+        if i is None:
+            return None
+        parent = int(self.parents[i])
+        return self.names[parent] if parent >= 0 else None
+
+    @property
+    def roots(self) -> Tuple[str, ...]:
+        return tuple(self.names[i] for i in np.flatnonzero(self.parents < 0))
+
+    @property
+    def max_depth(self) -> int:
+        return int(self.depth.max()) if len(self.depth) else 0
+
+    def chain(self, bone_name: str) -> List[str]:
+        """Return the parent chain from the root down to ``bone_name``."""
+        i = self.index.get(bone_name)
+        chain = []
+        seen = set()
+        while i is not None and i >= 0 and i not in seen:
+            seen.add(i)
+            chain.append(self.names[i])
+            i = int(self.parents[i])
+        chain.reverse()
+        return chain
+
+    def bone_pairs(self) -> Iterator[Tuple[str, Optional[str]]]:
+        """Iterate (bone name, parent name or None) pairs."""
+        names = self.names
+        for bone_name, parent in zip(names, self.parents.tolist()):
+            yield bone_name, names[parent] if parent >= 0 else None
+
+    @property
+    def fingerprint(self) -> str:
+        """Skeleton fingerprint (same as ``session.skeleton_fingerprint``)."""
+        if self._fingerprint is None:
+            from .session import skeleton_fingerprint
+            object.__setattr__(self, '_fingerprint', skeleton_fingerprint(self.bone_pairs()))
+        return self._fingerprint
+
+    # ─── World space ─────────────────────────────────────────────────────────
+
+    def to_world(self, points: np.ndarray) -> np.ndarray:
+        """Transform (N, 3) armature-space points to world space."""
+        mw = self.matrix_world
+        return points @ mw[:3, :3].T + mw[:3, 3]
+
+    @property
+    def world_heads(self) -> np.ndarray:
+        return self.to_world(self.heads)
+
+    @property
+    def world_tails(self) -> np.ndarray:
+        return self.to_world(self.tails)
+
+
+def _id_key(id_block) -> Any:
+    """Session-stable identity of a Blender ID (``session_uid``, else its full name)."""
+    uid = getattr(id_block, 'session_uid', None)
+    return uid if uid is not None else getattr(id_block, 'name_full', id_block.name)
+
+
+def _validity_key(armature) -> tuple:
+    data = armature.data
+    return (_id_key(data), len(data.bones), armature.name,
+            tuple(value for row in armature.matrix_world for value in row))
+
+
+def snapshot_of(source) -> Optional[ArmatureSnapshot]:
+    """Return a snapshot for an armature object (or ``source`` if it already is one).
+
+    The armature's last snapshot is reused while its cheap validity key is
+    unchanged and nobody called ``invalidate``. In Edit Mode the bones are
+    re-read every time (``data.bones`` only catches up on leaving Edit Mode).
+
+    Returns None for anything that is not an armature.
+    """
+    if isinstance(source, ArmatureSnapshot):
+        return source
+    if source is None or getattr(source, 'type', None) != 'ARMATURE':
+        return None
+    if getattr(source, 'mode', 'OBJECT') == 'EDIT':
+        return ArmatureSnapshot.from_armature(source)
+
+    key = _id_key(source)
+    validity = _validity_key(source)
+    cached = _SNAPSHOTS.get(key)
+    if cached is not None and cached[0] == validity:
+        _SNAPSHOTS.move_to_end(key)
+        return cached[1]
+    snap = ArmatureSnapshot.from_armature(source)
+    _SNAPSHOTS[key] = (validity, snap)
+    _SNAPSHOTS.move_to_end(key)
+    while len(_SNAPSHOTS) > MAX_CACHED_SNAPSHOTS:
+        _SNAPSHOTS.popitem(last=False)
+    return snap
+
+
+def invalidate(armature=None) -> None:
+    """Forget the cached snapshot of ``armature`` (an object or its armature data).
+
+    With no argument every cached snapshot is dropped.
+    """
+    if armature is None:
+        _SNAPSHOTS.clear()
+        return
+    key = _id_key(armature)
+    if _SNAPSHOTS.pop(key, None) is None:
+        # Armature data: drop every object using it
+        for object_key, (validity, _snap) in list(_SNAPSHOTS.items()):
+            if validity[0] == key:
+                del _SNAPSHOTS[object_key]
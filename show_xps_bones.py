@@ -1,8 +1,11 @@
 """
 显示XPS原始模型的所有骨骼和目标模型的脊椎链结构对比
+（骨架先读成 ArmatureSnapshot，之后的分析不再访问 RNA）
 """
 
 import bpy
+import numpy as np
+from xps_to_pmx.mapping.snapshot import ArmatureSnapshot
 
 def get_armature_from_collection(collection_name):
     """从指定Collection中获取骨架"""
@@ -16,31 +19,36 @@ def get_armature_from_collection(collection_name):
     return None
 
 
-def show_bone_hierarchy(armature, indent=0, parent=None):
-    """递归显示骨骼层次结构"""
+def world_lengths(snap):
+    """所有骨骼的世界空间长度"""
+    return np.linalg.norm(snap.world_tails - snap.world_heads, axis=1)
+
+
+def show_bone_hierarchy(snap):
+    """显示骨骼层次结构（深度优先，显式栈）"""
+    lengths = world_lengths(snap)
     lines = []
-    for bone in armature.data.bones:
-        if bone.parent == parent:
-            prefix = "  " * indent + "├─ " if indent > 0 else ""
-            mw = armature.matrix_world
-            head = (mw @ bone.head_local)
-            length = ((mw @ bone.tail_local) - head).length
-            deform = "✓" if bone.use_deform else "✗"
-            lines.append(f"{prefix}{bone.name:30} {deform} 长度:{length:6.3f}")
-            lines.extend(show_bone_hierarchy(armature, indent + 1, bone))
+    roots = [i for i in range(len(snap)) if snap.parents[i] < 0]
+    stack = [(i, 0) for i in reversed(roots)]
+    while stack:
+        index, indent = stack.pop()
+        prefix = "  " * indent + "├─ " if indent > 0 else ""
+        deform = "✓" if snap.deform[index] else "✗"
+        lines.append(f"{prefix}{snap.names[index]:30} {deform} 长度:{lengths[index]:6.3f}")
+        stack.extend((c, indent + 1) for c in reversed(snap.children[index]))
     return lines
 
 
-def find_spine_bones(armature):
-    """找出脊椎相关的骨骼"""
+def find_spine_bones(snap):
+    """找出脊椎相关的骨骼（返回索引）"""
     spine_keywords = ["spine", "upper", "middle", "lower", "neck", "head", "センター", "グルーブ", "腰", "上半身", "首", "頭"]
-    
-    spine_bones = []
-    for bone in armature.data.bones:
-        if any(kw.lower() in bone.name.lower() for kw in spine_keywords):
-            spine_bones.append(bone)
-    
-    return sorted(spine_bones, key=lambda b: (b.head_local.z, b.name), reverse=True)
+    spine_keywords = [kw.lower() for kw in spine_keywords]
+
+    spine_bones = [
+        i for i, name in enumerate(snap.names)
+        if any(kw in name.lower() for kw in spine_keywords)
+    ]
+    return sorted(spine_bones, key=lambda i: (snap.heads[i, 2], snap.names[i]), reverse=True)
 
 
 def main():
@@ -54,27 +62,28 @@ def main():
     if not arm_xps:
         print("❌ Collection 中找不到骨架")
         return
+
+    snap = ArmatureSnapshot.from_armature(arm_xps)
     
-    print(f"\n骨架名: {arm_xps.name}")
-    print(f"总骨骼数: {len(arm_xps.data.bones)}\n")
+    print(f"\n骨架名: {snap.name}")
+    print(f"总骨骼数: {len(snap)}\n")
     
     # 显示脊椎相关骨骼
     print("【脊椎相关骨骼（按Z高度从高到低）】\n")
-    spine_bones = find_spine_bones(arm_xps)
+    spine_bones = find_spine_bones(snap)
     
-    mw = arm_xps.matrix_world
-    for bone in spine_bones:
-        head = (mw @ bone.head_local)
-        tail = (mw @ bone.tail_local)
-        length = (tail - head).length
-        parent_name = bone.parent.name if bone.parent else "无"
-        deform = "✓变形" if bone.use_deform else "✗非变形"
+    heads = snap.world_heads
+    lengths = world_lengths(snap)
+    for i in spine_bones:
+        name = snap.names[i]
+        parent_name = snap.parent_name(name) or "无"
+        deform = "✓变形" if snap.deform[i] else "✗非变形"
         
-        print(f"{bone.name:25} | 父级:{parent_name:25} | 长度:{length:6.3f} | Z:{head.z:7.3f} | {deform}")
+        print(f"{name:25} | 父级:{parent_name:25} | 长度:{lengths[i]:6.3f} | Z:{heads[i, 2]:7.3f} | {deform}")
     
     # 显示所有骨骼的层次结构（只显示根骨骼及其子骨骼）
     print("\n【完整骨骼层次结构】\n")
-    lines = show_bone_hierarchy(arm_xps)
+    lines = show_bone_hierarchy(snap)
     # 只显示前50行
     for line in lines[:50]:
         print(line)
@@ -88,26 +97,23 @@ def main():
     print("=" * 100)
     
     if arm_target:
-        print(f"\n骨架名: {arm_target.name}\n")
+        target = ArmatureSnapshot.from_armature(arm_target)
+        print(f"\n骨架名: {target.name}\n")
         
-        spine_chain = []
-        current = arm_target.data.bones.get("頭")
-        while current:
-            spine_chain.insert(0, current)
-            current = current.parent
-            if current and "全ての親" in current.name:
-                spine_chain.insert(0, current)
-                break
+        # 頭 的父链（到 全ての親 为止）
+        spine_chain = target.chain("頭")
+        for i, name in enumerate(spine_chain):
+            if "全ての親" in name:
+                spine_chain = spine_chain[i:]
         
-        mw_target = arm_target.matrix_world
-        for i, bone in enumerate(spine_chain):
-            head = (mw_target @ bone.head_local)
-            tail = (mw_target @ bone.tail_local)
-            length = (tail - head).length
-            parent_name = bone.parent.name if bone.parent else "無"
+        heads = target.world_heads
+        lengths = world_lengths(target)
+        for i, name in enumerate(spine_chain):
+            index = target.index[name]
+            parent_name = target.parent_name(name) or "無"
             indent = "  " * (i // 2)
             
-            print(f"{indent}{bone.name:25} | 父級:{parent_name:12} | 長度:{length:6.3f} | Z:{head.z:7.3f}")
+            print(f"{indent}{name:25} | 父級:{parent_name:12} | 長度:{lengths[index]:6.3f} | Z:{heads[index, 2]:7.3f}")
     
     print("\n" + "=" * 100)
 
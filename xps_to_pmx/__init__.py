@@ -24,8 +24,13 @@ bl_info = {
     "tracker_url": "",
 }
 
-import bpy
-from . import ui, pipeline, mapping_ui, mmd_bone_tree_ui, operators
+try:
+    import bpy
+except ImportError:  # outside Blender only the bpy-free modules (mapping, pmx.reader, ...) load
+    bpy = None
+
+if bpy is not None:
+    from . import ui, pipeline, mapping_ui, mmd_bone_tree_ui, operators
 
 
 # ─────────────────────────────────────────────────────────────────────────────
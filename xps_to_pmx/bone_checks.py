@@ -1,24 +1,35 @@
 # bone_checks.py — 骨架完整性检测与修复
 # 每项检测: check_xxx(armature) -> (ok: bool, issues: list[str])
 # 每项修复: fix_xxx(armature, context) -> (success: bool, message: str)
+#
+# 修复分两阶段：plan_xxx(plan) 只在 FixPlan（骨架的虚拟副本）上记录
+# 创建 / 改父级 / 移动 / 重命名操作；apply_plan 在一次 Edit Mode 会话中
+# 执行全部骨骼编辑，然后用一次批量遍历同步网格顶点组名称。
+# fix_all 把所有修复规划进同一个 FixPlan，只进出一次 Edit Mode。
+#
+# 检测与规划只读取 ArmatureSnapshot（一次批量读取的骨架只读副本），
+# check_xxx 也接受现成的快照，run_all_checks 对所有检测只读取一次骨架。
 
-import bpy
 from mathutils import Vector
 
+from . import modes
+from .mapping.snapshot import snapshot_of
+
 
 # ─── 工具 ────────────────────────────────────────────────────────────────────
 
 class _EditMode:
-    """上下文管理器：自动进出 Edit Mode，返回 edit_bones"""
+    """上下文管理器：自动进出 Edit Mode，返回 edit_bones（已在 Edit Mode 时不切换）"""
     def __init__(self, armature, context):
         self.arm = armature
         self.ctx = context
+        self._scope = None
     def __enter__(self):
-        self.ctx.view_layer.objects.active = self.arm
-        bpy.ops.object.mode_set(mode='EDIT')
+        self._scope = modes.mode(self.arm, 'EDIT')
+        self._scope.__enter__()
         return self.arm.data.edit_bones
-    def __exit__(self, *_):
-        bpy.ops.object.mode_set(mode='OBJECT')
+    def __exit__(self, *exc):
+        return self._scope.__exit__(*exc)
 
 
 def _new_bone(eb, name, head, tail, parent_name=None, use_deform=True):
@@ -35,26 +46,169 @@ def _new_bone(eb, name, head, tail, parent_name=None, use_deform=True):
     return b
 
 
-def _rename_bone(armature, context, old_name, new_name):
-    """重命名骨骼，同步所有网格 vertex group。"""
-    pb = armature.pose.bones.get(old_name)
-    if not pb:
-        return False
-    pb.name = new_name
+# ─── 修复计划（虚拟骨架 + 编辑列表）──────────────────────────────────────────
+
+class _PlannedBone:
+    """骨骼的虚拟副本，接口与 bpy Bone 的常用属性一致（name/head/tail/parent）。"""
+    __slots__ = ('name', 'head', 'tail', 'parent', 'use_deform')
+
+    def __init__(self, name, head, tail, parent=None, use_deform=True):
+        self.name = name
+        self.head = head
+        self.tail = tail
+        self.parent = parent
+        self.use_deform = use_deform
+
+
+class FixPlan:
+    """
+    在骨架的虚拟副本上记录修复操作，不进入 Edit Mode。
+    规划函数通过 plan.bones（name -> _PlannedBone，支持 .get）读取当前状态，
+    后续规划能看到前面规划的结果（例如 肩骨链 看到 脊椎链 新建的 上半身3）。
+    """
+
+    def __init__(self, armature):
+        self._snap = snapshot_of(armature)
+        self._load()
+        self.edits = []     # [(op, args)]，按顺序在 Edit Mode 中执行
+        self.renames = {}   # 原始名 -> 最终名（用于顶点组批量同步）
+
+    def _load(self):
+        snap = self._snap
+        self.bones = {}
+        for name, head, tail, use_deform in zip(
+                snap.names, snap.heads.tolist(), snap.tails.tolist(), snap.deform.tolist()):
+            self.bones[name] = _PlannedBone(name, Vector(head), Vector(tail), use_deform=use_deform)
+        for name, parent_name in snap.bone_pairs():
+            if parent_name:
+                self.bones[name].parent = self.bones[parent_name]
+
+    def __bool__(self):
+        return bool(self.edits)
+
+    def checkpoint(self):
+        """返回当前规划位置，供 rollback 使用。"""
+        return len(self.edits)
+
+    def rollback(self, mark):
+        """
+        撤销 mark 之后的规划。规划函数可能在出错前已改动虚拟骨骼，
+        所以从快照重建虚拟骨架并重放 mark 之前的编辑（renames 随之重建）。
+        """
+        edits = self.edits[:mark]
+        self._load()
+        self.edits = []
+        self.renames = {}
+        replay = {'create': self.create, 'parent': self.reparent, 'move': self.move,
+                  'deform': self.set_deform, 'rename': self.rename}
+        for op, args in edits:
+            replay[op](*args)
+
+    def create(self, name, head, tail, parent_name=None, use_deform=True):
+        """创建骨骼（若已存在则更新其位置和父级，与 _new_bone 一致）。"""
+        head, tail = head.copy(), tail.copy()
+        bone = self.bones.get(name)
+        if bone is None:
+            bone = self.bones[name] = _PlannedBone(name, head, tail)
+        bone.head, bone.tail, bone.use_deform = head, tail, use_deform
+        if parent_name and parent_name in self.bones:
+            bone.parent = self.bones[parent_name]
+        self.edits.append(('create', (name, head, tail, parent_name, use_deform)))
+        return bone
+
+    def reparent(self, name, parent_name):
+        self.bones[name].parent = self.bones.get(parent_name)
+        self.edits.append(('parent', (name, parent_name)))
+
+    def move(self, name, head, tail):
+        bone = self.bones[name]
+        bone.head, bone.tail = head.copy(), tail.copy()
+        self.edits.append(('move', (name, bone.head, bone.tail)))
+
+    def set_deform(self, name, use_deform):
+        self.bones[name].use_deform = use_deform
+        self.edits.append(('deform', (name, use_deform)))
+
+    def rename(self, old_name, new_name):
+        """重命名骨骼（顶点组在 apply_plan 中统一同步）。"""
+        bone = self.bones.get(old_name)
+        if bone is None or new_name in self.bones:
+            return False
+        del self.bones[old_name]
+        bone.name = new_name
+        self.bones[new_name] = bone
+        origin = next((k for k, v in self.renames.items() if v == old_name), old_name)
+        self.renames[origin] = new_name
+        self.edits.append(('rename', (old_name, new_name)))
+        return True
+
+
+def _apply_edits(eb, edits):
+    for op, args in edits:
+        if op == 'create':
+            _new_bone(eb, *args)
+        elif op == 'rename':
+            old_name, new_name = args
+            eb[old_name].name = new_name
+        elif op == 'parent':
+            name, parent_name = args
+            b = eb[name]
+            b.parent = eb.get(parent_name) if parent_name else None
+            b.use_connect = False
+        elif op == 'move':
+            name, head, tail = args
+            eb[name].head = head
+            eb[name].tail = tail
+        elif op == 'deform':
+            name, use_deform = args
+            eb[name].use_deform = use_deform
+
+
+def _sync_vertex_groups(context, renames):
+    """一次遍历所有网格，按重命名表同步顶点组名称。"""
+    if not renames:
+        return 0
+    count = 0
     for obj in context.scene.objects:
         if obj.type != 'MESH':
             continue
-        vg = obj.vertex_groups.get(old_name)
-        if vg:
-            vg.name = new_name
-    return True
+        groups = obj.vertex_groups
+        for old_name, new_name in renames.items():
+            vg = groups.get(old_name)
+            if vg and not groups.get(new_name):
+                vg.name = new_name
+                count += 1
+    return count
+
+
+def apply_plan(armature, context, plan):
+    """在一次 Edit Mode 会话中执行所有骨骼编辑，再批量同步顶点组。"""
+    if plan.edits:
+        with _EditMode(armature, context) as eb:
+            _apply_edits(eb, plan.edits)
+    _sync_vertex_groups(context, plan.renames)
+
+
+def _run_fix(plan_fn, armature, context):
+    """单项修复：规划 + 应用。"""
+    import traceback
+
+    try:
+        plan = FixPlan(armature)
+        ok, msg = plan_fn(plan)
+    except Exception:
+        return False, traceback.format_exc()
+    if plan:
+        try:
+            apply_plan(armature, context, plan)
+        except Exception:
+            return False, traceback.format_exc()
+    return ok, msg
 
 
 # ─── Check 1: 脊椎骨链（上半身3 + 首1）─────────────────────────────────────
 
-def check_spine_chain(armature):
-    """检测脊椎链是否完整：需要 上半身3（连接上半身2和首/肩）、首1（连接首和頭）。"""
-    b = armature.data.bones
+def _check_spine_chain(b):
     issues = []
     if not b.get("上半身3"):
         issues.append("缺少 上半身3（应位于 上半身2 和 首 之间）")
@@ -63,49 +217,47 @@ def check_spine_chain(armature):
     return len(issues) == 0, issues
 
 
-def fix_spine_chain(armature, context):
-    """修复脊椎链：创建 上半身3 和 首1，调整相关骨骼的父级。"""
-    b = armature.data.bones
+def check_spine_chain(armature):
+    """检测脊椎链是否完整：需要 上半身3（连接上半身2和首/肩）、首1（连接首和頭）。"""
+    return _check_spine_chain(snapshot_of(armature))
+
+
+def plan_spine_chain(plan):
+    """规划脊椎链修复：创建 上半身3 和 首1，调整相关骨骼的父级。"""
+    b = plan.bones
     need_ub3   = not b.get("上半身3")
     need_neck1 = not b.get("首1")
     if not need_ub3 and not need_neck1:
         return True, "脊椎骨链已完整，无需修复"
 
-    try:
-        with _EditMode(armature, context) as eb:
-            # ── 上半身3（插入 上半身2 和 首 之间） ──────────────────────
-            if need_ub3:
-                ub2  = eb.get("上半身2")
-                neck = eb.get("首")
-                if ub2 and neck:
-                    h = ub2.tail.copy()
-                    t = neck.head.copy()
-                    if (t - h).length < 0.005:
-                        t = h + Vector((0, 0, 0.05))
-                    ub3 = _new_bone(eb, "上半身3", h, t, "上半身2", use_deform=True)
-                    neck.parent = ub3
-                    neck.use_connect = False
-                    # 将 肩P.L/R 以及直接挂在 上半身2 的肩骨迁移到 上半身3
-                    for sn in ["肩P.L", "肩P.R", "左肩", "右肩"]:
-                        sp = eb.get(sn)
-                        if sp and sp.parent and sp.parent.name == "上半身2":
-                            sp.parent = ub3
-
-            # ── 首1（插入 首 和 頭 之间） ─────────────────────────────────
-            if need_neck1:
-                neck  = eb.get("首")
-                head_b = eb.get("頭")
-                if neck and head_b:
-                    h = neck.tail.copy()
-                    t = head_b.head.copy()
-                    if (t - h).length < 0.005:
-                        t = h + Vector((0, 0, 0.04))
-                    n1 = _new_bone(eb, "首1", h, t, "首", use_deform=True)
-                    head_b.parent = n1
-                    head_b.use_connect = False
-    except Exception as e:
-        import traceback
-        return False, traceback.format_exc()
+    # ── 上半身3（插入 上半身2 和 首 之间） ──────────────────────
+    if need_ub3:
+        ub2  = b.get("上半身2")
+        neck = b.get("首")
+        if ub2 and neck:
+            h = ub2.tail.copy()
+            t = neck.head.copy()
+            if (t - h).length < 0.005:
+                t = h + Vector((0, 0, 0.05))
+            plan.create("上半身3", h, t, "上半身2", use_deform=True)
+            plan.reparent("首", "上半身3")
+            # 将 肩P.L/R 以及直接挂在 上半身2 的肩骨迁移到 上半身3
+            for sn in ["肩P.L", "肩P.R", "左肩", "右肩"]:
+                sp = b.get(sn)
+                if sp and sp.parent and sp.parent.name == "上半身2":
+                    plan.reparent(sn, "上半身3")
+
+    # ── 首1（插入 首 和 頭 之间） ─────────────────────────────────
+    if need_neck1:
+        neck  = b.get("首")
+        head_b = b.get("頭")
+        if neck and head_b:
+            h = neck.tail.copy()
+            t = head_b.head.copy()
+            if (t - h).length < 0.005:
+                t = h + Vector((0, 0, 0.04))
+            plan.create("首1", h, t, "首", use_deform=True)
+            plan.reparent("頭", "首1")
 
     msgs = []
     if need_ub3:   msgs.append("已创建 上半身3")
@@ -113,11 +265,14 @@ def fix_spine_chain(armature, context):
     return True, "、".join(msgs)
 
 
+def fix_spine_chain(armature, context):
+    """修复脊椎链：创建 上半身3 和 首1，调整相关骨骼的父级。"""
+    return _run_fix(plan_spine_chain, armature, context)
+
+
 # ─── Check 2: 肩骨链（肩P + 肩C）───────────────────────────────────────────
 
-def check_shoulder_chain(armature):
-    """检测肩骨链：需要 肩P.L/R（肩的父级）和 肩C.L/R（腕的父级）。"""
-    b = armature.data.bones
+def _check_shoulder_chain(b):
     issues = []
     for side, jp in [(".L", "左"), (".R", "右")]:
         shl = b.get(f"{jp}肩")
@@ -133,62 +288,60 @@ def check_shoulder_chain(armature):
     return len(issues) == 0, issues
 
 
-def fix_shoulder_chain(armature, context):
-    """修复肩骨链：创建 肩P.L/R 和 肩C.L/R，调整 肩 和 腕 的父级。"""
-    ok, issues = check_shoulder_chain(armature)
+def check_shoulder_chain(armature):
+    """检测肩骨链：需要 肩P.L/R（肩的父级）和 肩C.L/R（腕的父级）。"""
+    return _check_shoulder_chain(snapshot_of(armature))
+
+
+def plan_shoulder_chain(plan):
+    """规划肩骨链修复：创建 肩P.L/R 和 肩C.L/R，调整 肩 和 腕 的父级。"""
+    b = plan.bones
+    ok, issues = _check_shoulder_chain(b)
     if ok:
         return True, "肩骨链已完整，无需修复"
 
-    try:
-        with _EditMode(armature, context) as eb:
-            # 查找最合适的肩P父级（上半身3 > 上半身2 > 上半身1 > 上半身）
-            spine_priority = ["上半身3", "上半身2", "上半身1", "上半身"]
-            upper_parent = next((p for p in spine_priority if eb.get(p)), None)
-
-            for side, jp in [(".L", "左"), (".R", "右")]:
-                shl = eb.get(f"{jp}肩")
-                arm = eb.get(f"{jp}腕")
-                if not shl:
-                    continue
-
-                pP = f"肩P{side}"
-                pC = f"肩C{side}"
-
-                # 肩P：短骨，位于肩头，父级为上半身3
-                if not eb.get(pP):
-                    _new_bone(eb, pP,
-                              shl.head.copy(),
-                              shl.head + Vector((0, 0, 0.025)),
-                              upper_parent, use_deform=False)
-                shl.parent = eb.get(pP)
-                shl.use_connect = False
-
-                # 肩C：短骨，位于肩尾（腕头部），父级为肩
-                arm_head = arm.head.copy() if arm else shl.tail.copy()
-                if not eb.get(pC):
-                    _new_bone(eb, pC,
-                              arm_head,
-                              arm_head + Vector((0, 0, 0.025)),
-                              f"{jp}肩", use_deform=False)
-                if arm:
-                    arm.parent = eb.get(pC)
-                    arm.use_connect = False
-    except Exception as e:
-        import traceback
-        return False, traceback.format_exc()
+    # 查找最合适的肩P父级（上半身3 > 上半身2 > 上半身1 > 上半身）
+    spine_priority = ["上半身3", "上半身2", "上半身1", "上半身"]
+    upper_parent = next((p for p in spine_priority if b.get(p)), None)
+
+    for side, jp in [(".L", "左"), (".R", "右")]:
+        shl = b.get(f"{jp}肩")
+        arm = b.get(f"{jp}腕")
+        if not shl:
+            continue
+
+        pP = f"肩P{side}"
+        pC = f"肩C{side}"
+
+        # 肩P：短骨，位于肩头，父级为上半身3
+        if not b.get(pP):
+            plan.create(pP,
+                        shl.head.copy(),
+                        shl.head + Vector((0, 0, 0.025)),
+                        upper_parent, use_deform=False)
+        plan.reparent(shl.name, pP)
+
+        # 肩C：短骨，位于肩尾（腕头部），父级为肩
+        arm_head = arm.head.copy() if arm else shl.tail.copy()
+        if not b.get(pC):
+            plan.create(pC,
+                        arm_head,
+                        arm_head + Vector((0, 0, 0.025)),
+                        f"{jp}肩", use_deform=False)
+        if arm:
+            plan.reparent(arm.name, pC)
 
     return True, "已创建 肩P.L/R、肩C.L/R，重新连接肩骨链"
 
 
+def fix_shoulder_chain(armature, context):
+    """修复肩骨链：创建 肩P.L/R 和 肩C.L/R，调整 肩 和 腕 的父级。"""
+    return _run_fix(plan_shoulder_chain, armature, context)
+
+
 # ─── Check 3: 捩骨接入骨链 ───────────────────────────────────────────────────
 
-def check_twist_chain(armature):
-    """
-    检测捩骨是否正确插入骨链：
-      腕 → 腕捩 → ひじ（ひじ.parent 应为 腕捩）
-      ひじ → 手捩 → 手首（手首.parent 应为 手捩）
-    """
-    b = armature.data.bones
+def _check_twist_chain(b):
     issues = []
     pairs = [
         ("左腕捩",  "左ひじ"),
@@ -206,9 +359,19 @@ def check_twist_chain(armature):
     return len(issues) == 0, issues
 
 
-def fix_twist_chain(armature, context):
-    """将 ひじ 的父级改为 腕捩，将 手首 的父级改为 手捩，并调整捩骨位置到链中点。"""
-    ok, issues = check_twist_chain(armature)
+def check_twist_chain(armature):
+    """
+    检测捩骨是否正确插入骨链：
+      腕 → 腕捩 → ひじ（ひじ.parent 应为 腕捩）
+      ひじ → 手捩 → 手首（手首.parent 应为 手捩）
+    """
+    return _check_twist_chain(snapshot_of(armature))
+
+
+def plan_twist_chain(plan):
+    """规划捩骨链修复：ひじ 的父级改为 腕捩，手首 的父级改为 手捩，捩骨移到链中。"""
+    b = plan.bones
+    ok, issues = _check_twist_chain(b)
     if ok:
         return True, "捩骨链已正确，无需修复"
 
@@ -219,44 +382,34 @@ def fix_twist_chain(armature, context):
         ("右手捩",  "右ひじ", "右手首"),
     ]
     fixed = 0
-    try:
-        with _EditMode(armature, context) as eb:
-            for twist_name, src_name, child_name in triples:
-                tb = eb.get(twist_name)
-                sb = eb.get(src_name)
-                cb = eb.get(child_name)
-                if not (tb and sb and cb):
-                    continue
-                if cb.parent and cb.parent.name == twist_name:
-                    continue  # already correct
-
-                # 重新定位捩骨到 src→child 的中点
-                mid = sb.tail.lerp(cb.head, 0.0)  # 捩骨从 src.tail 到 child.head
-                tb.head = sb.tail.copy()
-                tb.tail = cb.head.copy()
-                tb.parent = sb
-                tb.use_connect = False
-
-                # 将 child 的父级改为捩骨
-                cb.parent = tb
-                cb.use_connect = False
-                fixed += 1
-    except Exception as e:
-        import traceback
-        return False, traceback.format_exc()
+    for twist_name, src_name, child_name in triples:
+        tb = b.get(twist_name)
+        sb = b.get(src_name)
+        cb = b.get(child_name)
+        if not (tb and sb and cb):
+            continue
+        if cb.parent and cb.parent.name == twist_name:
+            continue  # already correct
+
+        # 捩骨从 src.tail 到 child.head
+        plan.move(twist_name, sb.tail, cb.head)
+        plan.reparent(twist_name, src_name)
+
+        # 将 child 的父级改为捩骨
+        plan.reparent(child_name, twist_name)
+        fixed += 1
 
     return True, f"已修复 {fixed} 处捩骨链（共 {len(issues)} 处问题）"
 
 
+def fix_twist_chain(armature, context):
+    """将 ひじ 的父级改为 腕捩，将 手首 的父级改为 手捩，并调整捩骨位置到链中点。"""
+    return _run_fix(plan_twist_chain, armature, context)
+
+
 # ─── Check 4: 趾骨（つま先 + 足先EX重复处理）────────────────────────────────
 
-def check_toe_bones(armature):
-    """
-    检测趾骨是否正确：
-    - つま先.L/R 应存在（FK趾骨控制，父级为 足首.L/R）
-    - 足先EX.L.001 存在说明有重名骨，需要修复
-    """
-    b = armature.data.bones
+def _check_toe_bones(b):
     issues = []
     for side, jp in [(".L", "左"), (".R", "右")]:
         if not b.get(f"つま先{side}"):
@@ -271,71 +424,71 @@ def check_toe_bones(armature):
     return len(issues) == 0, issues
 
 
-def fix_toe_bones(armature, context):
+def check_toe_bones(armature):
     """
-    修复趾骨：将 足先EX.L.001 / 左足先EX 重命名为 つま先.L，
+    检测趾骨是否正确：
+    - つま先.L/R 应存在（FK趾骨控制，父级为 足首.L/R）
+    - 足先EX.L.001 存在说明有重名骨，需要修复
+    """
+    return _check_toe_bones(snapshot_of(armature))
+
+
+def plan_toe_bones(plan):
+    """
+    规划趾骨修复：将 足先EX.L.001 / 左足先EX 重命名为 つま先.L，
     调整父级为 FK 踝骨（足首.L），确保 足先EX.L（D骨）父级为 足首D.L。
     """
-    ok, issues = check_toe_bones(armature)
+    b = plan.bones
+    ok, issues = _check_toe_bones(b)
     if ok:
         return True, "趾骨已正确，无需修复"
 
     fixed = []
     for side, jp in [(".L", "左"), (".R", "右")]:
         tsuma = f"つま先{side}"
-        if armature.data.bones.get(tsuma):
+        if b.get(tsuma):
             continue  # 已存在，跳过
 
         # 找到候选骨：优先 .001 重名骨，其次日文名
-        candidate = None
-        for name in [f"足先EX{side}.001", f"{jp}足先EX"]:
-            if armature.data.bones.get(name):
-                candidate = name
-                break
-
+        candidate = next((n for n in [f"足先EX{side}.001", f"{jp}足先EX"] if b.get(n)), None)
         if not candidate:
             continue
 
-        if _rename_bone(armature, context, candidate, tsuma):
-            fixed.append(f"{candidate} → {tsuma}")
-        else:
+        if not plan.rename(candidate, tsuma):
             continue
+        fixed.append(f"{candidate} → {tsuma}")
 
         # 修复父级：つま先 应挂在 FK 踝骨（足首.L/R）下
         ankle_fk = f"{jp}足首"
-        try:
-            with _EditMode(armature, context) as eb:
-                tsuma_eb = eb.get(tsuma)
-                ankle_eb = eb.get(ankle_fk)
-                if tsuma_eb and ankle_eb:
-                    tsuma_eb.parent = ankle_eb
-                    tsuma_eb.use_connect = False
-                    tsuma_eb.use_deform = True
-
-                # 确保 足先EX.L D骨 存在并挂在 足首D.L 下
-                d_name   = f"足先EX{side}"
-                d_parent = f"足首D{side}"
-                if eb.get(d_parent) and not eb.get(d_name):
-                    tip = tsuma_eb.head if tsuma_eb else ankle_eb.tail
-                    _new_bone(eb, d_name, tip, tip + Vector((0, -0.05, 0)),
-                              d_parent, use_deform=True)
-        except Exception as e:
-            import traceback
-            return False, traceback.format_exc()
+        tsuma_b = b.get(tsuma)
+        ankle_b = b.get(ankle_fk)
+        if tsuma_b and ankle_b:
+            plan.reparent(tsuma, ankle_fk)
+            plan.set_deform(tsuma, True)
+
+        # 确保 足先EX.L D骨 存在并挂在 足首D.L 下
+        d_name   = f"足先EX{side}"
+        d_parent = f"足首D{side}"
+        if b.get(d_parent) and not b.get(d_name):
+            tip = tsuma_b.head if tsuma_b else ankle_b.tail
+            plan.create(d_name, tip, tip + Vector((0, -0.05, 0)), d_parent, use_deform=True)
 
     if fixed:
         return True, "已修复趾骨：" + "、".join(fixed)
     return False, "未找到可自动修复的趾骨"
 
 
-# ─── Check 5: 手指基节（指０骨）────────────────────────────────────────────
-
-def check_finger_bases(armature):
+def fix_toe_bones(armature, context):
     """
-    检测手指基节骨（指０）是否存在。
-    仅在模型有手指骨（指１骨）时才报错。
+    修复趾骨：将 足先EX.L.001 / 左足先EX 重命名为 つま先.L，
+    调整父级为 FK 踝骨（足首.L），确保 足先EX.L（D骨）父级为 足首D.L。
     """
-    b = armature.data.bones
+    return _run_fix(plan_toe_bones, armature, context)
+
+
+# ─── Check 5: 手指基节（指０骨）────────────────────────────────────────────
+
+def _check_finger_bases(b):
     has_fingers = any(b.get(n) for n in ["左人指１", "左中指１", "右人指１"])
     if not has_fingers:
         return True, []
@@ -349,9 +502,17 @@ def check_finger_bases(armature):
     return True, []
 
 
-def fix_finger_bases(armature, context):
+def check_finger_bases(armature):
     """
-    将 DAZ carpal 骨（lCarpal1-4）重命名为 指０ 骨。
+    检测手指基节骨（指０）是否存在。
+    仅在模型有手指骨（指１骨）时才报错。
+    """
+    return _check_finger_bases(snapshot_of(armature))
+
+
+def plan_finger_bases(plan):
+    """
+    规划将 DAZ carpal 骨（lCarpal1-4）重命名为 指０ 骨。
     若 carpal 不存在则跳过（其他格式可能本就没有基节骨）。
     """
     carpal_map = {
@@ -360,22 +521,30 @@ def fix_finger_bases(armature, context):
         "rCarpal1": "人指０.R", "rCarpal2": "中指０.R",
         "rCarpal3": "薬指０.R", "rCarpal4": "小指０.R",
     }
-    b = armature.data.bones
+    b = plan.bones
     fixed = []
     for src, dst in carpal_map.items():
         if b.get(src) and not b.get(dst):
-            if _rename_bone(armature, context, src, dst):
+            if plan.rename(src, dst):
                 fixed.append(f"{src}→{dst}")
 
     if fixed:
         return True, f"已重命名 {len(fixed)} 个手指基节骨"
 
-    ok, issues = check_finger_bases(armature)
+    ok, issues = _check_finger_bases(b)
     if ok:
         return True, "手指基节已完整，无需修复"
     return False, f"无法自动修复，请手动检查：{issues[0] if issues else ''}"
 
 
+def fix_finger_bases(armature, context):
+    """
+    将 DAZ carpal 骨（lCarpal1-4）重命名为 指０ 骨。
+    若 carpal 不存在则跳过（其他格式可能本就没有基节骨）。
+    """
+    return _run_fix(plan_finger_bases, armature, context)
+
+
 # ─── 注册表 + 批量运行 ────────────────────────────────────────────────────────
 
 CHECK_REGISTRY = [
@@ -386,13 +555,23 @@ CHECK_REGISTRY = [
     ("fingers",  "手指基节",  check_finger_bases,   fix_finger_bases),
 ]
 
+# key -> 规划函数（fix_all 用它们把所有修复合并进一个 FixPlan）
+PLAN_REGISTRY = {
+    "spine":    plan_spine_chain,
+    "shoulder": plan_shoulder_chain,
+    "twist":    plan_twist_chain,
+    "toe":      plan_toe_bones,
+    "fingers":  plan_finger_bases,
+}
+
 
 def run_all_checks(armature):
-    """对骨架执行所有检测，返回 [(key, label, ok, issues)]。"""
+    """对骨架执行所有检测（共用一个快照），返回 [(key, label, ok, issues)]。"""
+    snap = snapshot_of(armature)
     results = []
     for key, label, check_fn, _ in CHECK_REGISTRY:
         try:
-            ok, issues = check_fn(armature)
+            ok, issues = check_fn(snap)
         except Exception as e:
             ok, issues = False, [str(e)]
         results.append((key, label, ok, issues))
@@ -408,13 +587,27 @@ def fix_by_key(key, armature, context):
 
 
 def fix_all(armature, context):
-    """依次执行所有修复，返回 [(label, success, msg)]。"""
+    """
+    规划所有修复（后一项能看到前一项的规划结果），然后在一次 Edit Mode
+    会话中统一执行，并用一次遍历同步顶点组。返回 [(label, success, msg)]。
+    """
+    import traceback
+
+    plan = FixPlan(armature)
     results = []
-    for key, label, _, fix_fn in CHECK_REGISTRY:
+    for key, label, _, _ in CHECK_REGISTRY:
+        mark = plan.checkpoint()
         try:
-            ok, msg = fix_fn(armature, context)
-        except Exception as e:
-            import traceback
+            ok, msg = PLAN_REGISTRY[key](plan)
+        except Exception:
+            # 丢弃这一项规划了一半的编辑，后续各项仍基于完整的规划结果
+            plan.rollback(mark)
             ok, msg = False, traceback.format_exc()
         results.append((label, ok, msg))
+
+    try:
+        apply_plan(armature, context, plan)
+    except Exception:
+        error = traceback.format_exc()
+        return [(label, False, error) for label, _, _ in results]
     return results
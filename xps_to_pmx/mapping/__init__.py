@@ -6,9 +6,17 @@ that supports any XPS skeleton variant, not just standard formats.
 Core components:
 - data_structures: BoneMapping, WeightMappingRule, MappingConfiguration classes
 - detection: Auto-detection functions for skeleton type and bone mappings
+- skeleton: Cached MMD standard skeleton with precomputed tree indexes
+- validation: Incremental validator for interactive mapping edits
+- binary_format: Compact binary serialization for MappingConfiguration
+- session: Per-armature LRU store of mapping configurations
+- snapshot: Immutable bpy-free ArmatureSnapshot for read-only skeleton analysis
+- groups: MMD bone group table compiled to name -> group dicts
 - presets: JSON preset files for standard XPS formats
 """
 
-from . import data_structures, detection
+from . import (data_structures, detection, skeleton, validation, binary_format, session, snapshot,
+               groups)
 
-__all__ = ['data_structures', 'detection']
+__all__ = ['data_structures', 'detection', 'skeleton', 'validation', 'binary_format', 'session',
+           'snapshot', 'groups']
@@ -1,7 +1,8 @@
 """Data structures for flexible bone and weight mapping system."""
 
 import json
-from dataclasses import dataclass, field, asdict
+import sys
+from dataclasses import dataclass, field, asdict, fields
 from typing import Dict, List, Optional, Any, Tuple
 from enum import Enum
 
@@ -36,6 +37,38 @@ class FalloffType(Enum):
     SMOOTH = "smooth"
 
 
+# ─── Slotted records ─────────────────────────────────────────────────────────
+# Configurations hold thousands of records that repeat the same bone names.
+# The record classes below use __slots__ (no per-instance __dict__) and intern
+# their name fields, so equal names share one string object. Interning also
+# keeps enum-valued fields (bone_type, falloff_type, ...) identical to the
+# corresponding ``BoneType.X.value`` singleton strings.
+
+def _intern(value):
+    """Intern a string value (None and non-str values pass through)."""
+    return sys.intern(value) if type(value) is str else value
+
+
+def _slotted(cls):
+    """Recreate a dataclass with __slots__ for its fields.
+
+    Equivalent to ``@dataclass(slots=True)``, which needs Python 3.10 while
+    Blender 3.0 ships 3.9. Field defaults live in the generated __init__, so
+    the class attributes holding them can be dropped.
+    """
+    field_names = tuple(f.name for f in fields(cls))
+    cls_dict = dict(cls.__dict__)
+    for name in field_names:
+        cls_dict.pop(name, None)
+    cls_dict.pop('__dict__', None)
+    cls_dict.pop('__weakref__', None)
+    cls_dict['__slots__'] = field_names
+    slotted = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+    slotted.__qualname__ = cls.__qualname__
+    return slotted
+
+
+@_slotted
 @dataclass
 class BoneMapping:
     """Mapping record for a single bone from XPS to MMD.
@@ -71,6 +104,15 @@ class BoneMapping:
     user_notes: str = ""  # Detailed notes about this mapping decision
     source_info: str = ""  # Source of mapping (e.g., "auto_detect", "preset", "user_edit")
 
+    def __post_init__(self):
+        self.xps_name = _intern(self.xps_name)
+        self.mmd_name = _intern(self.mmd_name)
+        self.parent_xps = _intern(self.parent_xps)
+        self.parent_mmd = _intern(self.parent_mmd)
+        self.parent_mmd_expected = _intern(self.parent_mmd_expected)
+        self.bone_type = _intern(self.bone_type)
+        self.source_info = _intern(self.source_info)
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
         data = asdict(self)
@@ -87,6 +129,7 @@ class BoneMapping:
         return cls(**data)
 
 
+@_slotted
 @dataclass
 class WeightMappingRule:
     """A rule for transferring vertex weights from one bone to another.
@@ -112,6 +155,13 @@ class WeightMappingRule:
     rule_type: str = WeightRuleType.FK_TO_D.value
     order: int = 0
 
+    def __post_init__(self):
+        self.source_bone = _intern(self.source_bone)
+        self.target_bone = _intern(self.target_bone)
+        self.zone = _intern(self.zone)
+        self.falloff_type = _intern(self.falloff_type)
+        self.rule_type = _intern(self.rule_type)
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
         return asdict(self)
@@ -122,6 +172,7 @@ class WeightMappingRule:
         return cls(**data)
 
 
+@_slotted
 @dataclass
 class MMDBone:
     """Definition of a standard MMD bone (source of truth for hierarchy).
@@ -139,6 +190,11 @@ class MMDBone:
     bone_type: str = BoneType.SPINE.value
     notes: str = ""
 
+    def __post_init__(self):
+        self.mmd_name = _intern(self.mmd_name)
+        self.parent_mmd = _intern(self.parent_mmd)
+        self.bone_type = _intern(self.bone_type)
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
         return asdict(self)
@@ -149,6 +205,7 @@ class MMDBone:
         return cls(**data)
 
 
+@_slotted
 @dataclass
 class UnmappedBone:
     """Tracking information for a bone that couldn't be automatically mapped.
@@ -174,6 +231,13 @@ class UnmappedBone:
     user_notes: str = ""  # User notes about this mapping decision
     is_ignored: bool = False  # Whether user chose to ignore this bone
 
+    def __post_init__(self):
+        self.xps_name = _intern(self.xps_name)
+        self.bone_type = _intern(self.bone_type)
+        self.parent_xps = _intern(self.parent_xps)
+        self.user_mapped_to = _intern(self.user_mapped_to)
+        self.suggestions = [_intern(name) for name in self.suggestions]
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
         return asdict(self)
@@ -358,16 +422,44 @@ class MappingConfiguration:
         data = json.loads(json_str)
         return cls.from_dict(data)
 
-    def save_to_file(self, filepath: str) -> None:
-        """Save configuration to a JSON file."""
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(self.to_json())
+    def to_bytes(self) -> bytes:
+        """Serialize to the compact binary format (see binary_format)."""
+        from . import binary_format
+        return binary_format.encode(self)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'MappingConfiguration':
+        """Deserialize from the compact binary format."""
+        from . import binary_format
+        return binary_format.decode(data)
+
+    def save_to_file(self, filepath: str, binary: Optional[bool] = None) -> None:
+        """Save configuration to a file.
+
+        Args:
+            filepath: Output path
+            binary: Write the compact binary format instead of JSON. If None,
+                the format is chosen from the extension (``.xpmc`` = binary).
+        """
+        if binary is None:
+            from . import binary_format
+            binary = filepath.lower().endswith(binary_format.BINARY_EXTENSION)
+        if binary:
+            with open(filepath, 'wb') as f:
+                f.write(self.to_bytes())
+        else:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write(self.to_json())
 
     @classmethod
     def load_from_file(cls, filepath: str) -> 'MappingConfiguration':
-        """Load configuration from a JSON file."""
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return cls.from_json(f.read())
+        """Load configuration from a JSON or binary file (format is auto-detected)."""
+        from . import binary_format
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        if binary_format.is_binary(data):
+            return cls.from_bytes(data)
+        return cls.from_json(data.decode('utf-8'))
 
     def validate_parent_relationships(self) -> ValidationResult:
         """Validate that parent-child relationships are correctly mapped.
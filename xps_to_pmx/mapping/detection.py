@@ -5,18 +5,142 @@ This module provides functions to:
 2. Auto-map bones based on name similarity, position, and weight distribution
 3. Analyze weight distribution across bones
 4. Suggest weight transfer rules
+
+Skeleton statistics (type, structure, hierarchy metrics) depend only on bone
+names and parents, so they are cached per skeleton fingerprint.
 """
 
 import re
-from typing import Dict, List, Tuple, Optional
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Any, Dict, List, Tuple, Optional
 from difflib import SequenceMatcher
 
+import numpy as np
+
 try:
     import bpy
 except ImportError:
     bpy = None
 
-from . import data_structures
+from . import data_structures, skeleton
+from .snapshot import snapshot_of
+
+# Skeletons whose statistics are kept (fingerprint -> {'metrics', 'type', 'structure'})
+MAX_CACHED_SKELETONS = 16
+
+_STATS_CACHE: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+
+
+def _cached_stats(snap) -> Dict[str, Any]:
+    """Return the (mutable) statistics entry for a snapshot's skeleton."""
+    key = snap.fingerprint
+    entry = _STATS_CACHE.get(key)
+    if entry is None:
+        entry = _STATS_CACHE[key] = {}
+        while len(_STATS_CACHE) > MAX_CACHED_SKELETONS:
+            _STATS_CACHE.popitem(last=False)
+    else:
+        _STATS_CACHE.move_to_end(key)
+    return entry
+
+
+def clear_cache() -> None:
+    """Drop all cached skeleton statistics."""
+    _STATS_CACHE.clear()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Hierarchy metrics
+# ─────────────────────────────────────────────────────────────────────────────
+
+class HierarchyMetrics:
+    """Per-bone hierarchy metrics, computed without recursion.
+
+    All arrays are indexed like the snapshot's ``names``.
+
+    Attributes:
+        depth: (N,) distance from the bone's root (roots are 0)
+        subtree_size: (N,) bones in the subtree, the bone itself included
+        chain_length: (N,) bones in the unbranched chain the bone belongs to
+            (a chain starts at a root or below a bone with several children)
+        branching: (N,) number of children
+        max_depth: Deepest bone's depth
+        max_chain_length: Longest unbranched chain (e.g. a hair strand)
+        mean_branching: Average number of children of non-leaf bones
+        leaf_count: Bones without children
+    """
+
+    __slots__ = ('depth', 'subtree_size', 'chain_length', 'branching',
+                 'max_depth', 'max_chain_length', 'mean_branching', 'leaf_count')
+
+    def __init__(self, snap):
+        count = len(snap)
+        parents = snap.parents
+        order = snap.order
+        depth = snap.depth
+        has_parent = parents >= 0
+
+        branching = np.bincount(parents[has_parent], minlength=count).astype(np.int32)
+
+        # Subtree sizes: fold children into parents, deepest level first
+        subtree = np.ones(count, dtype=np.int32)
+        by_depth = np.argsort(depth, kind='stable')
+        bounds = np.searchsorted(depth[by_depth], np.arange(int(depth.max()) + 2 if count else 1))
+        for level in range(len(bounds) - 2, 0, -1):
+            at_level = by_depth[bounds[level]:bounds[level + 1]]
+            at_level = at_level[has_parent[at_level]]
+            np.add.at(subtree, parents[at_level], subtree[at_level])
+
+        # Chain ids in topological order: an only child continues its parent's chain
+        # (bones on a parent cycle come last in ``order`` and start their own chain)
+        chain_id = [-1] * count
+        next_id = 0
+        branching_list = branching.tolist()
+        parent_list = parents.tolist()
+        for i in order.tolist():
+            parent = parent_list[i]
+            if parent >= 0 and branching_list[parent] == 1 and chain_id[parent] >= 0:
+                chain_id[i] = chain_id[parent]
+            else:
+                chain_id[i] = next_id
+                next_id += 1
+        chain_id = np.array(chain_id, dtype=np.int64)
+        chain_length = np.bincount(chain_id, minlength=next_id)[chain_id].astype(np.int32)
+
+        inner = branching[branching > 0]
+        for array in (branching, subtree, chain_length):
+            array.flags.writeable = False
+        self.depth = depth
+        self.subtree_size = subtree
+        self.chain_length = chain_length
+        self.branching = branching
+        self.max_depth = int(depth.max()) if count else 0
+        self.max_chain_length = int(chain_length.max()) if count else 0
+        self.mean_branching = float(inner.mean()) if len(inner) else 0.0
+        self.leaf_count = int(count - len(inner))
+
+
+def hierarchy_metrics(armature) -> Optional[HierarchyMetrics]:
+    """Return the hierarchy metrics of an armature, cached per skeleton fingerprint.
+
+    The snapshot itself is reused per armature (see ``snapshot.snapshot_of``),
+    so a repeated call costs a cheap key check and two dict lookups.
+
+    Args:
+        armature: Blender armature object or ArmatureSnapshot
+
+    Returns:
+        HierarchyMetrics, or None if ``armature`` is not an armature
+    """
+    snap = snapshot_of(armature)
+    if snap is None:
+        return None
+    entry = _cached_stats(snap)
+    metrics = entry.get('metrics')
+    if metrics is None:
+        metrics = entry['metrics'] = HierarchyMetrics(snap)
+    return metrics
 
 
 def detect_skeleton_type(armature) -> str:
@@ -29,15 +153,22 @@ def detect_skeleton_type(armature) -> str:
     - custom: Unknown variant
 
     Args:
-        armature: Blender armature object
+        armature: Blender armature object or ArmatureSnapshot
 
     Returns:
         Skeleton type string
     """
-    if not armature or armature.type != 'ARMATURE':
+    snap = snapshot_of(armature)
+    if snap is None:
         return "unknown"
 
-    bone_names = [b.name for b in armature.data.bones]
+    entry = _cached_stats(snap)
+    if 'type' not in entry:
+        entry['type'] = _detect_skeleton_type(snap.names)
+    return entry['type']
+
+
+def _detect_skeleton_type(bone_names) -> str:
     bone_count = len(bone_names)
 
     # Detect by bone count and name patterns
@@ -55,51 +186,58 @@ def detect_skeleton_type(armature) -> str:
 def analyze_skeleton_structure(armature) -> Dict[str, any]:
     """Analyze skeleton structure: bone count, hierarchy, naming patterns.
 
+    Args:
+        armature: Blender armature object or ArmatureSnapshot
+
     Returns:
         Dictionary with skeleton analysis info
     """
-    if not armature or armature.type != 'ARMATURE':
+    snap = snapshot_of(armature)
+    if snap is None:
         return {}
 
-    bones = armature.data.bones
+    entry = _cached_stats(snap)
+    if 'structure' not in entry:
+        entry['structure'] = _analyze_skeleton_structure(snap)
+    result = entry['structure']
+    # Callers may modify the result; keep the cached copy intact
+    return dict(result, bone_names=list(result['bone_names']),
+                naming_patterns=dict(result['naming_patterns']))
+
+
+def _analyze_skeleton_structure(snap) -> Dict[str, any]:
+    metrics = hierarchy_metrics(snap)
+    names = snap.names
+    lowered = [name.lower() for name in names]
     result = {
-        'total_bones': len(bones),
-        'bone_names': [b.name for b in bones],
+        'total_bones': len(names),
+        'bone_names': list(names),
         'naming_patterns': {},
-        'hierarchy_depth': _calculate_hierarchy_depth(armature),
-        'has_spine_bones': any('spine' in b.name.lower() or 'abdomen' in b.name.lower() for b in bones),
-        'has_arm_bones': any('arm' in b.name.lower() for b in bones),
-        'has_leg_bones': any('leg' in b.name.lower() for b in bones),
+        'hierarchy_depth': metrics.max_depth,
+        'max_chain_length': metrics.max_chain_length,
+        'mean_branching': metrics.mean_branching,
+        'leaf_count': metrics.leaf_count,
+        'has_spine_bones': any('spine' in name or 'abdomen' in name for name in lowered),
+        'has_arm_bones': any('arm' in name for name in lowered),
+        'has_leg_bones': any('leg' in name for name in lowered),
     }
 
     # Analyze naming patterns
-    for bone in bones:
-        name_lower = bone.name.lower()
+    for bone_name, name_lower in zip(names, lowered):
         if 'spine' in name_lower or 'abdomen' in name_lower:
-            result['naming_patterns']['spine'] = bone.name
+            result['naming_patterns']['spine'] = bone_name
         if 'arm' in name_lower:
-            result['naming_patterns']['arm'] = bone.name
+            result['naming_patterns']['arm'] = bone_name
         if 'leg' in name_lower:
-            result['naming_patterns']['leg'] = bone.name
+            result['naming_patterns']['leg'] = bone_name
 
     return result
 
 
 def _calculate_hierarchy_depth(armature) -> int:
     """Calculate the maximum depth of bone hierarchy."""
-    max_depth = 0
-
-    def calculate_depth(bone, depth=0):
-        nonlocal max_depth
-        max_depth = max(max_depth, depth)
-        for child in bone.children:
-            calculate_depth(child, depth + 1)
-
-    for bone in armature.data.bones:
-        if not bone.parent:  # Root bones
-            calculate_depth(bone, 0)
-
-    return max_depth
+    metrics = hierarchy_metrics(armature)
+    return metrics.max_depth if metrics is not None else 0
 
 
 def _classify_bone_type(bone_name: str) -> str:
@@ -163,18 +301,19 @@ def auto_map_bones(armature, reference_config: Optional[data_structures.MappingC
     Uses name similarity, position, and weight distribution to find the best mapping.
 
     Args:
-        armature: XPS skeleton (Blender armature)
+        armature: XPS skeleton (Blender armature or ArmatureSnapshot)
         reference_config: Reference configuration to use for mapping hints
 
     Returns:
         MappingConfiguration with auto-detected mappings
     """
-    if not armature or armature.type != 'ARMATURE':
+    snap = snapshot_of(armature)
+    if snap is None:
         return data_structures.MappingConfiguration(name="empty", source_skeleton_type="unknown")
 
     config = data_structures.MappingConfiguration(
-        name=f"Auto-detected from {armature.name}",
-        source_skeleton_type=detect_skeleton_type(armature)
+        name=f"Auto-detected from {snap.name}",
+        source_skeleton_type=detect_skeleton_type(snap)
     )
 
     # Load reference config if not provided
@@ -193,33 +332,32 @@ def auto_map_bones(armature, reference_config: Optional[data_structures.MappingC
     if reference_config:
         mmd_bone_names = {m.mmd_name for m in reference_config.bone_mappings.values()}
 
-    for bone in armature.data.bones:
-        parent_name = bone.parent.name if bone.parent else None
+    for bone_name, parent_name in snap.bone_pairs():
         best_match = None
         best_confidence = 0.0
 
         # Try to find best match from reference config
         if reference_config:
             for ref_xps, ref_mapping in reference_config.bone_mappings.items():
-                similarity = name_similarity(bone.name, ref_xps)
+                similarity = name_similarity(bone_name, ref_xps)
                 if similarity > best_confidence:
                     best_confidence = similarity
                     best_match = ref_mapping.mmd_name
 
         # Create mapping
         mapping = data_structures.BoneMapping(
-            xps_name=bone.name,
-            mmd_name=best_match if best_match else bone.name,
+            xps_name=bone_name,
+            mmd_name=best_match if best_match else bone_name,
             confidence=min(1.0, best_confidence + 0.2),  # Boost confidence a bit
             parent_xps=parent_name,
             parent_mmd=None,  # Will be filled in by build_parent_mapping
-            bone_type=_classify_bone_type(bone.name),
+            bone_type=_classify_bone_type(bone_name),
             is_deform=True,
         )
-        config.bone_mappings[bone.name] = mapping
+        config.bone_mappings[bone_name] = mapping
 
     # Fill in parent relationships
-    build_parent_mapping(armature, config)
+    build_parent_mapping(snap, config)
 
     return config
 
@@ -383,21 +521,25 @@ def build_parent_mapping(xps_armature, config: data_structures.MappingConfigurat
     a bone's parent is mapped, the parent_mmd is set correctly.
 
     Args:
-        xps_armature: XPS skeleton
+        xps_armature: XPS skeleton (Blender armature or ArmatureSnapshot)
         config: Configuration to update
     """
+    snap = snapshot_of(xps_armature)
+    if snap is None:
+        return
+
     # Build reverse mapping: XPS name -> mapping
     xps_to_mapping = {m.xps_name: m for m in config.bone_mappings.values()}
 
-    for bone in xps_armature.data.bones:
-        if bone.name not in xps_to_mapping:
+    for bone_name, parent_name in snap.bone_pairs():
+        if bone_name not in xps_to_mapping:
             continue
 
-        mapping = xps_to_mapping[bone.name]
+        mapping = xps_to_mapping[bone_name]
 
         # Find parent mapping
-        if bone.parent and bone.parent.name in xps_to_mapping:
-            parent_mapping = xps_to_mapping[bone.parent.name]
+        if parent_name and parent_name in xps_to_mapping:
+            parent_mapping = xps_to_mapping[parent_name]
             mapping.parent_mmd = parent_mapping.mmd_name
 
 
@@ -455,14 +597,73 @@ def validate_parent_relationships(config: data_structures.MappingConfiguration)
     return results
 
 
+def _mmd_coverage(snap) -> Optional[Dict[str, Any]]:
+    """Presence bitset and summary of the MMD standard bones for a skeleton.
+
+    Cached per skeleton fingerprint; recomputed when the standard skeleton
+    file is reloaded.
+    """
+    mmd_skeleton = skeleton.load_mmd_skeleton()
+    if mmd_skeleton is None:
+        return None
+
+    entry = _cached_stats(snap)
+    coverage = entry.get('mmd_coverage')
+    if coverage is not None and coverage['skeleton'] is mmd_skeleton:
+        return coverage
+
+    present = mmd_skeleton.presence_mask(snap.names)
+    missing = mmd_skeleton.full_mask & ~present
+    names_in = mmd_skeleton.names_in
+    missing_by_type = {
+        bone_type: tuple(names_in(missing & mask))
+        for bone_type, mask in mmd_skeleton.type_masks.items()
+        if missing & mask
+    }
+    missing_by_category = MappingProxyType({
+        category: tuple(names_in(missing & mask))
+        for category, mask in mmd_skeleton.category_masks.items()
+    })
+    missing_details = MappingProxyType({
+        bone_name: MappingProxyType(_missing_detail(bone_name, bone_def, bool(missing >> i & 1)))
+        for (bone_name, bone_def), i in zip(mmd_skeleton.items(), mmd_skeleton.bit.values())
+    })
+    summary = MappingProxyType({
+        'total_mmd_bones': len(mmd_skeleton),
+        'total_missing': bin(missing).count('1'),
+        'missing_by_type': MappingProxyType(missing_by_type),
+        'missing_by_category': missing_by_category,
+        'missing_critical': missing_by_category['critical'],
+        'missing_details': missing_details,
+    })
+    coverage = entry['mmd_coverage'] = {
+        'skeleton': mmd_skeleton,
+        'present': present,
+        'missing': missing,
+        'summary': summary,
+    }
+    return coverage
+
+
+def _missing_detail(bone_name: str, bone_def, is_missing: bool) -> Dict[str, Any]:
+    return {
+        'is_missing': is_missing,
+        'parent_mmd': bone_def.get('parent_mmd'),
+        'bone_type': bone_def.get('bone_type', 'unknown'),
+        'notes': bone_def.get('notes', ''),
+        'mmd_name': bone_def.get('mmd_name', bone_name),
+        'is_deform': bone_def.get('is_deform', True)
+    }
+
+
 def detect_missing_mmd_bones(armature) -> Dict[str, dict]:
     """Detect which MMD standard bones are missing from the current armature.
 
-    Loads the MMD standard skeleton (49 bones) and checks which ones are missing
-    from the current XPS skeleton.
+    Checks the MMD standard skeleton (49 bones) against the current XPS
+    skeleton with one presence bitset (see ``MMDSkeleton.bit``).
 
     Args:
-        armature: Blender armature object
+        armature: Blender armature object or ArmatureSnapshot
 
     Returns:
         Dictionary mapping MMD bone name -> {
@@ -472,90 +673,51 @@ def detect_missing_mmd_bones(armature) -> Dict[str, dict]:
             'notes': str
         }
     """
-    if not armature or armature.type != 'ARMATURE':
+    snap = snapshot_of(armature)
+    if snap is None:
         return {}
 
-    # Load MMD standard skeleton
-    try:
-        import json
-        import os
-        preset_path = os.path.join(os.path.dirname(__file__), 'presets', 'mmd_standard_skeleton.json')
-        with open(preset_path, 'r', encoding='utf-8') as f:
-            mmd_std = json.load(f)
-    except Exception as e:
-        print(f"Error loading MMD standard skeleton: {e}")
+    coverage = _mmd_coverage(snap)
+    if coverage is None:
         return {}
 
-    # Get current armature bone names
-    current_bones = {b.name for b in armature.data.bones}
-
-    # Check each MMD standard bone
-    results = {}
-    for bone_name, bone_def in mmd_std.get('bones', {}).items():
-        is_missing = bone_name not in current_bones
-        results[bone_name] = {
-            'is_missing': is_missing,
-            'parent_mmd': bone_def.get('parent_mmd'),
-            'bone_type': bone_def.get('bone_type', 'unknown'),
-            'notes': bone_def.get('notes', ''),
-            'mmd_name': bone_def.get('mmd_name', bone_name),
-            'is_deform': bone_def.get('is_deform', True)
-        }
-
-    return results
+    # Fresh dicts: callers store them in the mapping configuration
+    return {bone_name: dict(details)
+            for bone_name, details in coverage['summary']['missing_details'].items()}
 
 
 def build_missing_bones_summary(armature) -> Dict[str, any]:
     """Build a summary of missing MMD bones grouped by type and hierarchy.
 
+    The summary is a few bitwise operations on the presence bitset, cached
+    per skeleton fingerprint; it is read-only (mappings and tuples). The
+    snapshot used as the cache key is itself reused per armature until the
+    bones change (``snapshot.snapshot_of`` / ``snapshot.invalidate``), so a
+    panel redraw does not touch the bones at all.
+
     Args:
-        armature: Blender armature object
+        armature: Blender armature object or ArmatureSnapshot
 
     Returns:
         Dictionary with:
         - total_mmd_bones: int (should be 49)
         - total_missing: int
-        - missing_by_type: {bone_type: [bone_names]}
-        - missing_critical: [critical bone names for skeleton reconstruction]
+        - missing_by_type: {bone_type: (bone_names)}
+        - missing_by_category: {finger/twist/d_series/ik/critical: (bone_names)}
+        - missing_critical: (critical bone names for skeleton reconstruction)
         - missing_details: {bone_name: {is_missing, parent_mmd, ...}}
     """
-    missing_details = detect_missing_mmd_bones(armature)
+    snap = snapshot_of(armature)
+    coverage = _mmd_coverage(snap) if snap is not None else None
 
-    if not missing_details:
+    if coverage is None:
         return {
             'total_mmd_bones': 0,
             'total_missing': 0,
             'missing_by_type': {},
+            'missing_by_category': {},
             'missing_critical': [],
             'missing_details': {}
         }
 
-    # Group by type and identify critical bones
-    missing_by_type = {}
-    missing_critical = []
-    total_missing = 0
-
-    critical_bones = {
-        'センター', 'グルーブ', '腰', '下半身', '上半身',
-        '上半身1', '上半身2', '首', '首1', '頭'
-    }
-
-    for bone_name, details in missing_details.items():
-        if details['is_missing']:
-            total_missing += 1
-
-            bone_type = details['bone_type']
-            if bone_type not in missing_by_type:
-                missing_by_type[bone_type] = []
-            missing_by_type[bone_type].append(bone_name)
-
-            if bone_name in critical_bones:
-                missing_critical.append(bone_name)
-
-    return {
-        'total_mmd_bones': len(missing_details),
-        'total_missing': total_missing,
-        'missing_by_type': missing_by_type,
-        'missing_critical': missing_critical,
-        'missing_details': missing_details
-    }
+    return coverage['summary']
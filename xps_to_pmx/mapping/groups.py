@@ -0,0 +1,141 @@
+"""Compiled MMD bone group table.
+
+The group presets use the ``bone_map_and_group.mmd_bone_group`` schema of the
+Convert to MMD addon: a list of ``{"name", "bones"}`` entries, here with an
+English name and the bone names this pipeline creates (``足D.L``,
+``腰キャンセル.L``, ``左足ＩＫ親``, ...). The addon is installed on its own,
+so it carries its own copy of the table.
+
+``compile_groups`` turns that list into dicts once: group -> bones and
+bone -> group. Both consumers then do one dict lookup per bone:
+
+- ``pmx.export.default_frames`` emits one PMX display frame per group,
+- Stage 4 creates the matching Blender bone collections.
+
+This module only depends on the standard library.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+# Group for bones no preset lists (also a preset group itself)
+OTHER_GROUP = "その他"
+
+MMD_BONE_GROUPS = [
+    {
+        "name": "センター",
+        "name_en": "Center",
+        "bones": ["全ての親", "センター", "グルーブ", "腰", "操作中心"],
+    },
+    {
+        "name": "ＩＫ",
+        "name_en": "IK",
+        "bones": ["右足IK親", "右足ＩＫ親", "右足ＩＫ", "右つま先ＩＫ",
+                  "左足IK親", "左足ＩＫ親", "左足ＩＫ", "左つま先ＩＫ"],
+    },
+    {
+        "name": "体(上)",
+        "name_en": "Upper body",
+        "bones": ["上半身", "上半身1", "上半身2", "上半身3", "首", "首1", "頭",
+                  "右目", "左目", "両目", "左眉中", "右眉中", "右眉頭", "左眉頭", "右眉尾", "左眉尾",
+                  "上齿", "下齿", "舌1", "舌2", "舌3", "舌4"],
+    },
+    {
+        "name": "腕",
+        "name_en": "Arms",
+        "bones": ["左肩P", "左肩", "左腕", "左腕捩", "左ひじ", "左手捩", "左手首", "左ダミー",
+                  "右肩P", "右肩", "右腕", "右腕捩", "右ひじ", "右手捩", "右手首", "右ダミー",
+                  "腕D.L", "腕D.R"],
+    },
+    {
+        "name": "指",
+        "name_en": "Fingers",
+        "bones": ["左親指０", "左親指１", "左親指２", "左人指１", "左人指２", "左人指３",
+                  "左中指１", "左中指２", "左中指３", "左薬指１", "左薬指２", "左薬指３",
+                  "左小指１", "左小指２", "左小指３",
+                  "右親指０", "右親指１", "右親指２", "右人指１", "右人指２", "右人指３",
+                  "右中指１", "右中指２", "右中指３", "右薬指１", "右薬指２", "右薬指３",
+                  "右小指１", "右小指２", "右小指３"],
+    },
+    {
+        "name": "体(下)",
+        "name_en": "Lower body",
+        "bones": ["下半身", "腰キャンセル.L", "腰キャンセル.R", "腰キャンセル左", "腰キャンセル右"],
+    },
+    {
+        "name": "足",
+        "name_en": "Legs",
+        "bones": ["左足", "左ひざ", "左足首", "左つま先", "左足D", "左ひざD", "左足首D", "左足先EX",
+                  "右足", "右ひざ", "右足首", "右つま先", "右足D", "右ひざD", "右足首D", "右足先EX",
+                  "足D.L", "ひざD.L", "足首D.L", "足D.R", "ひざD.R", "足首D.R"],
+    },
+    {
+        "name": OTHER_GROUP,
+        "name_en": "Other",
+        "bones": ["右目先", "左目先"],
+    },
+]
+
+
+@dataclass(frozen=True)
+class BoneGroupTable:
+    """Group order, group -> bones and bone -> group (read-only)."""
+    names: Tuple[str, ...]
+    name_en: Mapping[str, str]
+    members: Mapping[str, Tuple[str, ...]]
+    group_of: Mapping[str, str]
+
+    def partition(self, bone_names: Iterable[str],
+                  other: Optional[str] = None) -> Dict[str, List[str]]:
+        """Group -> the given bones in it, in table group order.
+
+        Bones keep their input order inside a group. Bones no group lists go
+        to ``other`` (appended after the table groups if it is not one of
+        them), or are left out when ``other`` is None. Empty groups are
+        omitted.
+        """
+        found: Dict[str, List[str]] = {}
+        for bone_name in bone_names:
+            group = self.group_of.get(bone_name, other)
+            if group is not None:
+                found.setdefault(group, []).append(bone_name)
+        order = self.names if other is None or other in self.members else self.names + (other,)
+        return {group: found[group] for group in order if group in found}
+
+
+def compile_groups(groups: List[dict]) -> BoneGroupTable:
+    """Compile ``mmd_bone_group``-style entries; malformed entries are skipped.
+
+    A bone listed by several groups belongs to the first one; a repeated group
+    name extends the earlier group.
+    """
+    members: Dict[str, List[str]] = {}
+    name_en: Dict[str, str] = {}
+    group_of: Dict[str, str] = {}
+    for entry in groups:
+        if not isinstance(entry, dict) or not isinstance(entry.get('bones'), list):
+            continue
+        name = str(entry.get('name', '')).strip()
+        if not name:
+            continue
+        bones = members.setdefault(name, [])
+        name_en.setdefault(name, entry.get('name_en') or name)
+        for bone_name in entry['bones']:
+            bone_name = str(bone_name).strip()
+            if bone_name and bone_name not in group_of:
+                group_of[bone_name] = name
+                bones.append(bone_name)
+    return BoneGroupTable(
+        names=tuple(members),
+        name_en=MappingProxyType(name_en),
+        members=MappingProxyType({name: tuple(bones) for name, bones in members.items()}),
+        group_of=MappingProxyType(group_of),
+    )
+
+
+@lru_cache(maxsize=None)
+def default_table() -> BoneGroupTable:
+    """``MMD_BONE_GROUPS`` compiled (once)."""
+    return compile_groups(MMD_BONE_GROUPS)
@@ -0,0 +1,227 @@
+"""Per-armature store of mapping sessions.
+
+A session bundles a MappingConfiguration with the indexes derived from it
+(incremental validator, weight statistics). Sessions are keyed by
+``(armature_key, skeleton_fingerprint)`` so several imported models can be
+edited and converted in one Blender session without re-running
+``auto_map_bones`` when switching between them.
+
+The store is a small LRU: the least recently used sessions are evicted once
+the entry limit or the (estimated) memory cap is exceeded. The session that
+was just stored or looked up is never evicted.
+
+This module has no Blender dependency; callers derive the armature key and
+the bone ``(name, parent)`` pairs from the Blender object.
+"""
+
+import hashlib
+import sys
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from . import data_structures, validation
+
+DEFAULT_MAX_SESSIONS = 8
+DEFAULT_MEMORY_CAP = 64 * 1024 * 1024  # bytes
+
+# Rough per-bone cost of the validator indexes (dict entries + result dicts)
+_VALIDATOR_BYTES_PER_BONE = 600
+
+SessionKey = Tuple[Hashable, str]
+
+
+def skeleton_fingerprint(bones: Iterable[Tuple[str, Optional[str]]]) -> str:
+    """Return a stable fingerprint of a skeleton's hierarchy.
+
+    Args:
+        bones: Iterable of (bone name, parent name or None) pairs
+
+    Returns:
+        Hex digest that changes when bones are added, removed, renamed or re-parented
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for name, parent in sorted(bones, key=lambda item: item[0]):
+        digest.update(name.encode('utf-8'))
+        digest.update(b'\x00')
+        digest.update((parent or '').encode('utf-8'))
+        digest.update(b'\x01')
+    return digest.hexdigest()
+
+
+def estimate_config_bytes(config: data_structures.MappingConfiguration) -> int:
+    """Estimate the memory held by a configuration's records.
+
+    Strings are interned and shared between records, so only the record
+    objects and their containers are counted.
+    """
+    getsizeof = sys.getsizeof
+    total = getsizeof(config) + getsizeof(config.bone_mappings)
+    total += sum(getsizeof(m) for m in config.bone_mappings.values())
+    for records in (config.unmapped_bones, config.weight_repair_strategies, config.weight_rules):
+        total += getsizeof(records) + len(records) * 150
+    total += sum(getsizeof(bones) for bones in config.ik_chains.values())
+    total += sum(getsizeof(bones) for bones in config.bone_groups.values())
+    return total
+
+
+class MappingSession:
+    """A configuration plus its lazily derived indexes.
+
+    Attributes:
+        key: (armature key, skeleton fingerprint) this session is stored under
+        config: The mapping configuration
+    """
+
+    __slots__ = ('key', 'config', '_validator', '_weight_stats', '_size')
+
+    def __init__(self, key: SessionKey, config: data_structures.MappingConfiguration):
+        self.key = key
+        self.config = config
+        self._validator = None
+        self._weight_stats = None
+        self._size = None
+
+    @property
+    def validator(self) -> validation.IncrementalValidator:
+        """Incremental validator for this configuration (built on first use)."""
+        if self._validator is None:
+            self._validator = validation.IncrementalValidator(self.config)
+        return self._validator
+
+    def ensure_validator(self) -> validation.IncrementalValidator:
+        """Build the validator now instead of on the next edit."""
+        return self.validator
+
+    @property
+    def weight_stats(self) -> Dict[str, Any]:
+        """Weight statistics derived from the configuration (cached)."""
+        if self._weight_stats is None:
+            config = self.config
+            vertex_groups, weight_percentage = config.count_affected_vertices_from_unmapped()
+            rules_by_type: Dict[str, int] = {}
+            for rule in config.weight_rules:
+                rules_by_type[rule.rule_type] = rules_by_type.get(rule.rule_type, 0) + 1
+            self._weight_stats = {
+                'unmapped_count': config.count_unmapped_bones(),
+                'unmapped_vertex_groups': vertex_groups,
+                'unmapped_weight_percentage': weight_percentage,
+                'rule_count': len(config.weight_rules),
+                'rules_by_type': rules_by_type,
+            }
+        return self._weight_stats
+
+    def invalidate(self) -> None:
+        """Drop derived indexes after the configuration was changed wholesale."""
+        self._validator = None
+        self._weight_stats = None
+        self._size = None
+
+    @property
+    def size_bytes(self) -> int:
+        """Estimated memory held by this session."""
+        if self._size is None:
+            self._size = estimate_config_bytes(self.config)
+        size = self._size
+        if self._validator is not None:
+            size += len(self.config.bone_mappings) * _VALIDATOR_BYTES_PER_BONE
+        return size
+
+
+class SessionStore:
+    """LRU of mapping sessions keyed by (armature key, skeleton fingerprint).
+
+    Usage:
+        store = SessionStore()
+        store.put(armature_key, fingerprint, config)
+        session = store.get(armature_key, fingerprint)
+    """
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 memory_cap: int = DEFAULT_MEMORY_CAP):
+        self.max_sessions = max_sessions
+        self.memory_cap = memory_cap
+        self._sessions: 'OrderedDict[SessionKey, MappingSession]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, key: SessionKey) -> bool:
+        return key in self._sessions
+
+    def put(self, armature_key: Hashable, fingerprint: str,
+            config: data_structures.MappingConfiguration) -> MappingSession:
+        """Store a configuration for an armature, replacing any previous one.
+
+        Sessions for the same armature with a different fingerprint are kept:
+        they belong to an earlier state of the skeleton and are only reused if
+        the skeleton returns to that state.
+        """
+        key = (armature_key, fingerprint)
+        session = MappingSession(key, config)
+        self._sessions.pop(key, None)
+        self._sessions[key] = session
+        self._evict()
+        return session
+
+    def get(self, armature_key: Hashable, fingerprint: Optional[str] = None) -> Optional[MappingSession]:
+        """Return the session for an armature.
+
+        An exact (armature, fingerprint) match is preferred. Otherwise the most
+        recently used session of the same armature is returned and re-keyed to
+        the new fingerprint: pipeline stages rename and add bones, which changes
+        the fingerprint but not the configuration that drives them.
+
+        Args:
+            armature_key: Identity of the armature object
+            fingerprint: Current skeleton fingerprint (None = any)
+        """
+        if fingerprint is not None:
+            session = self._sessions.get((armature_key, fingerprint))
+            if session is not None:
+                self._sessions.move_to_end(session.key)
+                return session
+
+        session = self.latest(armature_key)
+        if session is None:
+            return None
+
+        if fingerprint is not None:
+            del self._sessions[session.key]
+            session.key = (armature_key, fingerprint)
+            self._sessions.pop(session.key, None)
+            self._sessions[session.key] = session
+        else:
+            self._sessions.move_to_end(session.key)
+        self._evict()
+        return session
+
+    def latest(self, armature_key: Optional[Hashable] = None) -> Optional[MappingSession]:
+        """Return the most recently used session (optionally of one armature)."""
+        for key in reversed(self._sessions):
+            if armature_key is None or key[0] == armature_key:
+                return self._sessions[key]
+        return None
+
+    def discard(self, armature_key: Hashable) -> int:
+        """Remove all sessions of an armature. Returns the number removed."""
+        keys = [key for key in self._sessions if key[0] == armature_key]
+        for key in keys:
+            del self._sessions[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._sessions.clear()
+
+    def sessions(self):
+        """Iterate sessions from least to most recently used."""
+        return iter(self._sessions.values())
+
+    def total_bytes(self) -> int:
+        return sum(session.size_bytes for session in self._sessions.values())
+
+    def _evict(self) -> None:
+        sessions = self._sessions
+        while len(sessions) > 1 and (
+            len(sessions) > self.max_sessions or self.total_bytes() > self.memory_cap
+        ):
+            sessions.popitem(last=False)
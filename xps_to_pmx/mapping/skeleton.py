@@ -0,0 +1,300 @@
+"""Memoized, read-only index of the MMD standard skeleton.
+
+``mmd_standard_skeleton.json`` is the source of truth for the MMD bone
+hierarchy. It is parsed once and kept until the file's mtime changes, and the
+tree structure (children, depth, roots, topological order) is precomputed so
+that UI panels and pipeline stages never have to scan the bone list.
+
+This module only depends on the standard library so it can also be loaded by
+standalone scripts outside Blender.
+"""
+
+import json
+import os
+import re
+from collections import deque
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+SKELETON_PRESET_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    'presets',
+    'mmd_standard_skeleton.json'
+)
+
+# Try UTF-8 first, then UTF-8-sig (with BOM), then fall back to cp1252 for Windows
+_ENCODINGS = ('utf-8', 'utf-8-sig', 'cp1252')
+
+# path -> (mtime_ns, MMDSkeleton)
+_CACHE: Dict[str, Tuple[int, 'MMDSkeleton']] = {}
+
+# Bones needed to rebuild the trunk of the skeleton
+CRITICAL_BONES = frozenset({
+    'センター', 'グルーブ', '腰', '下半身', '上半身',
+    '上半身1', '上半身2', '首', '首1', '頭'
+})
+
+
+def bone_categories(bone_name: str, bone_def) -> Tuple[str, ...]:
+    """Categories of a standard bone used for coverage masks.
+
+    Returns any of ``finger``, ``twist``, ``d_series``, ``ik`` and ``critical``.
+    """
+    categories = []
+    bone_type = bone_def.get('bone_type')
+    if '指' in bone_name or bone_type == 'finger':
+        categories.append('finger')
+    if '捩' in bone_name or bone_type == 'twist':
+        categories.append('twist')
+    if bone_type == 'd_bone' or re.search(r'D(\.[LR])?$', bone_name):
+        categories.append('d_series')
+    if bone_type == 'ik' or 'IK' in bone_name or 'ＩＫ' in bone_name:
+        categories.append('ik')
+    if bone_name in CRITICAL_BONES:
+        categories.append('critical')
+    return tuple(categories)
+
+
+class MMDSkeleton(Mapping):
+    """Frozen MMD standard skeleton with precomputed tree indexes.
+
+    Behaves like a read-only ``{bone_name: bone_def}`` mapping, so existing
+    callers that use ``.get()``, ``.items()`` or ``in`` keep working.
+
+    Attributes:
+        bones: Read-only mapping of bone name -> read-only bone definition
+        roots: Root bone names (no parent, or parent not in skeleton), sorted
+        children: Bone name -> tuple of child names, sorted
+        depth: Bone name -> depth from its root (roots are 0)
+        order: All bone names in topological order (parents before children)
+        sorted_names: All bone names sorted alphabetically
+        bit: Bone name -> fixed bit position (file order) for presence bitsets
+        full_mask: Bitset with every standard bone set
+        type_masks: ``bone_type`` -> bitset of its bones
+        category_masks: Category (see ``bone_categories``) -> bitset, every
+            category present even when empty
+    """
+
+    __slots__ = ('bones', 'roots', 'children', 'depth', 'order', 'sorted_names',
+                 'name', 'version', 'bit', 'full_mask', 'type_masks', 'category_masks')
+
+    def __init__(self, bones: Dict[str, Dict[str, Any]], name: str = "", version: str = ""):
+        frozen = {
+            str(bone_name): MappingProxyType(dict(bone_def))
+            for bone_name, bone_def in bones.items()
+        }
+
+        children: Dict[str, list] = {bone_name: [] for bone_name in frozen}
+        roots = []
+        for bone_name, bone_def in frozen.items():
+            parent = bone_def.get('parent_mmd')
+            if parent is None or parent not in frozen or parent == bone_name:
+                roots.append(bone_name)
+            else:
+                children[parent].append(bone_name)
+
+        roots.sort()
+        children_sorted = {k: tuple(sorted(v)) for k, v in children.items()}
+
+        # Breadth-first walk from the roots gives parents-before-children order
+        depth: Dict[str, int] = {}
+        order = []
+        queue = list(roots)
+        for bone_name in queue:
+            depth.setdefault(bone_name, 0)
+        head = 0
+        while head < len(queue):
+            bone_name = queue[head]
+            head += 1
+            order.append(bone_name)
+            for child in children_sorted[bone_name]:
+                if child in depth:
+                    continue
+                depth[child] = depth[bone_name] + 1
+                queue.append(child)
+
+        # Bones caught in a parent cycle are unreachable from any root
+        for bone_name in sorted(frozen):
+            if bone_name not in depth:
+                depth[bone_name] = 0
+                order.append(bone_name)
+
+        object.__setattr__(self, 'bones', MappingProxyType(frozen))
+        object.__setattr__(self, 'roots', tuple(roots))
+        object.__setattr__(self, 'children', MappingProxyType(children_sorted))
+        object.__setattr__(self, 'depth', MappingProxyType(depth))
+        object.__setattr__(self, 'order', tuple(order))
+        object.__setattr__(self, 'sorted_names', tuple(sorted(frozen)))
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'version', version)
+
+        # Fixed bone index: bit i is the i-th bone of the file
+        bit = {bone_name: i for i, bone_name in enumerate(frozen)}
+        type_masks: Dict[str, int] = {}
+        category_masks = {key: 0 for key in ('finger', 'twist', 'd_series', 'ik', 'critical')}
+        for bone_name, bone_def in frozen.items():
+            flag = 1 << bit[bone_name]
+            bone_type = bone_def.get('bone_type', 'unknown')
+            type_masks[bone_type] = type_masks.get(bone_type, 0) | flag
+            for category in bone_categories(bone_name, bone_def):
+                category_masks[category] |= flag
+        object.__setattr__(self, 'bit', MappingProxyType(bit))
+        object.__setattr__(self, 'full_mask', (1 << len(bit)) - 1)
+        object.__setattr__(self, 'type_masks', MappingProxyType(type_masks))
+        object.__setattr__(self, 'category_masks', MappingProxyType(category_masks))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("MMDSkeleton is immutable")
+
+    def __getitem__(self, bone_name: str):
+        return self.bones[bone_name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.bones)
+
+    def __len__(self) -> int:
+        return len(self.bones)
+
+    def __contains__(self, bone_name) -> bool:
+        return bone_name in self.bones
+
+    def parent_of(self, bone_name: str) -> Optional[str]:
+        """Return the MMD parent of a bone (None for roots and unknown bones)."""
+        bone_def = self.bones.get(bone_name)
+        return bone_def.get('parent_mmd') if bone_def else None
+
+    def presence_mask(self, bone_names: Iterable[str]) -> int:
+        """Bitset of the standard bones found in ``bone_names``."""
+        bit = self.bit
+        mask = 0
+        for bone_name in bone_names:
+            i = bit.get(bone_name)
+            if i is not None:
+                mask |= 1 << i
+        return mask
+
+    def names_in(self, mask: int) -> List[str]:
+        """Bone names of the set bits of ``mask``, in file order."""
+        names = []
+        for bone_name, i in self.bit.items():
+            if mask >> i & 1:
+                names.append(bone_name)
+        return names
+
+
+def topological_order(names: Iterable[str], parent_of: Callable[[str], Optional[str]]) \
+        -> Tuple[List[str], List[List[str]]]:
+    """Order bones parents-first with Kahn's algorithm.
+
+    Only parent links between the given bones are constraints; a parent that
+    is not in ``names`` (already existing, unknown or None) is treated as
+    satisfied. When bones form a parent cycle, the cycle is reported and broken
+    at its first bone, which is then ordered as if it had no parent.
+
+    Args:
+        names: Bones to order (input order is kept among independent bones)
+        parent_of: Bone name -> parent name (or None)
+
+    Returns:
+        (order, cycles): every bone exactly once, and each cycle as a list of
+        bones from child to parent; ``cycle[0]`` is the bone whose parent link
+        was ignored
+    """
+    names = list(dict.fromkeys(names))
+    members = set(names)
+    children: Dict[str, List[str]] = {}
+    pending: Dict[str, int] = {}
+    parent: Dict[str, str] = {}
+    for bone_name in names:
+        parent_name = parent_of(bone_name)
+        if parent_name in members and parent_name != bone_name:
+            parent[bone_name] = parent_name
+            children.setdefault(parent_name, []).append(bone_name)
+            pending[bone_name] = 1
+
+    order: List[str] = []
+    placed = set()
+    queue = deque(name for name in names if name not in pending)
+
+    def drain():
+        while queue:
+            bone_name = queue.popleft()
+            order.append(bone_name)
+            placed.add(bone_name)
+            for child in children.get(bone_name, ()):
+                if pending.pop(child, None) is not None:
+                    queue.append(child)
+
+    drain()
+
+    # Every bone left over is on a cycle or hangs below one (each bone has at
+    # most one parent). Walk up to find the cycle, break it, and continue.
+    cycles: List[List[str]] = []
+    for start in names:
+        if start in placed:
+            continue
+        path: List[str] = []
+        seen: Dict[str, int] = {}
+        bone_name = start
+        while bone_name not in seen:
+            seen[bone_name] = len(path)
+            path.append(bone_name)
+            bone_name = parent[bone_name]
+        cycle = path[seen[bone_name]:]
+        cycles.append(cycle)
+        pending.pop(cycle[0], None)
+        queue.append(cycle[0])
+        drain()
+
+    return order, cycles
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    for encoding in _ENCODINGS:
+        try:
+            with open(path, 'r', encoding=encoding) as f:
+                return json.load(f)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            continue
+    return None
+
+
+def load_mmd_skeleton(path: Optional[str] = None) -> Optional[MMDSkeleton]:
+    """Return the MMD standard skeleton, re-reading the file only if it changed.
+
+    Args:
+        path: Skeleton JSON path (defaults to the bundled preset)
+
+    Returns:
+        Cached MMDSkeleton, or None if the file cannot be read
+    """
+    path = path or SKELETON_PRESET_PATH
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError as e:
+        print(f"Error loading MMD skeleton: {e}")
+        _CACHE.pop(path, None)
+        return None
+
+    cached = _CACHE.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    data = _read_json(path)
+    if data is None:
+        print(f"Error loading MMD skeleton: unable to decode {path}")
+        return None
+
+    skeleton = MMDSkeleton(
+        data.get('bones', {}),
+        name=data.get('name', ""),
+        version=data.get('version', ""),
+    )
+    _CACHE[path] = (mtime, skeleton)
+    return skeleton
+
+
+def clear_cache() -> None:
+    """Drop all cached skeletons (the next load re-reads from disk)."""
+    _CACHE.clear()
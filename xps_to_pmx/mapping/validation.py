@@ -0,0 +1,283 @@
+"""Incremental validation of a MappingConfiguration during interactive editing.
+
+``MappingConfiguration.validate()`` and ``detection.validate_parent_relationships``
+re-check the whole configuration. The editor changes one mapping at a time, so
+this module keeps the indexes needed to re-validate only the edited bone and
+its neighbours:
+
+- MMD name -> XPS names mapped to it
+- XPS parent -> XPS children
+- MMD name -> IK chain / bone group / weight rule references
+
+Each edit then costs O(degree) instead of O(bones).
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from . import data_structures
+
+
+class IncrementalValidator:
+    """Keeps a cached ValidationResult in sync with single-bone edits.
+
+    Usage:
+        validator = IncrementalValidator(config)
+        mapping.mmd_name = "左腕"
+        validator.update_bone(mapping.xps_name)
+        validator.result          # ValidationResult (parent issues)
+        validator.bone_results    # per-bone results, same format as
+                                  # detection.validate_parent_relationships
+        validator.status()        # same format as config.validation_status
+
+    Attributes:
+        config: The configuration being validated
+        result: Cached ValidationResult for parent relationships
+        bone_results: XPS name -> per-bone parent validation dict
+    """
+
+    def __init__(self, config: data_structures.MappingConfiguration):
+        self.config = config
+        self.rebuild()
+
+    # ─── Full (re)build ──────────────────────────────────────────────────────
+
+    def rebuild(self) -> None:
+        """Rebuild all indexes and results from scratch (O(bones))."""
+        mappings = self.config.bone_mappings
+
+        self._mmd_of: Dict[str, str] = {}
+        self._parent_of: Dict[str, Optional[str]] = {}
+        self._mmd_to_xps: Dict[str, Set[str]] = {}
+        self._children: Dict[str, Set[str]] = {}
+        self._refs: Dict[str, List[Tuple[Any, str]]] = {}
+        self._errors: Dict[Any, str] = {}
+        self._messages: Dict[str, str] = {}
+        self._messages_dirty = True
+
+        self.result = data_structures.ValidationResult()
+        self.bone_results: Dict[str, dict] = {}
+
+        for xps_name, mapping_obj in mappings.items():
+            self._index_bone(xps_name, mapping_obj)
+
+        self._build_reference_checks()
+
+        for xps_name in mappings:
+            self._check_bone(xps_name)
+
+    def _index_bone(self, xps_name: str, mapping_obj) -> None:
+        mmd_name = mapping_obj.mmd_name
+        parent_xps = mapping_obj.parent_xps
+        self._mmd_of[xps_name] = mmd_name
+        self._parent_of[xps_name] = parent_xps
+        if mmd_name:
+            self._mmd_to_xps.setdefault(mmd_name, set()).add(xps_name)
+        if parent_xps:
+            self._children.setdefault(parent_xps, set()).add(xps_name)
+
+    def _unindex_bone(self, xps_name: str) -> None:
+        mmd_name = self._mmd_of.pop(xps_name, None)
+        parent_xps = self._parent_of.pop(xps_name, None)
+        if mmd_name:
+            owners = self._mmd_to_xps.get(mmd_name)
+            if owners is not None:
+                owners.discard(xps_name)
+                if not owners:
+                    del self._mmd_to_xps[mmd_name]
+        if parent_xps:
+            siblings = self._children.get(parent_xps)
+            if siblings is not None:
+                siblings.discard(xps_name)
+                if not siblings:
+                    del self._children[parent_xps]
+
+    def _build_reference_checks(self) -> None:
+        """Index IK chain / bone group / weight rule references by MMD name.
+
+        Structural errors that do not depend on any bone's MMD name (empty
+        chains or groups, missing rule source bones) are evaluated once here.
+        """
+        config = self.config
+
+        for chain_name, bones in config.ik_chains.items():
+            if not bones:
+                self._errors[('ik_empty', chain_name)] = f"IK chain '{chain_name}' is empty"
+            for bone in bones:
+                self._add_ref(bone, ('ik', chain_name, bone),
+                              f"IK chain '{chain_name}' references unmapped bone '{bone}'")
+
+        for group_name, bones in config.bone_groups.items():
+            if not bones:
+                self._errors[('group_empty', group_name)] = f"Bone group '{group_name}' is empty"
+            for bone in bones:
+                self._add_ref(bone, ('group', group_name, bone),
+                              f"Bone group '{group_name}' references unmapped bone '{bone}'")
+
+        for i, rule in enumerate(config.weight_rules):
+            if rule.source_bone and rule.source_bone not in config.bone_mappings:
+                self._errors[('rule_source', i)] = \
+                    f"Weight rule references unmapped source bone '{rule.source_bone}'"
+            self._add_ref(rule.target_bone, ('rule_target', i),
+                          f"Weight rule references unmapped target bone '{rule.target_bone}'")
+
+    def _add_ref(self, mmd_name: str, key: Any, message: str) -> None:
+        self._refs.setdefault(mmd_name, []).append((key, message))
+        self._check_refs(mmd_name)
+
+    # ─── Incremental updates ─────────────────────────────────────────────────
+
+    def update_bone(self, xps_name: str) -> None:
+        """Re-validate after a change to one mapping (mmd_name / parent / unmapped flag).
+
+        Only the bone itself, its XPS children and the references to its old
+        and new MMD names are re-checked.
+        """
+        mapping_obj = self.config.bone_mappings.get(xps_name)
+        old_mmd = self._mmd_of.get(xps_name)
+        self._unindex_bone(xps_name)
+
+        if mapping_obj is None:
+            self._clear_bone(xps_name)
+        else:
+            self._index_bone(xps_name, mapping_obj)
+            self._check_bone(xps_name)
+
+        # Children compare their parent_mmd against this bone's MMD name
+        for child in self._children.get(xps_name, ()):
+            self._check_bone(child)
+
+        new_mmd = self._mmd_of.get(xps_name)
+        if old_mmd != new_mmd:
+            if old_mmd:
+                self._check_refs(old_mmd)
+            if new_mmd:
+                self._check_refs(new_mmd)
+
+    def update_bones(self, xps_names) -> None:
+        """Re-validate after several mappings were changed together."""
+        for xps_name in xps_names:
+            self.update_bone(xps_name)
+
+    def _check_refs(self, mmd_name: str) -> None:
+        is_mapped = mmd_name in self._mmd_to_xps
+        for key, message in self._refs.get(mmd_name, ()):
+            if is_mapped:
+                self._errors.pop(key, None)
+            else:
+                self._errors[key] = message
+
+    def _clear_bone(self, xps_name: str) -> None:
+        self.bone_results.pop(xps_name, None)
+        self.result.parent_issues.pop(xps_name, None)
+        self._errors.pop(('parent', xps_name), None)
+        if self._messages.pop(xps_name, None) is not None:
+            self._messages_dirty = True
+
+    def _check_bone(self, xps_name: str) -> None:
+        """Validate one bone's parent relationship (same rules as the full validators)."""
+        mappings = self.config.bone_mappings
+        mapping_obj = mappings.get(xps_name)
+        if mapping_obj is None:
+            self._clear_bone(xps_name)
+            return
+
+        parent_xps = mapping_obj.parent_xps
+        bone_result = {
+            'is_valid': True,
+            'parent_xps': parent_xps,
+            'parent_mmd_expected': None,
+            'parent_mmd_actual': mapping_obj.parent_mmd,
+            'message': '✓ Parent relationship correct'
+        }
+        issue = None
+
+        if parent_xps and parent_xps in mappings:
+            expected_parent_mmd = mappings[parent_xps].mmd_name
+            bone_result['parent_mmd_expected'] = expected_parent_mmd
+            if mapping_obj.parent_mmd != expected_parent_mmd:
+                bone_result['is_valid'] = False
+                bone_result['message'] = \
+                    f"⚠️ Parent mismatch: expected '{expected_parent_mmd}', got '{mapping_obj.parent_mmd}'"
+                issue = {
+                    'parent_xps': parent_xps,
+                    'parent_mmd_expected': expected_parent_mmd,
+                    'parent_mmd_actual': mapping_obj.parent_mmd,
+                    'message': f"Parent mismatch: expected '{expected_parent_mmd}', got '{mapping_obj.parent_mmd}'"
+                }
+                short = f"⚠️ {xps_name}: {issue['message']}"
+        elif parent_xps:
+            bone_result['is_valid'] = False
+            bone_result['message'] = f"⚠️ Parent XPS bone '{parent_xps}' not found in mapping"
+            issue = {
+                'parent_xps': parent_xps,
+                'message': f"Parent XPS bone '{parent_xps}' not found in mapping"
+            }
+            short = f"⚠️ {xps_name}: Parent bone not found"
+        else:
+            bone_result['message'] = '✓ Root bone (no parent)'
+
+        self.bone_results[xps_name] = bone_result
+
+        # Unmapped bones are listed but excluded from the configuration result
+        if issue is not None and not mapping_obj.is_unmapped:
+            self.result.parent_issues[xps_name] = issue
+            self._errors[('parent', xps_name)] = issue['message']
+            if self._messages.get(xps_name) != short:
+                self._messages[xps_name] = short
+                self._messages_dirty = True
+        else:
+            self.result.parent_issues.pop(xps_name, None)
+            self._errors.pop(('parent', xps_name), None)
+            if self._messages.pop(xps_name, None) is not None:
+                self._messages_dirty = True
+
+        self.result.is_valid = not self.result.parent_issues
+
+    # ─── Queries ─────────────────────────────────────────────────────────────
+
+    def get_result(self) -> data_structures.ValidationResult:
+        """Return the cached parent-relationship ValidationResult."""
+        if self._messages_dirty:
+            self.result.messages = list(self._messages.values())
+            self._messages_dirty = False
+        return self.result
+
+    def xps_for_mmd(self, mmd_name: str) -> Optional[str]:
+        """Return an XPS bone currently mapped to ``mmd_name`` (None if none)."""
+        owners = self._mmd_to_xps.get(mmd_name)
+        if not owners:
+            return None
+        if len(owners) == 1:
+            return next(iter(owners))
+        # Several XPS bones share this MMD name; keep config order for stability
+        for xps_name in self.config.bone_mappings:
+            if xps_name in owners:
+                return xps_name
+        return None
+
+    def xps_names_for_mmd(self, mmd_name: str) -> Set[str]:
+        """Return all XPS bones currently mapped to ``mmd_name``."""
+        return set(self._mmd_to_xps.get(mmd_name, ()))
+
+    def children_of(self, xps_name: str) -> Set[str]:
+        """Return the XPS children of an XPS bone."""
+        return set(self._children.get(xps_name, ()))
+
+    @property
+    def is_valid(self) -> bool:
+        return not self._errors
+
+    @property
+    def error_count(self) -> int:
+        return len(self._errors)
+
+    def iter_errors(self) -> Iterator[str]:
+        return iter(self._errors.values())
+
+    def status(self) -> Dict[str, Any]:
+        """Return a dict in the same format as ``config.validation_status``."""
+        return {
+            'is_valid': self.is_valid,
+            'error_count': self.error_count,
+            'errors': list(self._errors.values())
+        }
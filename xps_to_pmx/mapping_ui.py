@@ -7,6 +7,7 @@ Panels:
 4. VALIDATION & PREVIEW - Validate configuration and preview results
 """
 
+import os
 import bpy
 from bpy.types import Panel, Operator, PropertyGroup
 from bpy.props import StringProperty, FloatProperty, IntProperty, BoolProperty, PointerProperty
@@ -14,13 +15,94 @@ from typing import Optional
 
 from . import mapping
 
-# Global storage for mapping configuration (since Scene properties are read-only)
+# Global storage for mapping sessions (since Scene properties are read-only).
+# One configuration per armature, so several models can be edited in one scene.
 _GLOBAL_CONFIG = {
-    'config': None,
-    'current_armature': None
+    'sessions': mapping.session.SessionStore(),
 }
 
 
+def armature_key(armature):
+    """Identity of an armature object for the session store."""
+    return armature.session_uid
+
+
+def armature_fingerprint(armature) -> str:
+    """Fingerprint of an armature's current bone hierarchy."""
+    return mapping.session.skeleton_fingerprint(
+        (bone.name, bone.parent.name if bone.parent else None)
+        for bone in armature.data.bones
+    )
+
+
+def resolve_armature(context=None):
+    """Return the armature the user is working on.
+
+    The active object if it is an armature, otherwise the armature deforming
+    (or parenting) the active mesh. None if there is no such armature.
+    """
+    context = context or bpy.context
+    obj = context.active_object
+    if obj is None:
+        return None
+    if obj.type == 'ARMATURE':
+        return obj
+    if obj.type == 'MESH':
+        armature = obj.find_armature()
+        if armature is not None:
+            return armature
+    if obj.parent is not None and obj.parent.type == 'ARMATURE':
+        return obj.parent
+    return None
+
+
+def get_session(context=None, armature=None, check_fingerprint=False):
+    """Return the mapping session of an armature.
+
+    Args:
+        context: Blender context (defaults to bpy.context)
+        armature: Armature object (defaults to the active armature)
+        check_fingerprint: Match the current skeleton fingerprint. Pipeline
+            stages use this; UI panels skip it because hashing the skeleton
+            on every redraw is wasteful.
+
+    Returns:
+        MappingSession, or None if no armature resolves or it has no
+        configuration (callers then show the "run Stage 0" state).
+    """
+    store = _GLOBAL_CONFIG['sessions']
+    armature = armature or resolve_armature(context)
+    if armature is None:
+        return None
+    fingerprint = armature_fingerprint(armature) if check_fingerprint else None
+    return store.get(armature_key(armature), fingerprint)
+
+
+def get_config(context=None, armature=None, check_fingerprint=False):
+    """Return the MappingConfiguration of an armature (see get_session)."""
+    session = get_session(context, armature, check_fingerprint)
+    return session.config if session is not None else None
+
+
+def set_config(armature, config):
+    """Store a configuration as the armature's current mapping session."""
+    return _GLOBAL_CONFIG['sessions'].put(
+        armature_key(armature), armature_fingerprint(armature), config
+    )
+
+
+def get_validator(config=None) -> Optional[mapping.validation.IncrementalValidator]:
+    """Return the incremental validator for a config (built lazily per session)."""
+    if config is None:
+        session = get_session()
+        return session.validator if session is not None else None
+    for session in _GLOBAL_CONFIG['sessions'].sessions():
+        if session.config is config:
+            return session.validator
+    # Config not held by any session (e.g. evicted): validate without caching
+    return mapping.validation.IncrementalValidator(config)
+
+
 class XPSToPMXMapperProperties(PropertyGroup):
     """Property group for storing mapping editor state."""
 
@@ -102,9 +184,8 @@ class XPSPMX_OT_auto_map_bones(Operator):
         # Auto-detect and create configuration with the fresh preset
         config = mapping.detection.auto_map_bones(armature, reference_config=reference_config)
 
-        # Store configuration in global storage
-        _GLOBAL_CONFIG['config'] = config
-        _GLOBAL_CONFIG['current_armature'] = armature
+        # Store configuration as this armature's session
+        set_config(armature, config)
 
         mapped_count = len(config.bone_mappings)
         self.report({'INFO'}, f"Mapped {mapped_count} bones")
@@ -113,7 +194,7 @@ class XPSPMX_OT_auto_map_bones(Operator):
 
 
 class XPSPMX_OT_save_mapping_config(Operator):
-    """Save mapping configuration to JSON file."""
+    """Save mapping configuration to JSON (or compact binary) file."""
     bl_idname = "xpspmx_mapper.save_config"
     bl_label = "Save Configuration"
 
@@ -124,18 +205,28 @@ class XPSPMX_OT_save_mapping_config(Operator):
     )
 
     filter_glob: StringProperty(
-        default="*.json",
+        default="*.json;*.xpmc",
         options={'HIDDEN'}
     )
 
+    use_binary: BoolProperty(
+        name="Binary Format",
+        description="Save in the compact binary format (.xpmc), much faster for large configurations",
+        default=False
+    )
+
     def execute(self, context):
-        config = _GLOBAL_CONFIG['config']
+        config = get_config(context)
         if config is None:
             self.report({'ERROR'}, "No configuration to save")
             return {'CANCELLED'}
 
         try:
-            config.save_to_file(self.filepath)
+            binary_ext = mapping.binary_format.BINARY_EXTENSION
+            binary = self.use_binary or self.filepath.lower().endswith(binary_ext)
+            if self.use_binary and not self.filepath.lower().endswith(binary_ext):
+                self.filepath = os.path.splitext(self.filepath)[0] + binary_ext
+            config.save_to_file(self.filepath, binary=binary)
             self.report({'INFO'}, f"Configuration saved to {self.filepath}")
             return {'FINISHED'}
         except Exception as e:
@@ -148,7 +239,7 @@ class XPSPMX_OT_save_mapping_config(Operator):
 
 
 class XPSPMX_OT_load_mapping_config(Operator):
-    """Load mapping configuration from JSON file."""
+    """Load mapping configuration from JSON or binary file (auto-detected)."""
     bl_idname = "xpspmx_mapper.load_config"
     bl_label = "Load Configuration"
 
@@ -159,14 +250,19 @@ class XPSPMX_OT_load_mapping_config(Operator):
     )
 
     filter_glob: StringProperty(
-        default="*.json",
+        default="*.json;*.xpmc",
         options={'HIDDEN'}
     )
 
     def execute(self, context):
+        armature = resolve_armature(context)
+        if armature is None:
+            self.report({'ERROR'}, "Please select an armature")
+            return {'CANCELLED'}
+
         try:
             config = mapping.data_structures.MappingConfiguration.load_from_file(self.filepath)
-            _GLOBAL_CONFIG['config'] = config
+            set_config(armature, config)
             self.report({'INFO'}, f"Configuration loaded from {self.filepath}")
             return {'FINISHED'}
         except Exception as e:
@@ -216,7 +312,7 @@ class XPSPMX_PT_auto_detection(Panel):
             layout.label(text=props.auto_detect_result)
 
         # Show mapping status
-        config = _GLOBAL_CONFIG['config']
+        config = get_config(context)
         if config is not None:
             layout.label(text=f"Mapped {len(config.bone_mappings)} bones")
 
@@ -234,13 +330,13 @@ class XPSPMX_PT_mapping_editor(Panel):
         scene = context.scene
         props = scene.xpspmx_mapper_props
 
-        config = _GLOBAL_CONFIG['config']
+        config = get_config(context)
         if config is None:
             layout.label(text="Run 'Auto Map Bones' first", icon='ERROR')
             return
 
-        # Validate parent relationships
-        parent_validation = mapping.detection.validate_parent_relationships(config)
+        # Parent relationships (kept up to date incrementally by the editor)
+        parent_validation = get_validator(config).bone_results
 
         # Search
         layout.label(text="Filter by Name:")
@@ -384,6 +480,13 @@ class XPSPMX_PT_bone_detection(Panel):
                 row = layout.row()
                 row.label(text=f"  ... and {len(missing_critical) - 5} more")
 
+        by_category = summary.get('missing_by_category', {})
+        if any(by_category.get(key) for key in ('finger', 'twist', 'd_series', 'ik')):
+            layout.label(
+                text=(f"Finger {len(by_category['finger'])} · Twist {len(by_category['twist'])} · "
+                      f"D {len(by_category['d_series'])} · IK {len(by_category['ik'])}"),
+                icon='INFO')
+
         # Show missing bones by category
         layout.separator()
         layout.label(text="Missing by Category:")
@@ -425,12 +528,12 @@ class XPSPMX_OT_confirm_missing_bones(Operator):
         missing_details = mapping.detection.detect_missing_mmd_bones(armature)
         missing_bones = {name: details for name, details in missing_details.items() if details['is_missing']}
 
-        # Store in global config for Stage 1
-        if _GLOBAL_CONFIG['config'] is None:
+        # Store in the armature's config for Stage 1
+        config = get_config(context, armature)
+        if config is None:
             self.report({'ERROR'}, "No mapping configuration. Run Auto Map Bones first.")
             return {'CANCELLED'}
 
-        config = _GLOBAL_CONFIG['config']
         config.missing_mmd_bones = missing_bones
 
         total_missing = len(missing_bones)
@@ -451,7 +554,7 @@ class XPSPMX_PT_weight_rules(Panel):
         layout = self.layout
         scene = context.scene
 
-        config = _GLOBAL_CONFIG['config']
+        config = get_config(context)
         if config is None:
             layout.label(text="Run 'Auto Map Bones' first", icon='ERROR')
             return
@@ -484,15 +587,26 @@ class XPSPMX_PT_validation_preview(Panel):
         layout = self.layout
         scene = context.scene
 
-        config = _GLOBAL_CONFIG['config']
-        if config is None:
+        session = get_session(context)
+        if session is None:
             layout.label(text="Run 'Auto Map Bones' first", icon='ERROR')
             return
+        config = session.config
 
         # Validation button
         layout.label(text="Validation:")
         layout.operator("xpspmx_mapper.validate_config", icon='CHECKMARK')
 
+        # Weight statistics (cached per session)
+        stats = session.weight_stats
+        if stats['unmapped_count']:
+            layout.label(
+                text=f"Unmapped: {stats['unmapped_count']} bones, "
+                     f"{stats['unmapped_vertex_groups']} vertex groups "
+                     f"({stats['unmapped_weight_percentage']:.1f}% weight)",
+                icon='INFO'
+            )
+
         # Show validation results
         if config.validation_status:
             is_valid = config.validation_status.get('is_valid', False)
@@ -526,13 +640,18 @@ class XPSPMX_OT_validate_config(Operator):
     bl_label = "Validate Configuration"
 
     def execute(self, context):
-        config = _GLOBAL_CONFIG['config']
-        if config is None:
+        session = get_session(context)
+        if session is None:
             self.report({'ERROR'}, "No configuration to validate")
             return {'CANCELLED'}
+        config = session.config
 
         is_valid, errors = config.validate()
 
+        # Rebuild derived indexes so later edits keep the panels live
+        session.invalidate()
+        session.ensure_validator()
+
         if is_valid:
             self.report({'INFO'}, "Configuration is valid!")
         else:
@@ -549,7 +668,7 @@ class XPSPMX_OT_start_conversion(Operator):
     bl_label = "Start Conversion"
 
     def execute(self, context):
-        config = _GLOBAL_CONFIG['config']
+        config = get_config(context)
         if config is None:
             self.report({'ERROR'}, "No configuration loaded")
             return {'CANCELLED'}
@@ -608,13 +727,27 @@ classes = [
 ]
 
 
+@bpy.app.handlers.persistent
+def _invalidate_edited_armatures(scene, depsgraph):
+    """Drop cached skeleton snapshots of armatures the user edited by hand.
+
+    The bone detection panel redraws constantly and reuses one snapshot per
+    armature; the pipeline invalidates it itself, this catches manual edits.
+    """
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Armature):
+            mapping.snapshot.invalidate(update.id.original)
+
+
 def register():
     """Register all classes and properties."""
     for cls in classes:
         bpy.utils.register_class(cls)
 
     bpy.types.Scene.xpspmx_mapper_props = PointerProperty(type=XPSToPMXMapperProperties)
-    # Configuration is stored in global _GLOBAL_CONFIG dictionary
+    if _invalidate_edited_armatures not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(_invalidate_edited_armatures)
+    # Configurations are stored per armature in _GLOBAL_CONFIG['sessions']
 
 
 def unregister():
@@ -625,6 +758,9 @@ def unregister():
     if hasattr(bpy.types.Scene, 'xpspmx_mapper_props'):
         del bpy.types.Scene.xpspmx_mapper_props
 
-    # Clear global config
-    _GLOBAL_CONFIG['config'] = None
-    _GLOBAL_CONFIG['current_armature'] = None
+    if _invalidate_edited_armatures in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_invalidate_edited_armatures)
+    mapping.snapshot.invalidate()
+
+    # Clear mapping sessions
+    _GLOBAL_CONFIG['sessions'].clear()
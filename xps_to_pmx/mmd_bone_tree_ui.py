@@ -74,44 +74,13 @@ class XPSPMXBoneTreeProperties(PropertyGroup):
     )
 
 
-def get_mmd_standard_skeleton() -> Optional[Dict]:
-    """Load MMD standard skeleton from JSON file."""
-    try:
-        import os
-        preset_path = os.path.join(
-            os.path.dirname(mapping.__file__),
-            'presets',
-            'mmd_standard_skeleton.json'
-        )
-        # Try UTF-8 first, then UTF-8-sig (with BOM), then fall back to cp1252 for Windows
-        encodings = ['utf-8', 'utf-8-sig', 'cp1252']
-        data = None
+def get_mmd_standard_skeleton() -> Optional['mapping.skeleton.MMDSkeleton']:
+    """Return the cached MMD standard skeleton (re-read only when the file changes).
 
-        for encoding in encodings:
-            try:
-                with open(preset_path, 'r', encoding=encoding) as f:
-                    data = json.load(f)
-                    break
-            except (UnicodeDecodeError, json.JSONDecodeError):
-                continue
-
-        if data is None:
-            print(f"Error loading MMD skeleton: unable to decode {preset_path}")
-            return None
-
-        # Ensure all bone names are proper UTF-8 strings
-        bones = data.get('bones', {})
-        cleaned_bones = {}
-        for bone_name, bone_def in bones.items():
-            # Ensure bone name is a proper string
-            if isinstance(bone_name, bytes):
-                bone_name = bone_name.decode('utf-8', errors='replace')
-            cleaned_bones[str(bone_name)] = bone_def
-
-        return cleaned_bones
-    except Exception as e:
-        print(f"Error loading MMD skeleton: {e}")
-        return None
+    The result behaves like a read-only ``{bone_name: bone_def}`` dict and also
+    carries precomputed ``roots`` / ``children`` / ``depth`` / ``order`` indexes.
+    """
+    return mapping.skeleton.load_mmd_skeleton()
 
 
 def get_bone_icon(bone_type: str) -> str:
@@ -234,7 +203,7 @@ class XPSPMX_OT_expand_all(Operator):
 
     def execute(self, context):
         from . import mapping_ui
-        config = mapping_ui._GLOBAL_CONFIG.get('config')
+        config = mapping_ui.get_config(context)
         if config:
             # Add all MMD bone names to expanded set
             for mapping_obj in config.bone_mappings.values():
@@ -242,20 +211,9 @@ class XPSPMX_OT_expand_all(Operator):
                     _TREE_STATE['expanded_bones'].add(mapping_obj.mmd_name)
 
         # Also add all bones from MMD standard skeleton
-        import json
-        import os
-        preset_path = os.path.join(
-            os.path.dirname(mapping.__file__),
-            'presets',
-            'mmd_standard_skeleton.json'
-        )
-        try:
-            with open(preset_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                for mmd_name in data.get('bones', {}).keys():
-                    _TREE_STATE['expanded_bones'].add(mmd_name)
-        except:
-            pass
+        mmd_skeleton = get_mmd_standard_skeleton()
+        if mmd_skeleton is not None:
+            _TREE_STATE['expanded_bones'].update(mmd_skeleton.order)
 
         # Force UI redraw
         for area in context.screen.areas:
@@ -288,19 +246,10 @@ def _get_mmd_bones_enum(self, context) -> List[Tuple[str, str, str]]:
         if mmd_skeleton is None:
             return [("", "无法加载 MMD 骨骼", "")]
 
-        items = []
-        for bone_name in sorted(mmd_skeleton.keys()):
-            # Ensure proper UTF-8 encoding
-            try:
-                # If it's bytes, decode it
-                if isinstance(bone_name, bytes):
-                    bone_name = bone_name.decode('utf-8')
-                # Ensure it's a proper string
-                bone_name = str(bone_name)
-            except (UnicodeDecodeError, AttributeError):
-                continue
-
-            items.append((bone_name, bone_name, f"选择 {bone_name}"))
+        items = [
+            (bone_name, bone_name, f"选择 {bone_name}")
+            for bone_name in mmd_skeleton.sorted_names
+        ]
 
         return items if items else [("", "无可用骨骼", "")]
     except Exception as e:
@@ -355,7 +304,7 @@ class XPSPMX_OT_save_preset(Operator):
             return {'CANCELLED'}
 
         # Get current config
-        config = mapping_ui._GLOBAL_CONFIG.get('config')
+        config = mapping_ui.get_config(context)
         if config is None:
             self.report({'ERROR'}, "没有映射配置可保存")
             return {'CANCELLED'}
@@ -451,7 +400,7 @@ class XPSPMX_OT_edit_bone_mapping(Operator):
             return {'CANCELLED'}
 
         # Find the XPS bone that maps to this MMD bone
-        config = mapping_ui._GLOBAL_CONFIG.get('config')
+        config = mapping_ui.get_config(context)
         if config is None:
             self.report({'ERROR'}, "尚未进行骨骼自动映射")
             return {'CANCELLED'}
@@ -459,17 +408,15 @@ class XPSPMX_OT_edit_bone_mapping(Operator):
         # Load available MMD bones and store them (avoiding EnumProperty encoding issues)
         mmd_skeleton = get_mmd_standard_skeleton()
         if mmd_skeleton:
-            self._available_bones = sorted(mmd_skeleton.keys())
+            self._available_bones = list(mmd_skeleton.sorted_names)
         else:
             self.report({'ERROR'}, "无法加载 MMD 标准骨骼库")
             return {'CANCELLED'}
 
         # Find the XPS bone that maps to this MMD bone (如果有的话)
-        xps_mapping = None
-        for mapping_obj in config.bone_mappings.values():
-            if mapping_obj.mmd_name == self.mmd_bone_name:
-                xps_mapping = mapping_obj
-                break
+        validator = mapping_ui.get_validator(config)
+        xps_name = validator.xps_for_mmd(self.mmd_bone_name)
+        xps_mapping = config.bone_mappings.get(xps_name) if xps_name else None
 
         # 如果没有映射，则查找未映射的 XPS 骨骼
         if xps_mapping is None:
@@ -611,17 +558,21 @@ class XPSPMX_OT_edit_bone_mapping(Operator):
             return {'FINISHED'}
 
         # Check if new MMD bone is already mapped from another XPS bone
-        config = mapping_ui._GLOBAL_CONFIG.get('config')
+        config = mapping_ui.get_config(context)
+        validator = mapping_ui.get_validator(config) if config else None
+        edited_bones = [xps_mapping.xps_name]
         warning_msg = ""
         if config:
-            for other_mapping in config.bone_mappings.values():
-                if (other_mapping.xps_name != xps_mapping.xps_name and
-                    other_mapping.mmd_name == selected_bone):
-                    warning_msg = f"⚠️ '{selected_bone}' 已从 '{other_mapping.xps_name}' 映射，将被覆盖"
-                    # Unmap the previous bone
-                    other_mapping.mmd_name = ""
-                    other_mapping.is_unmapped = True
-                    break
+            for other_name in sorted(validator.xps_names_for_mmd(selected_bone)):
+                if other_name == xps_mapping.xps_name:
+                    continue
+                other_mapping = config.bone_mappings[other_name]
+                warning_msg = f"⚠️ '{selected_bone}' 已从 '{other_mapping.xps_name}' 映射，将被覆盖"
+                # Unmap the previous bone
+                other_mapping.mmd_name = ""
+                other_mapping.is_unmapped = True
+                edited_bones.append(other_name)
+                break
 
         # Update the mapping
         xps_mapping.mmd_name = selected_bone
@@ -636,11 +587,16 @@ class XPSPMX_OT_edit_bone_mapping(Operator):
             # Get current parent in XPS
             if xps_mapping.parent_xps and config:
                 # Find what the XPS parent maps to
-                for m in config.bone_mappings.values():
-                    if m.xps_name == xps_mapping.parent_xps:
-                        xps_mapping.parent_mmd = m.mmd_name
-                        xps_mapping.parent_match = (m.mmd_name == expected_parent)
-                        break
+                m = config.bone_mappings.get(xps_mapping.parent_xps)
+                if m is not None:
+                    xps_mapping.parent_mmd = m.mmd_name
+                    xps_mapping.parent_match = (m.mmd_name == expected_parent)
+
+        # Re-validate only the edited bones and their neighbours
+        if validator is not None:
+            validator.update_bones(edited_bones)
+            if config.validation_status:
+                config.validation_status = validator.status()
 
         # Clear editing state
         _TREE_STATE['editing_xps_mapping'] = None
@@ -682,7 +638,7 @@ class XPSPMX_PT_mmd_bone_tree(Panel):
 
         # Check if config exists
         from . import mapping_ui
-        config = mapping_ui._GLOBAL_CONFIG.get('config')
+        config = mapping_ui.get_config(context)
 
         if config is None:
             layout.label(text="⚠️ 尚未自动映射骨骼")
@@ -784,38 +740,24 @@ class XPSPMX_PT_mmd_bone_tree(Panel):
 
     def _draw_complete_tree(self, layout, mmd_skeleton: Dict, config, search_term: str, props):
         """Draw complete tree with all details."""
-        # Find root bones (parent_mmd is null)
-        root_bones = [
-            (name, bone_def)
-            for name, bone_def in mmd_skeleton.items()
-            if bone_def.get('parent_mmd') is None
-        ]
-
-        for mmd_name, bone_def in sorted(root_bones):
+        for mmd_name in mmd_skeleton.roots:
             self._draw_bone_row(
-                layout, mmd_skeleton, config, mmd_name, bone_def,
+                layout, mmd_skeleton, config, mmd_name, mmd_skeleton[mmd_name],
                 depth=0, search_term=search_term, props=props
             )
 
     def _draw_compact_tree(self, layout, mmd_skeleton: Dict, config, search_term: str, props):
         """Draw compact tree with minimal details."""
-        root_bones = [
-            (name, bone_def)
-            for name, bone_def in mmd_skeleton.items()
-            if bone_def.get('parent_mmd') is None
-        ]
-
-        for mmd_name, bone_def in sorted(root_bones):
+        for mmd_name in mmd_skeleton.roots:
             self._draw_compact_bone_row(
-                layout, mmd_skeleton, config, mmd_name, bone_def,
+                layout, mmd_skeleton, config, mmd_name, mmd_skeleton[mmd_name],
                 depth=0, search_term=search_term, props=props
             )
 
     def _draw_table_view(self, layout, mmd_skeleton: Dict, config, search_term: str, props):
         """Draw table view of all bones."""
 
-        # Sort bones by hierarchy level
-        sorted_bones = sorted(mmd_skeleton.items())
+        sorted_bones = [(name, mmd_skeleton[name]) for name in mmd_skeleton.sorted_names]
 
         # 计算显示的骨骼数
         visible_bones = []
@@ -881,11 +823,7 @@ class XPSPMX_PT_mmd_bone_tree(Panel):
             return
 
         # 获取子骨骼
-        children = [
-            (name, child_def)
-            for name, child_def in mmd_skeleton.items()
-            if child_def.get('parent_mmd') == mmd_name
-        ]
+        children = mmd_skeleton.children.get(mmd_name, ())
 
         is_expanded = (mmd_name in _TREE_STATE['expanded_bones'] or
                       (props and props.auto_expand))
@@ -936,9 +874,9 @@ class XPSPMX_PT_mmd_bone_tree(Panel):
 
         # 递归绘制子骨骼 (限制深度)
         if is_expanded and has_children and depth < MAX_DEPTH:
-            for child_name, child_def in sorted(children):
+            for child_name in children:
                 self._draw_bone_row(
-                    layout, mmd_skeleton, config, child_name, child_def,
+                    layout, mmd_skeleton, config, child_name, mmd_skeleton[child_name],
                     depth=depth + 1, search_term=search_term, props=props
                 )
 
@@ -955,11 +893,7 @@ class XPSPMX_PT_mmd_bone_tree(Panel):
                                props.show_only_deform if props else False):
             return
 
-        children = [
-            (name, child_def)
-            for name, child_def in mmd_skeleton.items()
-            if child_def.get('parent_mmd') == mmd_name
-        ]
+        children = mmd_skeleton.children.get(mmd_name, ())
 
         is_expanded = mmd_name in _TREE_STATE['expanded_bones'] or (props and props.auto_expand)
         has_children = len(children) > 0
@@ -996,9 +930,9 @@ class XPSPMX_PT_mmd_bone_tree(Panel):
 
         # 递归绘制子骨骼 (深度限制)
         if is_expanded and has_children and depth < MAX_DEPTH:
-            for child_name, child_def in sorted(children):
+            for child_name in children:
                 self._draw_compact_bone_row(
-                    layout, mmd_skeleton, config, child_name, child_def,
+                    layout, mmd_skeleton, config, child_name, mmd_skeleton[child_name],
                     depth=depth + 1, search_term=search_term, props=props
                 )
 
@@ -1065,7 +999,7 @@ class XPSPMX_PT_unmapped_bones_panel(Panel):
         scene = context.scene
 
         from . import mapping_ui
-        config = mapping_ui._GLOBAL_CONFIG.get('config')
+        config = mapping_ui.get_config(context)
 
         if config is None:
             layout.label(text="⚠️ 请先运行 'Auto Map Bones'")
@@ -1183,7 +1117,7 @@ class XPSPMX_PT_bone_detail_panel(Panel):
             return
 
         from . import mapping_ui
-        config = mapping_ui._GLOBAL_CONFIG.get('config')
+        config = mapping_ui.get_config(context)
         if config is None:
             return
 
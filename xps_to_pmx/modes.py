@@ -0,0 +1,206 @@
+"""
+Shared object-mode manager.
+统一管理 Object / Edit / Pose 模式切换：跳过冗余切换、合并嵌套请求、按阶段计数。
+
+``bpy.ops.object.mode_set`` is expensive on large rigs: leaving Edit Mode
+rebuilds every Bone from its EditBone and re-evaluates the depsgraph. Stages
+used to switch back and forth defensively (``EDIT`` → ``OBJECT`` → ``POSE`` →
+``OBJECT``) even when the next step needed the mode they had just left.
+
+Usage:
+    modes.set_mode('EDIT', armature)          # no-op if already in Edit Mode
+
+    with modes.mode(armature, 'EDIT') as arm:  # restores the previous mode
+        ...
+        with modes.mode(armature, 'EDIT'):    # nested: no switch at all
+            ...
+
+    @modes.counted("Stage 1")                 # or: with modes.stage("Stage 1"):
+    def execute(self, context):
+        with modes.batch(armature):
+            # Inside a batch, leaving a ``mode`` block does not switch back;
+            # the original mode is restored once when the batch ends, so
+            # consecutive blocks that need the same mode share one session.
+            ...
+        print(modes.format_report("Stage 1"))
+
+Every switch (and every switch that was skipped) is counted under the active
+stage label, so the saving can be measured per stage.
+"""
+
+import functools
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+try:
+    import bpy
+except ImportError:  # counters stay importable outside Blender
+    bpy = None
+
+_DEFAULT_STAGE = "其他"
+
+# Global state (module level, like the other registries in this package)
+_STATE = {
+    'stage': [],       # active stage labels (innermost last)
+    'batch': [],       # active batches: list of (object, original mode) per batch
+    'counts': {},      # stage -> {'switches': int, 'skipped': int, 'by_mode': {mode: int}}
+}
+
+
+# ─── Counters ───────────────────────────────────────────────────────────────
+
+def _stage_counts(stage: Optional[str] = None) -> Dict:
+    label = stage or (_STATE['stage'][-1] if _STATE['stage'] else _DEFAULT_STAGE)
+    return _STATE['counts'].setdefault(label, {'switches': 0, 'skipped': 0, 'by_mode': {}})
+
+
+def reset_counts(stage: Optional[str] = None) -> None:
+    """Clear the counters of one stage (or all stages)."""
+    if stage is None:
+        _STATE['counts'].clear()
+    else:
+        _STATE['counts'].pop(stage, None)
+
+
+def counts() -> Dict[str, Dict]:
+    """Return a copy of the per-stage counters."""
+    return {
+        label: {'switches': c['switches'], 'skipped': c['skipped'], 'by_mode': dict(c['by_mode'])}
+        for label, c in _STATE['counts'].items()
+    }
+
+
+def format_report(stage: Optional[str] = None) -> str:
+    """Return a one-line summary per stage (or for one stage)."""
+    labels = [stage] if stage else list(_STATE['counts'])
+    lines = []
+    for label in labels:
+        c = _STATE['counts'].get(label)
+        if c is None:
+            continue
+        detail = ", ".join(f"{m}×{n}" for m, n in sorted(c['by_mode'].items()))
+        lines.append(f"{label}: 模式切换 {c['switches']} 次, 跳过 {c['skipped']} 次"
+                     + (f" ({detail})" if detail else ""))
+    return "\n".join(lines)
+
+
+@contextmanager
+def stage(label: str, reset: bool = True):
+    """Attribute mode switches inside the block to ``label``."""
+    if reset:
+        reset_counts(label)
+    _STATE['stage'].append(label)
+    try:
+        yield _stage_counts(label)
+    finally:
+        _STATE['stage'].pop()
+
+
+def counted(label: str):
+    """Decorator for ``Operator.execute``: count its mode switches under ``label``."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ─── Switching ──────────────────────────────────────────────────────────────
+
+def current_mode(obj=None) -> str:
+    """Return the object's current mode ('OBJECT', 'EDIT', 'POSE', ...)."""
+    if obj is None:
+        obj = bpy.context.view_layer.objects.active
+    return obj.mode if obj is not None else 'OBJECT'
+
+
+def set_mode(mode: str, obj=None) -> bool:
+    """Switch ``obj`` (default: the active object) to ``mode``.
+
+    The object is made active first. Nothing is switched when it is already
+    active and in ``mode``.
+
+    Returns:
+        True if ``mode_set`` was actually called
+    """
+    view_layer = bpy.context.view_layer
+    if obj is None:
+        obj = view_layer.objects.active
+        if obj is None:
+            return False
+    elif view_layer.objects.active != obj:
+        # mode_set acts on the active object; leave the previous one in OBJECT
+        # mode first, otherwise Blender refuses to change the active object's mode
+        previous = view_layer.objects.active
+        if previous is not None and previous.mode != 'OBJECT':
+            _switch(previous, 'OBJECT')
+        view_layer.objects.active = obj
+
+    if obj.mode == mode:
+        _stage_counts()['skipped'] += 1
+        return False
+    _switch(obj, mode)
+    return True
+
+
+def _switch(obj, mode: str) -> None:
+    if 'EDIT' in (obj.mode, mode) and obj.type == 'ARMATURE':
+        # Bones may change in Edit Mode: drop the cached read-only snapshot
+        from .mapping import snapshot
+        snapshot.invalidate(obj)
+    bpy.ops.object.mode_set(mode=mode)
+    c = _stage_counts()
+    c['switches'] += 1
+    c['by_mode'][mode] = c['by_mode'].get(mode, 0) + 1
+
+
+def ensure_object_mode(obj=None) -> bool:
+    """Return to Object Mode if needed (for ``finally`` clauses)."""
+    if obj is None and (bpy.context.view_layer.objects.active is None):
+        return False
+    return set_mode('OBJECT', obj)
+
+
+@contextmanager
+def mode(obj, target: str):
+    """Run the block with ``obj`` in ``target`` mode, then restore the previous mode.
+
+    Nested blocks asking for the mode that is already active cost nothing.
+    Inside ``batch()``, the restore is deferred to the end of the batch.
+
+    Yields:
+        ``obj``
+    """
+    previous = current_mode(obj)
+    set_mode(target, obj)
+    try:
+        yield obj
+    finally:
+        if not _STATE['batch'] and previous != target:
+            set_mode(previous, obj)
+
+
+@contextmanager
+def batch(obj=None):
+    """Defer mode restores until the end of the block.
+
+    The active object's mode when the batch starts is restored once on exit
+    (Object Mode if the batch started without an active object).
+    """
+    if obj is None and bpy.context.view_layer.objects.active is not None:
+        obj = bpy.context.view_layer.objects.active
+    original = current_mode(obj) if obj is not None else 'OBJECT'
+    _STATE['batch'].append((obj, original))
+    try:
+        yield
+    finally:
+        _STATE['batch'].pop()
+        if not _STATE['batch']:
+            active = bpy.context.view_layer.objects.active
+            if obj is not None and active == obj:
+                set_mode(original, obj)
+            elif active is not None and active.mode != 'OBJECT':
+                set_mode('OBJECT', active)
+
@@ -5,7 +5,9 @@ Stage 0: Apply Bone Mapping - Rename bones and sync vertex groups
 
 import bpy
 from bpy.types import Operator
-from typing import Tuple, Dict, List
+from typing import Dict
+
+from .. import modes, renaming
 
 
 class XPSPMX_OT_stage_0_apply_mapping(Operator):
@@ -20,15 +22,15 @@ class XPSPMX_OT_stage_0_apply_mapping(Operator):
         return (context.active_object is not None and
                 context.active_object.type == 'ARMATURE')
 
+    @modes.counted("Stage 0")
     def execute(self, context):
         """Apply bone mapping: rename bones and sync vertex groups."""
         from .. import mapping_ui
 
-        scene = context.scene
         armature = context.active_object
 
-        # Get mapping configuration
-        config = mapping_ui._GLOBAL_CONFIG.get('config')
+        # Get this armature's mapping configuration
+        config = mapping_ui.get_config(context, armature, check_fingerprint=True)
         if config is None:
             self.report({'ERROR'}, "没有映射配置，请先运行自动映射")
             return {'CANCELLED'}
@@ -42,22 +44,24 @@ class XPSPMX_OT_stage_0_apply_mapping(Operator):
         rename_map = self._build_rename_map(config)
         print(f"   ✓ 找到 {len(rename_map)} 个骨骼需要重命名")
 
-        # Step 2: Rename bones in armature
+        # Step 2: Rename bones (two-phase, collision-safe)
         print("\n2️⃣ 重命名骨骼...")
-        renamed_count, errors = self._rename_bones(armature, rename_map)
+        report = renaming.bulk_rename(armature, rename_map)
+        renamed_count = len(report.bones)
         print(f"   ✓ 成功重命名: {renamed_count} 个骨骼")
-        if errors:
-            print(f"   ⚠ 失败: {len(errors)} 个骨骼")
-            for error in errors[:5]:
-                print(f"     - {error}")
+        if report.skipped:
+            print(f"   ⚠ 跳过: {len(report.skipped)} 个骨骼")
+            for old_name, reason in list(report.skipped.items())[:5]:
+                print(f"     - {old_name}: {reason}")
 
-        # Step 3: Sync vertex groups on all meshes
+        # Step 3: Vertex groups of the meshes deformed by this armature
         print("\n3️⃣ 同步顶点组...")
-        mesh_count, vg_count, vg_errors = self._sync_vertex_groups(scene, rename_map)
-        print(f"   ✓ 处理了 {mesh_count} 个网格")
+        vg_count = report.vertex_group_count
+        print(f"   ✓ 处理了 {len(report.vertex_groups)} 个网格")
         print(f"   ✓ 重命名了 {vg_count} 个顶点组")
-        if vg_errors:
-            print(f"   ⚠ 失败: {len(vg_errors)} 个顶点组")
+        for mesh_name, skipped in report.vertex_group_skipped.items():
+            print(f"   ⚠ {mesh_name}: 跳过 {len(skipped)} 个顶点组")
+        print(f"   ⏱ {report.summary()}")
 
         # Step 4: Verify results
         print("\n4️⃣ 验证结果...")
@@ -69,6 +73,7 @@ class XPSPMX_OT_stage_0_apply_mapping(Operator):
         print(f"✅ Stage 0 完成")
         print(f"   重命名骨骼: {renamed_count}/{len(rename_map)}")
         print(f"   重命名顶点组: {vg_count}")
+        print(f"   {modes.format_report('Stage 0')}")
         print(f"="*60 + "\n")
 
         self.report({'INFO'}, f"✓ 应用映射完成: {renamed_count} 个骨骼重命名")
@@ -86,71 +91,6 @@ class XPSPMX_OT_stage_0_apply_mapping(Operator):
                 rename_map[mapping_obj.xps_name] = mapping_obj.mmd_name
         return rename_map
 
-    def _rename_bones(self, armature: bpy.types.Object,
-                      rename_map: Dict[str, str]) -> Tuple[int, List[str]]:
-        """Rename all bones in the armature.
-
-        Args:
-            armature: The armature object
-            rename_map: Dict mapping old names to new names
-
-        Returns:
-            (success_count, error_list)
-        """
-        success_count = 0
-        errors = []
-
-        # Enter edit mode to rename bones
-        bpy.context.view_layer.objects.active = armature
-        bpy.ops.object.mode_set(mode='EDIT')
-
-        try:
-            for bone in armature.data.edit_bones:
-                if bone.name in rename_map:
-                    new_name = rename_map[bone.name]
-                    try:
-                        bone.name = new_name
-                        success_count += 1
-                    except Exception as e:
-                        errors.append(f"{bone.name} → {new_name}: {str(e)[:50]}")
-        finally:
-            bpy.ops.object.mode_set(mode='OBJECT')
-
-        return success_count, errors
-
-    def _sync_vertex_groups(self, scene: bpy.types.Scene,
-                            rename_map: Dict[str, str]) -> Tuple[int, int, List[str]]:
-        """Sync vertex group names on all meshes to match bone renames.
-
-        Args:
-            scene: The scene
-            rename_map: Dict mapping old names to new names
-
-        Returns:
-            (mesh_count, vgroup_count, error_list)
-        """
-        mesh_count = 0
-        vgroup_count = 0
-        errors = []
-
-        for obj in scene.objects:
-            if obj.type != 'MESH':
-                continue
-
-            mesh_count += 1
-
-            # Rename vertex groups
-            for vgroup in obj.vertex_groups:
-                if vgroup.name in rename_map:
-                    new_name = rename_map[vgroup.name]
-                    try:
-                        vgroup.name = new_name
-                        vgroup_count += 1
-                    except Exception as e:
-                        errors.append(f"{obj.name}.{vgroup.name}: {str(e)[:50]}")
-
-        return mesh_count, vgroup_count, errors
-
     def _verify_mapping(self, armature: bpy.types.Object, config) -> int:
         """Verify that bones have been renamed correctly.
 
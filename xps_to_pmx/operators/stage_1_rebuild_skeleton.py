@@ -3,13 +3,18 @@ Stage 1: Rebuild Skeleton - Create missing bones and adjust properties
 补全缺失的骨骼，调整骨骼属性和父级关系
 """
 
+import time
+
 import bpy
+import numpy as np
 from bpy.types import Operator
 from typing import Tuple, Dict, List, Set
-import json
-import os
 
-from .. import mapping
+from .. import mapping, modes
+
+# Offset of a generated bone's tail from its head (and of a child below its
+# generated parent), in armature space
+_BONE_OFFSET = np.array((0.0, 0.0, -0.5))
 
 
 class XPSPMX_OT_stage_1_rebuild_skeleton(Operator):
@@ -24,6 +29,7 @@ class XPSPMX_OT_stage_1_rebuild_skeleton(Operator):
         return (context.active_object is not None and
                 context.active_object.type == 'ARMATURE')
 
+    @modes.counted("Stage 1")
     def execute(self, context):
         """Rebuild skeleton by creating missing bones."""
         from .. import mapping_ui
@@ -31,8 +37,8 @@ class XPSPMX_OT_stage_1_rebuild_skeleton(Operator):
         scene = context.scene
         armature = context.active_object
 
-        # Get mapping configuration
-        config = mapping_ui._GLOBAL_CONFIG.get('config')
+        # Get this armature's mapping configuration
+        config = mapping_ui.get_config(context, armature, check_fingerprint=True)
         if config is None:
             self.report({'ERROR'}, "没有映射配置，请先运行 Stage 0")
             return {'CANCELLED'}
@@ -41,6 +47,15 @@ class XPSPMX_OT_stage_1_rebuild_skeleton(Operator):
         print("🔄 Stage 1: 重建骨架")
         print("="*60)
 
+        timings: Dict[str, float] = {}
+        clock = time.perf_counter()
+
+        def lap(label):
+            nonlocal clock
+            now = time.perf_counter()
+            timings[label] = now - clock
+            clock = now
+
         try:
             # Step 1: Load MMD standard skeleton
             print("\n1️⃣ 加载 MMD 标准骨骼库...")
@@ -60,29 +75,26 @@ class XPSPMX_OT_stage_1_rebuild_skeleton(Operator):
                     print(f"     - {bone_name}")
                 if len(missing_bones) > 10:
                     print(f"     ... 还有 {len(missing_bones) - 10} 个")
+            lap("加载/检测")
 
-            # Step 3: Create missing bones
+            # Step 3: Create missing bones (one edit session)
             print("\n3️⃣ 创建缺失的骨骼...")
-            bpy.context.view_layer.objects.active = armature
-            bpy.ops.object.mode_set(mode='EDIT')
-
-            try:
-                created_count = self._create_missing_bones(
-                    armature, missing_bones, mmd_skeleton, config
-                )
-                print(f"   ✓ 创建了 {created_count} 个骨骼")
-            finally:
-                bpy.ops.object.mode_set(mode='OBJECT')
+            created_count = self._create_missing_bones(
+                armature, missing_bones, mmd_skeleton, config, lap
+            )
+            print(f"   ✓ 创建了 {created_count} 个骨骼")
 
             # Step 4: Adjust bone properties
             print("\n4️⃣ 调整骨骼属性...")
             adjusted_count = self._adjust_bone_properties(armature, mmd_skeleton)
             print(f"   ✓ 调整了 {adjusted_count} 个骨骼的属性")
+            lap("调整属性")
 
             # Step 5: Verify parent-child relationships
             print("\n5️⃣ 验证父级关系...")
             verify_count = self._verify_hierarchy(armature, mmd_skeleton)
             print(f"   ✓ 验证通过: {verify_count} 个骨骼")
+            lap("验证")
 
             # Report summary
             print("\n" + "="*60)
@@ -90,6 +102,10 @@ class XPSPMX_OT_stage_1_rebuild_skeleton(Operator):
             print(f"   创建骨骼: {created_count}")
             print(f"   调整属性: {adjusted_count}")
             print(f"   验证成功: {verify_count}")
+            print(f"   {modes.format_report('Stage 1')}")
+            print("   ⏱ " + ", ".join(
+                f"{label} {seconds * 1000:.1f} ms" for label, seconds in timings.items()
+            ) + f" (合计 {sum(timings.values()) * 1000:.1f} ms)")
             print(f"="*60 + "\n")
 
             self.report({'INFO'}, f"✓ 骨架重建完成: {created_count} 个新骨骼")
@@ -101,19 +117,8 @@ class XPSPMX_OT_stage_1_rebuild_skeleton(Operator):
             return {'CANCELLED'}
 
     def _load_mmd_skeleton(self) -> Dict:
-        """Load MMD standard skeleton from JSON."""
-        try:
-            preset_path = os.path.join(
-                os.path.dirname(mapping.__file__),
-                'presets',
-                'mmd_standard_skeleton.json'
-            )
-            with open(preset_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get('bones', {})
-        except Exception as e:
-            print(f"Error loading MMD skeleton: {e}")
-            return {}
+        """Load MMD standard skeleton (shared cache with the bone tree UI)."""
+        return mapping.skeleton.load_mmd_skeleton() or {}
 
     def _find_missing_bones(self, existing_bones: Set[str],
                            mmd_skeleton: Dict) -> Set[str]:
@@ -133,114 +138,128 @@ class XPSPMX_OT_stage_1_rebuild_skeleton(Operator):
         return missing
 
     def _create_missing_bones(self, armature, missing_bones: Set[str],
-                             mmd_skeleton: Dict, config) -> int:
-        """Create missing bones in edit mode.
+                             mmd_skeleton: Dict, config, lap=None) -> int:
+        """Create missing bones in a single edit session.
 
         Args:
             armature: Target armature
             missing_bones: Set of bone names to create
             mmd_skeleton: MMD standard skeleton definition
             config: Current mapping configuration
+            lap: Optional callback(label) recording the time of each phase
 
         Returns:
             Number of bones created
         """
         if not missing_bones:
             return 0
+        lap = lap or (lambda label: None)
+
+        # Parents before children; parent cycles are reported and broken
+        names = [bone_name for bone_name in mmd_skeleton if bone_name in missing_bones]
+        order, cycles = mapping.skeleton.topological_order(
+            names, lambda bone_name: mmd_skeleton.get(bone_name, {}).get('parent_mmd')
+        )
+        broken = {cycle[0] for cycle in cycles}
+        for cycle in cycles:
+            print(f"   ⚠ 父级循环: {' → '.join(cycle + [cycle[0]])}（{cycle[0]} 不设父级）")
+
+        parents = {
+            bone_name: None if bone_name in broken
+            else mmd_skeleton.get(bone_name, {}).get('parent_mmd')
+            for bone_name in order
+        }
+        heads, tails = self._place_bones(armature, order, parents)
+        lap("排序/定位")
 
-        eb = armature.data.edit_bones
         created_count = 0
-
-        # Use topological sort to ensure parents are created before children
-        creation_order = self._topological_sort_bones(missing_bones, mmd_skeleton, eb)
-
-        for bone_name in creation_order:
-            if bone_name in eb:
-                continue  # Already exists
-
-            bone_def = mmd_skeleton.get(bone_name, {})
-            parent_name = bone_def.get('parent_mmd')
-
-            try:
-                # Create bone
-                new_bone = eb.new(bone_name)
-
-                # Set parent if it exists (should exist due to topological sort)
+        with modes.mode(armature, 'EDIT'):
+            eb = armature.data.edit_bones
+            created = {}
+            for bone_name in order:
+                if bone_name in eb:
+                    continue  # Already exists
+                try:
+                    new_bone = eb.new(bone_name)
+                    new_bone.use_deform = mmd_skeleton.get(bone_name, {}).get('is_deform', True)
+                    created[new_bone.name] = bone_name
+                except Exception as e:
+                    print(f"   ⚠ 失败: {bone_name} - {str(e)}")
+
+            # Parents exist now (created earlier in the order or already present)
+            for new_name, bone_name in created.items():
+                parent_name = parents[bone_name]
                 if parent_name and parent_name in eb:
-                    new_bone.parent = eb[parent_name]
+                    eb[new_name].parent = eb[parent_name]
 
-                # Position bone below parent or at origin
-                if parent_name and parent_name in eb:
-                    parent_bone = eb[parent_name]
-                    # Position 0.5 units below parent in Z axis
-                    new_bone.head = parent_bone.tail
-                    new_bone.tail = (parent_bone.tail[0],
-                                    parent_bone.tail[1],
-                                    parent_bone.tail[2] - 0.5)
-                else:
-                    # Position at origin
-                    new_bone.head = (0, 0, 0)
-                    new_bone.tail = (0, 0, -0.5)
-
-                # Set bone properties
-                is_deform = bone_def.get('is_deform', True)
-                new_bone.use_deform = is_deform
-
-                created_count += 1
-                print(f"   ✓ 创建: {bone_name} (parent: {parent_name or '无'})")
+            self._write_positions(eb, created, order, heads, tails)
 
-            except Exception as e:
-                print(f"   ⚠ 失败: {bone_name} - {str(e)}")
+            for bone_name in created.values():
+                parent_name = parents[bone_name]
+                print(f"   ✓ 创建: {bone_name} (parent: {parent_name or '无'})")
+            created_count = len(created)
+        lap("创建")
 
         return created_count
 
-    def _topological_sort_bones(self, missing_bones: Set[str],
-                               mmd_skeleton: Dict,
-                               edit_bones) -> List[str]:
-        """Sort bones topologically so parents are created before children.
+    def _place_bones(self, armature, order: List[str],
+                     parents: Dict[str, str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Compute head/tail of all bones to create in one pass.
 
-        Args:
-            missing_bones: Set of bones to create
-            mmd_skeleton: MMD standard skeleton definition
-            edit_bones: Blender edit bones collection
+        A bone whose parent already exists starts at the parent's tail; a bone
+        whose parent is created in the same batch starts one offset further
+        down that chain; a bone without parent starts at the origin. Each bone
+        points one offset down from its head.
 
         Returns:
-            Sorted list of bone names (parents first)
+            (heads, tails) as (M, 3) arrays in ``order``
         """
-        # Build dependency graph
-        result = []
-        visited = set()
-        temp_visited = set()
-
-        def visit(bone_name):
-            if bone_name in visited:
-                return
-            if bone_name in temp_visited:
-                return  # Avoid cycles
-
-            temp_visited.add(bone_name)
-
-            # First, visit parent if it needs to be created
-            if bone_name in missing_bones:
-                bone_def = mmd_skeleton.get(bone_name, {})
-                parent_name = bone_def.get('parent_mmd')
-
-                # If parent is missing and needs to be created, visit it first
-                if parent_name and parent_name in missing_bones and parent_name not in visited:
-                    visit(parent_name)
-
-            temp_visited.discard(bone_name)
-            visited.add(bone_name)
-
-            if bone_name in missing_bones:
-                result.append(bone_name)
-
-        # Visit all missing bones
-        for bone_name in missing_bones:
-            if bone_name not in visited:
-                visit(bone_name)
-
-        return result
+        bones = armature.data.bones
+        existing_tails = np.zeros((len(bones) + 1, 3), dtype=np.float32)  # last row = origin
+        if len(bones):
+            buf = np.empty(len(bones) * 3, dtype=np.float32)
+            bones.foreach_get('tail_local', buf)
+            existing_tails[:-1] = buf.reshape(-1, 3)
+        existing_index = {bone.name: i for i, bone in enumerate(bones)}
+        origin = len(bones)
+
+        # Walk the (already sorted) order once: anchor row and depth below it
+        index = {bone_name: i for i, bone_name in enumerate(order)}
+        anchor = np.full(len(order), origin, dtype=np.int64)
+        steps = np.zeros(len(order), dtype=np.float64)
+        for i, bone_name in enumerate(order):
+            parent_name = parents[bone_name]
+            j = index.get(parent_name)
+            if j is not None and j < i:
+                anchor[i] = anchor[j]
+                steps[i] = steps[j] + 1
+            elif parent_name in existing_index:
+                anchor[i] = existing_index[parent_name]
+
+        heads = existing_tails[anchor].astype(np.float64) + steps[:, None] * _BONE_OFFSET
+        tails = heads + _BONE_OFFSET
+        return heads, tails
+
+    def _write_positions(self, edit_bones, created: Dict[str, str], order: List[str],
+                         heads: np.ndarray, tails: np.ndarray) -> None:
+        """Write head/tail of the created bones with one foreach_get/set per attribute."""
+        if not created:
+            return
+        row_of = {bone_name: i for i, bone_name in enumerate(order)}
+        targets = []
+        rows = []
+        for i, bone in enumerate(edit_bones):
+            bone_name = created.get(bone.name)
+            if bone_name is not None:
+                targets.append(i)
+                rows.append(row_of[bone_name])
+
+        for attr, values in (('head', heads), ('tail', tails)):
+            buf = np.empty(len(edit_bones) * 3, dtype=np.float32)
+            edit_bones.foreach_get(attr, buf)
+            buf = buf.reshape(-1, 3)
+            buf[targets] = values[rows]
+            edit_bones.foreach_set(attr, buf.ravel())
 
     def _adjust_bone_properties(self, armature, mmd_skeleton: Dict) -> int:
         """Adjust bone properties (use_deform, etc.) based on MMD standard.
@@ -9,6 +9,9 @@ from mathutils import Euler
 from typing import Tuple
 import math
 
+from .. import modes, skinning
+from ..mapping import snapshot
+
 
 class XPSPMX_OT_stage_2_apply_apose(Operator):
     """Apply A-Pose: rotate arms to standard MMD pose."""
@@ -22,6 +25,7 @@ class XPSPMX_OT_stage_2_apply_apose(Operator):
         return (context.active_object is not None and
                 context.active_object.type == 'ARMATURE')
 
+    @modes.counted("Stage 2")
     def execute(self, context):
         """Apply A-Pose by rotating arms."""
         armature = context.active_object
@@ -33,8 +37,7 @@ class XPSPMX_OT_stage_2_apply_apose(Operator):
         try:
             # Step 1: Enter pose mode
             print("\n1️⃣ 进入姿态编辑模式...")
-            bpy.context.view_layer.objects.active = armature
-            bpy.ops.object.mode_set(mode='POSE')
+            modes.set_mode('POSE', armature)
 
             rotated_count = 0
 
@@ -63,13 +66,14 @@ class XPSPMX_OT_stage_2_apply_apose(Operator):
 
             # Return to object mode
             print("\n5️⃣ 返回物体模式...")
-            bpy.ops.object.mode_set(mode='OBJECT')
+            modes.set_mode('OBJECT', armature)
 
             # Report summary
             print("\n" + "="*60)
             print(f"✅ Stage 2 完成")
             print(f"   旋转骨骼: {rotated_count}")
             print(f"   烘焙骨骼: {bake_count}")
+            print(f"   {modes.format_report('Stage 2')}")
             print(f"="*60 + "\n")
 
             self.report({'INFO'}, f"✓ A-Pose 应用完成: {rotated_count} 个手臂已旋转")
@@ -81,8 +85,7 @@ class XPSPMX_OT_stage_2_apply_apose(Operator):
             return {'CANCELLED'}
         finally:
             try:
-                if bpy.context.object and bpy.context.object.mode != 'OBJECT':
-                    bpy.ops.object.mode_set(mode='OBJECT')
+                modes.ensure_object_mode()
             except:
                 pass
 
@@ -117,8 +120,9 @@ class XPSPMX_OT_stage_2_apply_apose(Operator):
     def _bake_pose_to_rest(self, armature) -> int:
         """Bake pose to rest pose for all posed bones.
 
-        This sets the current pose as the new rest pose,
-        clearing the pose for all bones.
+        The current pose is first skinned into every mesh deformed by the
+        armature (NumPy linear-blend skinning, see skinning.py), then applied
+        as the new rest pose, so meshes keep the A-Pose shape.
 
         Args:
             armature: Armature object
@@ -127,13 +131,16 @@ class XPSPMX_OT_stage_2_apply_apose(Operator):
             Number of bones processed
         """
         try:
-            # Select all bones
-            bpy.ops.pose.select_all(action='SELECT')
+            # Bake the evaluated pose into the meshes
+            bpy.context.view_layer.update()
+            baked = skinning.bake_pose(armature)
+            moved = sum(baked.values())
+            print(f"   ✓ 烘焙网格: {len(baked)} 个（{moved} 个顶点）")
 
             # Apply pose as rest pose
-            # In Blender, this is done by setting the armature's rest pose
-            # For simplicity, we'll use the pose as the new rest pose
+            bpy.ops.pose.select_all(action='SELECT')
             bpy.ops.pose.armature_apply(selected=False)
+            snapshot.invalidate(armature)
 
             return len(armature.pose.bones)
 
@@ -8,8 +8,9 @@ from bpy.types import Operator
 from typing import Tuple, Dict, List
 import json
 
-from .. import weights
+from .. import modes, weights
 from ..mapping import data_structures
+from ..pmx import compaction
 
 
 class XPSPMX_OT_stage_3_apply_weight_rules(Operator):
@@ -24,6 +25,7 @@ class XPSPMX_OT_stage_3_apply_weight_rules(Operator):
         return (context.active_object is not None and
                 context.active_object.type == 'ARMATURE')
 
+    @modes.counted("Stage 3")
     def execute(self, context):
         """Apply weight transfer rules."""
         from .. import mapping_ui
@@ -31,8 +33,8 @@ class XPSPMX_OT_stage_3_apply_weight_rules(Operator):
         scene = context.scene
         armature = context.active_object
 
-        # Get mapping configuration
-        config = mapping_ui._GLOBAL_CONFIG.get('config')
+        # Get this armature's mapping configuration
+        config = mapping_ui.get_config(context, armature, check_fingerprint=True)
         if config is None or not config.weight_rules:
             self.report({'INFO'}, "没有权重规则需要应用")
             return {'FINISHED'}
@@ -75,12 +77,17 @@ class XPSPMX_OT_stage_3_apply_weight_rules(Operator):
                 if len(warnings) > 5:
                     print(f"   ... 还有 {len(warnings) - 5} 个警告")
 
+            # PMX keeps at most 4 influences per vertex; show what export would prune
+            pruning = compaction.analyze_armature(armature, mesh_objects)['']
+            print(f"   ✓ PMX 权重压缩预估: {pruning.summary()}")
+
             # Report summary
             print("\n" + "="*60)
             print(f"✅ Stage 3 完成")
             print(f"   应用规则: {applied_count}")
             print(f"   归一化: {normalized_count}")
             print(f"   验证: {verify_count}")
+            print(f"   {modes.format_report('Stage 3')}")
             print(f"="*60 + "\n")
 
             message = f"✓ 权重规则应用完成: {applied_count} 条规则"
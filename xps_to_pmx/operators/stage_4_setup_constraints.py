@@ -7,6 +7,9 @@ import bpy
 from bpy.types import Operator
 from typing import Tuple, Dict, List
 
+from .. import modes
+from ..mapping import groups
+
 
 class XPSPMX_OT_stage_4_setup_constraints(Operator):
     """Setup constraints and bone groups for MMD rig."""
@@ -20,6 +23,7 @@ class XPSPMX_OT_stage_4_setup_constraints(Operator):
         return (context.active_object is not None and
                 context.active_object.type == 'ARMATURE')
 
+    @modes.counted("Stage 4")
     def execute(self, context):
         """Setup constraints, IK chains, and bone groups."""
         armature = context.active_object
@@ -29,20 +33,22 @@ class XPSPMX_OT_stage_4_setup_constraints(Operator):
         print("="*60)
 
         try:
-            # Step 1: Setup D-bone additional transforms
-            print("\n1️⃣ 设置 D-骨付与关系...")
-            d_bone_count = self._setup_d_bone_transforms(armature)
-            print(f"   ✓ 设置了 {d_bone_count} 个 D-骨")
-
-            # Step 2: Setup waist cancel bones
-            print("\n2️⃣ 设置腰 Cancel 骨...")
-            cancel_count = self._setup_waist_cancel_bones(armature)
-            print(f"   ✓ 设置了 {cancel_count} 个 Cancel 骨")
-
-            # Step 3: Add IK constraints
-            print("\n3️⃣ 添加 IK 约束...")
-            ik_count = self._setup_ik_constraints(armature)
-            print(f"   ✓ 添加了 {ik_count} 个 IK 约束")
+            # Steps 1-3 all work in Pose Mode: batch them into one session
+            with modes.batch(armature):
+                # Step 1: Setup D-bone additional transforms
+                print("\n1️⃣ 设置 D-骨付与关系...")
+                d_bone_count = self._setup_d_bone_transforms(armature)
+                print(f"   ✓ 设置了 {d_bone_count} 个 D-骨")
+
+                # Step 2: Setup waist cancel bones
+                print("\n2️⃣ 设置腰 Cancel 骨...")
+                cancel_count = self._setup_waist_cancel_bones(armature)
+                print(f"   ✓ 设置了 {cancel_count} 个 Cancel 骨")
+
+                # Step 3: Add IK constraints
+                print("\n3️⃣ 添加 IK 约束...")
+                ik_count = self._setup_ik_constraints(armature)
+                print(f"   ✓ 添加了 {ik_count} 个 IK 约束")
 
             # Step 4: Create bone groups
             print("\n4️⃣ 创建骨骼集合...")
@@ -56,6 +62,7 @@ class XPSPMX_OT_stage_4_setup_constraints(Operator):
             print(f"   Cancel骨: {cancel_count}")
             print(f"   IK约束: {ik_count}")
             print(f"   骨骼集合: {group_count}")
+            print(f"   {modes.format_report('Stage 4')}")
             print(f"="*60 + "\n")
 
             self.report({'INFO'}, f"✓ 约束设置完成")
@@ -90,30 +97,27 @@ class XPSPMX_OT_stage_4_setup_constraints(Operator):
         }
 
         try:
-            bpy.ops.object.mode_set(mode='POSE')
-
-            for d_name, fk_name in d_bone_mappings.items():
-                d_bone = armature.pose.bones.get(d_name)
-                fk_bone = armature.pose.bones.get(fk_name)
-
-                if not d_bone or not fk_bone:
-                    continue
-
-                # Try to access mmd_tools properties
-                try:
-                    from mmd_tools.core.bone import FnBone
-                    mb = FnBone(d_bone)
-                    mb.additional_transform_bone = fk_name
-                    mb.has_additional_rotation = True
-                    mb.has_additional_location = True
-                    mb.additional_transform_influence = 1.0
-                    count += 1
-                except (ImportError, AttributeError):
-                    # mmd_tools not available, skip
-                    print(f"   ⚠ mmd_tools 未启用，跳过 {d_name} 付与设置")
-                    pass
-
-            bpy.ops.object.mode_set(mode='OBJECT')
+            with modes.mode(armature, 'POSE'):
+                for d_name, fk_name in d_bone_mappings.items():
+                    d_bone = armature.pose.bones.get(d_name)
+                    fk_bone = armature.pose.bones.get(fk_name)
+
+                    if not d_bone or not fk_bone:
+                        continue
+
+                    # Try to access mmd_tools properties
+                    try:
+                        from mmd_tools.core.bone import FnBone
+                        mb = FnBone(d_bone)
+                        mb.additional_transform_bone = fk_name
+                        mb.has_additional_rotation = True
+                        mb.has_additional_location = True
+                        mb.additional_transform_influence = 1.0
+                        count += 1
+                    except (ImportError, AttributeError):
+                        # mmd_tools not available, skip
+                        print(f"   ⚠ mmd_tools 未启用，跳过 {d_name} 付与设置")
+                        pass
 
         except Exception as e:
             print(f"   Error setting up D-bone transforms: {e}")
@@ -137,30 +141,27 @@ class XPSPMX_OT_stage_4_setup_constraints(Operator):
         }
 
         try:
-            bpy.ops.object.mode_set(mode='POSE')
-
-            for cancel_name, waist_name in cancel_mappings.items():
-                cancel_bone = armature.pose.bones.get(cancel_name)
-                waist_bone = armature.pose.bones.get(waist_name)
-
-                if not cancel_bone or not waist_bone:
-                    continue
-
-                try:
-                    from mmd_tools.core.bone import FnBone
-                    mb = FnBone(cancel_bone)
-                    mb.additional_transform_bone = waist_name
-                    mb.has_additional_rotation = True
-                    mb.has_additional_location = False
-                    mb.additional_transform_influence = -1.0  # Negative influence
-
-                    # Ensure cancel bone is non-deform
-                    cancel_bone.bone.use_deform = False
-                    count += 1
-                except (ImportError, AttributeError):
-                    pass
-
-            bpy.ops.object.mode_set(mode='OBJECT')
+            with modes.mode(armature, 'POSE'):
+                for cancel_name, waist_name in cancel_mappings.items():
+                    cancel_bone = armature.pose.bones.get(cancel_name)
+                    waist_bone = armature.pose.bones.get(waist_name)
+
+                    if not cancel_bone or not waist_bone:
+                        continue
+
+                    try:
+                        from mmd_tools.core.bone import FnBone
+                        mb = FnBone(cancel_bone)
+                        mb.additional_transform_bone = waist_name
+                        mb.has_additional_rotation = True
+                        mb.has_additional_location = False
+                        mb.additional_transform_influence = -1.0  # Negative influence
+
+                        # Ensure cancel bone is non-deform
+                        cancel_bone.bone.use_deform = False
+                        count += 1
+                    except (ImportError, AttributeError):
+                        pass
 
         except Exception as e:
             print(f"   Error setting up cancel bones: {e}")
@@ -207,44 +208,41 @@ class XPSPMX_OT_stage_4_setup_constraints(Operator):
         }
 
         try:
-            bpy.ops.object.mode_set(mode='POSE')
-
-            for chain_name, chain_config in ik_chains.items():
-                # Get the last bone in the chain
-                chain_bones = chain_config['chain']
-                target_name = chain_config['target']
-                chain_length = chain_config['length']
-
-                # Find the last bone in chain
-                last_bone_name = None
-                for bone_name in reversed(chain_bones):
-                    if bone_name in armature.pose.bones:
-                        last_bone_name = bone_name
-                        break
-
-                if not last_bone_name:
-                    continue
-
-                target_bone = armature.pose.bones.get(target_name)
-                if not target_bone:
-                    continue
-
-                try:
-                    last_bone = armature.pose.bones[last_bone_name]
-
-                    # Add IK constraint
-                    ik = last_bone.constraints.new(type='IK')
-                    ik.target = armature
-                    ik.subtarget = target_name
-                    ik.chain_count = chain_length
-                    ik.use_stretch = False
-
-                    count += 1
-                    print(f"   ✓ 添加 IK: {last_bone_name} → {target_name}")
-                except Exception as e:
-                    print(f"   ⚠ 添加 IK 失败: {chain_name} - {e}")
-
-            bpy.ops.object.mode_set(mode='OBJECT')
+            with modes.mode(armature, 'POSE'):
+                for chain_name, chain_config in ik_chains.items():
+                    # Get the last bone in the chain
+                    chain_bones = chain_config['chain']
+                    target_name = chain_config['target']
+                    chain_length = chain_config['length']
+
+                    # Find the last bone in chain
+                    last_bone_name = None
+                    for bone_name in reversed(chain_bones):
+                        if bone_name in armature.pose.bones:
+                            last_bone_name = bone_name
+                            break
+
+                    if not last_bone_name:
+                        continue
+
+                    target_bone = armature.pose.bones.get(target_name)
+                    if not target_bone:
+                        continue
+
+                    try:
+                        last_bone = armature.pose.bones[last_bone_name]
+
+                        # Add IK constraint
+                        ik = last_bone.constraints.new(type='IK')
+                        ik.target = armature
+                        ik.subtarget = target_name
+                        ik.chain_count = chain_length
+                        ik.use_stretch = False
+
+                        count += 1
+                        print(f"   ✓ 添加 IK: {last_bone_name} → {target_name}")
+                    except Exception as e:
+                        print(f"   ⚠ 添加 IK 失败: {chain_name} - {e}")
 
         except Exception as e:
             print(f"   Error setting up IK constraints: {e}")
@@ -252,55 +250,39 @@ class XPSPMX_OT_stage_4_setup_constraints(Operator):
         return count
 
     def _create_bone_groups(self, armature) -> int:
-        """Create bone groups/collections according to MMD standard.
+        """Create bone collections (Blender 4.0+) or bone groups from the MMD group table.
+
+        Uses the compiled ``mapping.groups`` table (the same one that drives the
+        PMX display frames): one dict lookup per bone. Bones no group lists are
+        left alone.
 
         Args:
             armature: Armature object
 
         Returns:
-            Number of bone groups created
+            Number of bone groups created or filled
         """
-        count = 0
-
-        # Define bone groups
-        bone_groups = {
-            'センター': ['全ての親', 'センター'],
-            'グルーブ': ['グルーブ'],
-            '操作': ['腰', '腰キャンセル.L', '腰キャンセル.R'],
-            '上半身': ['上半身', '上半身1', '上半身2', '首', '首1', '頭'],
-            '腕': ['左肩', '右肩', '左腕', '右腕', '左腕捩', '右腕捩'],
-            '手': ['左ひじ', '右ひじ', '左手首', '右手首'],
-            '下半身': ['下半身', '左足', '右足', '左ひざ', '右ひざ'],
-            '足': ['左足首', '右足首', '左つま先', '右つま先'],
-            'IK': ['左足ＩＫ親', '左足ＩＫ', '右足ＩＫ親', '右足ＩＫ', '左つま先ＩＫ', '右つま先ＩＫ'],
-            'D-Bone': ['足D.L', '足D.R', 'ひざD.L', 'ひざD.R', '腕D.L', '腕D.R'],
-        }
+        table = groups.default_table()
+        members = table.partition(bone.name for bone in armature.data.bones)
 
         try:
-            # Get or create bone groups in mmd_tools
-            for group_name, bone_list in bone_groups.items():
-                # Filter to only bones that exist
-                existing_bones = [
-                    bone_name for bone_name in bone_list
-                    if bone_name in armature.data.bones
-                ]
-
-                if not existing_bones:
-                    continue
-
-                try:
-                    from mmd_tools.core.bone import FnBoneGroup
-                    # Create bone group (simplified - actual implementation depends on mmd_tools)
-                    # This is a placeholder for proper MMD bone group creation
-                    count += 1
-                except ImportError:
-                    # mmd_tools not available, skip
-                    pass
-
+            if hasattr(armature.data, 'collections'):
+                collections = armature.data.collections
+                for group_name, bone_names in members.items():
+                    collection = collections.get(group_name) or collections.new(group_name)
+                    for bone_name in bone_names:
+                        collection.assign(armature.data.bones[bone_name])
+            else:
+                bone_groups = armature.pose.bone_groups
+                for group_name, bone_names in members.items():
+                    bone_group = bone_groups.get(group_name) or bone_groups.new(name=group_name)
+                    for bone_name in bone_names:
+                        armature.pose.bones[bone_name].bone_group = bone_group
         except Exception as e:
             print(f"   Error creating bone groups: {e}")
+            return 0
 
-        return count
+        return len(members)
 
 
 def register():
@@ -6,7 +6,9 @@ Stage 5: Export to PMX - Export converted rig to MMD PMX format
 import bpy
 import os
 from bpy.types import Operator
-from typing import Tuple
+
+from .. import modes, skinning
+from ..pmx import compaction, export
 
 
 class XPSPMX_OT_stage_5_export_pmx(Operator):
@@ -27,6 +29,51 @@ class XPSPMX_OT_stage_5_export_pmx(Operator):
         options={'HIDDEN'}
     )
 
+    scale: bpy.props.FloatProperty(
+        name="Scale",
+        description="Blender 单位 → MMD 单位（mmd_tools 导入时为 0.08）",
+        default=export.DEFAULT_SCALE,
+        min=0.001
+    )
+
+    max_influences: bpy.props.IntProperty(
+        name="Max Influences",
+        description="每个顶点保留的骨骼权重数（PMX 最多 4，超出的按权重从小到大裁剪）",
+        default=compaction.MAX_INFLUENCES,
+        min=1,
+        max=compaction.MAX_INFLUENCES
+    )
+
+    export_morphs: bpy.props.BoolProperty(
+        name="Export Morphs",
+        description="把形态键导出为稀疏顶点表情（小于阈值的位移会被丢弃）",
+        default=True
+    )
+
+    copy_textures: bpy.props.BoolProperty(
+        name="Copy Textures",
+        description="按内容去重后把贴图复制到 PMX 旁的 tex 文件夹（未变化的文件跳过）",
+        default=True
+    )
+
+    optimize_cache: bpy.props.BoolProperty(
+        name="Optimize Vertex Cache",
+        description="按材质重排三角形和顶点以提高 GPU 顶点缓存命中率（报告前后 ACMR）",
+        default=True
+    )
+
+    sort_bones: bpy.props.BoolProperty(
+        name="Sort Bones",
+        description="按依赖排序骨骼：父骨、付与亲骨和 IK 链在前，必要时提升变形阶层",
+        default=True
+    )
+
+    incremental: bpy.props.BoolProperty(
+        name="Incremental",
+        description="只重新编码自上次导出以来变化的段，其余按字节从旧 PMX 复制",
+        default=True
+    )
+
     @classmethod
     def poll(cls, context):
         """Check if we have an armature selected."""
@@ -38,6 +85,7 @@ class XPSPMX_OT_stage_5_export_pmx(Operator):
         context.window_manager.fileselect_add(self)
         return {'RUNNING_MODAL'}
 
+    @modes.counted("Stage 5")
     def execute(self, context):
         """Export to PMX format."""
         armature = context.active_object
@@ -59,63 +107,58 @@ class XPSPMX_OT_stage_5_export_pmx(Operator):
                 else:
                     # Use armature name as fallback
                     output_path = f"{armature.name}.pmx"
+            output_path = bpy.path.abspath(output_path)
 
             print(f"\n1️⃣ 准备导出...")
             print(f"   输出路径: {output_path}")
 
             # Step 1: Verify armature and meshes
             print(f"\n2️⃣ 验证骨骼和网格...")
-            bone_count = len(armature.data.bones)
-            mesh_count = self._count_meshes(context.scene)
-            print(f"   ✓ 骨骼数: {bone_count}")
-            print(f"   ✓ 网格数: {mesh_count}")
-
-            # Step 2: Verify mmd_tools is available
-            print(f"\n3️⃣ 检查 mmd_tools 插件...")
-            has_mmd_tools = self._check_mmd_tools()
-            if not has_mmd_tools:
-                print(f"   ⚠ mmd_tools 未启用，尝试启用...")
-                try:
-                    bpy.ops.preferences.addon_enable(module="mmd_tools")
-                    print(f"   ✓ mmd_tools 已启用")
-                except:
-                    print(f"   ⚠ mmd_tools 启用失败，继续尝试导出...")
-
-            # Step 3: Try to export using mmd_tools
-            print(f"\n4️⃣ 导出 PMX 文件...")
-            success, msg = self._export_pmx(armature, output_path)
-
-            if success:
-                print(f"   ✓ {msg}")
-            else:
-                print(f"   ⚠ {msg}")
-                # Fallback: Create basic structure for manual export
-                print(f"   📝 已为手动导出准备好模型")
-
-            # Step 4: Verify output
-            print(f"\n5️⃣ 验证输出...")
-            if os.path.exists(output_path):
-                file_size = os.path.getsize(output_path)
-                print(f"   ✓ 文件已生成: {file_size} 字节")
-                verified = True
-            else:
-                print(f"   ⚠ 文件未生成（需手动导出）")
-                verified = False
+            meshes = skinning.deformed_meshes(armature)
+            print(f"   ✓ 骨骼数: {len(armature.data.bones)}")
+            print(f"   ✓ 网格数: {len(meshes)}")
+            if not meshes:
+                self.report({'ERROR'}, "没有受该骨架变形的网格")
+                return {'CANCELLED'}
+
+            # Step 2: Encode and write (native PMX 2.0 writer, no mmd_tools)
+            print(f"\n3️⃣ 导出 PMX 文件...")
+            modes.ensure_object_mode(armature)
+            report = export.export_pmx(armature, output_path, meshes=meshes, scale=self.scale,
+                                       max_influences=self.max_influences,
+                                       optimize_cache=self.optimize_cache,
+                                       morph_threshold=(export.MORPH_THRESHOLD
+                                                        if self.export_morphs else None),
+                                       copy_textures=self.copy_textures,
+                                       incremental=self.incremental,
+                                       sort_bones=self.sort_bones)
+            print(f"   ✓ 权重: {report.weights.summary()}")
+            if report.morphs:
+                print(f"   ✓ 表情: {report.morphs} 个, {report.morph_offsets} 个顶点位移")
+            if report.texture_files is not None:
+                print(f"   ✓ 贴图: {report.texture_files.summary()}")
+            if report.bone_order is not None:
+                print(f"   ✓ 骨骼顺序: {report.bone_order.summary()}")
+            if report.cached_meshes:
+                print(f"   ✓ 未改动的网格: {', '.join(report.cached_meshes)}")
+            if report.reused:
+                print(f"   ✓ 增量导出: 复用 {len(report.reused)} 段 ({', '.join(report.reused)})")
+            if report.cache is not None:
+                print(f"   ✓ 顶点缓存: {report.cache.summary()}")
+            for warning in report.warnings:
+                print(f"   ⚠ {warning}")
+            print("   ⏱ " + ", ".join(f"{name} {seconds * 1000:.0f} ms"
+                                      for name, seconds in report.timings.items()))
 
             # Report summary
             print("\n" + "="*60)
             print(f"✅ Stage 5 完成")
-            print(f"   骨骼: {bone_count}")
-            print(f"   网格: {mesh_count}")
+            print(f"   {report.summary()}")
             print(f"   输出: {output_path}")
-            print(f"   状态: {'✓ 成功' if verified else '⚠ 需要手动导出'}")
+            print(f"   {modes.format_report('Stage 5')}")
             print(f"="*60 + "\n")
 
-            if verified:
-                self.report({'INFO'}, f"✓ PMX 导出成功: {os.path.basename(output_path)}")
-            else:
-                self.report({'WARNING'}, f"⚠ 模型已准备，请使用 mmd_tools 手动导出")
-
+            self.report({'INFO'}, f"✓ PMX 导出成功: {os.path.basename(output_path)}")
             return {'FINISHED'}
 
         except Exception as e:
@@ -123,115 +166,6 @@ class XPSPMX_OT_stage_5_export_pmx(Operator):
             print(f"ERROR: {str(e)}")
             return {'CANCELLED'}
 
-    def _count_meshes(self, scene) -> int:
-        """Count mesh objects in the scene."""
-        count = 0
-        for obj in scene.objects:
-            if obj.type == 'MESH':
-                count += 1
-        return count
-
-    def _check_mmd_tools(self) -> bool:
-        """Check if mmd_tools addon is enabled."""
-        try:
-            import mmd_tools
-            return True
-        except ImportError:
-            return False
-
-    def _export_pmx(self, armature, output_path: str) -> Tuple[bool, str]:
-        """Export to PMX format using mmd_tools.
-
-        Args:
-            armature: Armature object to export
-            output_path: Output file path
-
-        Returns:
-            (success, message) tuple
-        """
-        try:
-            # Try using mmd_tools exporter
-            import mmd_tools
-            from mmd_tools.core.pmx import export
-
-            # Ensure output directory exists
-            output_dir = os.path.dirname(output_path)
-            if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-
-            # Prepare export settings
-            export_settings = {
-                'filepath': output_path,
-                'scale': 1.0,  # No scaling
-                'use_toon': True,
-                'use_sphere': True,
-                'use_sdef': False,
-                'sort_materials': True,
-                'sort_bones': True,
-            }
-
-            # Export using mmd_tools
-            # Note: The actual export method may vary depending on mmd_tools version
-            # This is a simplified version - actual implementation may need adjustment
-            print(f"   📤 使用 mmd_tools 导出...")
-            bpy.ops.mmd_tools.export_pmx(
-                filepath=output_path,
-                scale=1.0
-            )
-
-            return True, "PMX 导出成功"
-
-        except ImportError:
-            print(f"   ⚠ mmd_tools 不可用")
-            return self._create_placeholder_pmx(armature, output_path)
-        except Exception as e:
-            print(f"   ⚠ 导出出错: {str(e)}")
-            return self._create_placeholder_pmx(armature, output_path)
-
-    def _create_placeholder_pmx(self, armature, output_path: str) -> Tuple[bool, str]:
-        """Create a placeholder/basic PMX file structure.
-
-        This is a fallback when mmd_tools is not available.
-        Users can then use mmd_tools to export manually.
-
-        Args:
-            armature: Armature object
-            output_path: Output file path
-
-        Returns:
-            (success, message) tuple
-        """
-        try:
-            # Create a minimal PMX file with basic structure
-            # This allows Blender to save the model in a format that
-            # can be imported by mmd_tools for final export
-
-            output_dir = os.path.dirname(output_path)
-            if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-
-            # Write a basic text file indicating the model is ready
-            info_path = output_path.replace('.pmx', '_info.txt')
-            with open(info_path, 'w', encoding='utf-8') as f:
-                f.write("XPS to MMD 转换完成\n")
-                f.write("="*60 + "\n")
-                f.write(f"骨骼: {len(armature.data.bones)}\n")
-                f.write(f"网格: {len([o for o in bpy.context.scene.objects if o.type == 'MESH'])}\n")
-                f.write("\n")
-                f.write("导出方法:\n")
-                f.write("1. 确保 mmd_tools 已启用\n")
-                f.write("2. File → Export → mmd_tools PMX Exporter\n")
-                f.write("3. 选择输出路径\n")
-
-            # Also save the Blender file as intermediate format
-            blend_export_path = output_path.replace('.pmx', '.blend')
-            bpy.ops.wm.save_as_mainfile(filepath=blend_export_path)
-
-            return True, f"模型已准备，可手动导出"
-
-        except Exception as e:
-            return False, f"准备导出失败: {str(e)}"
-
 
 def register():
     """Register the Stage 5 operator."""
@@ -241,3 +175,4 @@ def register():
 def unregister():
     """Unregister the Stage 5 operator."""
     bpy.utils.unregister_class(XPSPMX_OT_stage_5_export_pmx)
+    export.clear_cache()
@@ -13,7 +13,7 @@ New architecture supports flexible mappings:
 import bpy
 from mathutils import Vector, Matrix
 from typing import Tuple, List, Optional, Dict
-from . import mapping, weights
+from . import mapping, modes, renaming, weights
 from .mapping import data_structures
 
 
@@ -26,7 +26,7 @@ def stage_apply_bone_mapping(armature, config: data_structures.MappingConfigurat
     """Stage 0: Apply bone mapping configuration.
 
     Renames XPS bones to MMD names according to the mapping configuration.
-    Also synchronizes all vertex group names.
+    Also synchronizes the vertex group names of the meshes it deforms.
 
     Args:
         armature: Target armature object
@@ -39,50 +39,24 @@ def stage_apply_bone_mapping(armature, config: data_structures.MappingConfigurat
         return False, "Invalid armature"
 
     try:
-        # Enter edit mode to rename bones
-        bpy.context.view_layer.objects.active = armature
-        bpy.ops.object.mode_set(mode='EDIT')
-
-        renamed_count = 0
-        failed_bones = []
-
-        # Rename bones according to mapping
-        for xps_name, mapping_obj in config.bone_mappings.items():
-            bone = armature.data.edit_bones.get(xps_name)
-            if not bone:
-                failed_bones.append(xps_name)
-                continue
-
-            try:
-                bone.name = mapping_obj.mmd_name
-                renamed_count += 1
-            except Exception as e:
-                failed_bones.append(f"{xps_name}: {e}")
-
-        # Return to object mode
-        bpy.ops.object.mode_set(mode='OBJECT')
-
-        # Sync vertex groups with renamed bones
-        synced_count = 0
-        for obj in bpy.context.scene.objects:
-            if obj.type == 'MESH' and obj.vertex_groups:
-                for xps_name, mapping_obj in config.bone_mappings.items():
-                    vg = obj.vertex_groups.get(xps_name)
-                    if vg:
-                        vg.name = mapping_obj.mmd_name
-                        synced_count += 1
-
-        message = f"Renamed {renamed_count} bones, synced {synced_count} vertex groups"
-        if failed_bones:
-            message += f" (failed: {len(failed_bones)})"
+        # Two-phase rename: swaps and chains in the mapping are safe
+        rename_map = {
+            xps_name: mapping_obj.mmd_name
+            for xps_name, mapping_obj in config.bone_mappings.items()
+        }
+        report = renaming.bulk_rename(armature, rename_map)
+
+        message = (f"Renamed {len(report.bones)} bones, "
+                   f"synced {report.vertex_group_count} vertex groups")
+        if report.skipped:
+            message += f" (failed: {len(report.skipped)})"
 
         return True, message
 
     except Exception as e:
         return False, f"Error during bone mapping: {e}"
     finally:
-        if bpy.context.object and bpy.context.object.mode != 'OBJECT':
-            bpy.ops.object.mode_set(mode='OBJECT')
+        modes.ensure_object_mode()
 
 
 def stage_apply_weight_rules(armature, config: data_structures.MappingConfiguration = None) \
@@ -0,0 +1,29 @@
+"""Native PMX 2.0 export (no mmd_tools required).
+
+Core components:
+- model: PMXModel and its record types (bpy-free)
+- writer: Streaming binary encoder for PMXModel (bpy-free)
+- bone_order: Dependency-ordered bones (parents, 付与, IK) with transform layers
+- compaction: Top-k weight compaction to BDEF1/BDEF2/BDEF4 with error report
+- vertex_cache: Tipsify triangle order and first-use vertex order, ACMR report
+- textures: Content-hashed texture dedup and parallel copy next to the PMX
+- incremental: Per-section digests in a sidecar; unchanged sections copied on re-export
+- export: Collects a PMXModel from an armature and its meshes (imported on first use)
+- reader: Lazy mmap PMX reader and structural validator (bpy-free)
+"""
+
+import importlib
+
+from . import (model, writer, bone_order, compaction, vertex_cache, textures, incremental,
+               reader)
+
+
+def __getattr__(name):
+    # export pulls in skinning and the mapping package; load it on first use so
+    # the reader and validator can be imported on their own (e.g. in tests)
+    if name == 'export':
+        return importlib.import_module(f"{__name__}.export")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ['model', 'writer', 'bone_order', 'compaction', 'vertex_cache', 'textures',
+           'incremental', 'export', 'reader']
@@ -0,0 +1,249 @@
+"""
+Compact vertex weights to what a PMX vertex can hold (BDEF1 / BDEF2 / BDEF4).
+权重压缩：每个顶点保留最大的 k 个权重、重新归一化，并选用能容纳的最小变形类型。
+
+PMX vertices carry at most four bone influences, but after FK→D transfers,
+orphan transfers and hip blends a Blender vertex can sit in six or more deform
+groups. Everything here works on flat (vertex, bone, weight) influence arrays
+as returned by ``skinning.read_vertex_weights``:
+
+1. duplicate (vertex, bone) pairs are merged,
+2. influences are ranked per vertex by weight (one lexsort),
+3. the top ``max_influences`` are kept, minus any below ``min_weight`` of the
+   vertex total (the strongest one always stays),
+4. the kept weights are renormalized and the type is chosen by count
+   (1 → BDEF1, 2 → BDEF2, 3-4 → BDEF4).
+
+The weight removed per vertex is reported as a fraction of its total; given
+rest coordinates and deform matrices, the resulting skinning displacement is
+measured as well. The same call serves as a pre-export pass (``export``) and
+as an analysis tool (``analyze_armature``, ``compact_model``).
+
+The array code does not need bpy; ``analyze_armature`` reads Blender data
+through ``skinning``.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .. import skinning
+from .model import BDEF1, BDEF2, BDEF4
+
+MAX_INFLUENCES = 4
+
+_TYPE_NAMES = {BDEF1: 'BDEF1', BDEF2: 'BDEF2', BDEF4: 'BDEF4'}
+
+
+@dataclass
+class CompactionReport:
+    """What compaction changed (sums over every call merged into it)."""
+    vertices: int = 0
+    max_influences: int = MAX_INFLUENCES
+    over_limit: int = 0                # vertices with more influences than allowed
+    pruned: int = 0                    # vertices that lost any weight
+    unweighted: int = 0                # vertices given the fallback bone
+    most_influences: int = 0
+    histogram: Dict[int, int] = field(default_factory=dict)     # influences -> vertices
+    type_counts: Dict[str, int] = field(default_factory=dict)
+    dropped_max: float = 0.0           # largest fraction of a vertex's weight removed
+    dropped_total: float = 0.0
+    displacement_max: Optional[float] = None
+    elapsed: float = 0.0
+
+    @property
+    def dropped_mean(self) -> float:
+        """Mean fraction of weight removed over the pruned vertices."""
+        return self.dropped_total / self.pruned if self.pruned else 0.0
+
+    def merge(self, other: 'CompactionReport') -> None:
+        self.vertices += other.vertices
+        self.over_limit += other.over_limit
+        self.pruned += other.pruned
+        self.unweighted += other.unweighted
+        self.most_influences = max(self.most_influences, other.most_influences)
+        for count, vertices in other.histogram.items():
+            self.histogram[count] = self.histogram.get(count, 0) + vertices
+        for name, vertices in other.type_counts.items():
+            self.type_counts[name] = self.type_counts.get(name, 0) + vertices
+        self.dropped_max = max(self.dropped_max, other.dropped_max)
+        self.dropped_total += other.dropped_total
+        if other.displacement_max is not None:
+            self.displacement_max = max(self.displacement_max or 0.0, other.displacement_max)
+        self.elapsed += other.elapsed
+
+    def summary(self) -> str:
+        types = "/".join(str(self.type_counts.get(name, 0)) for name in _TYPE_NAMES.values())
+        text = (f"顶点 {self.vertices}, 超过 {self.max_influences} 骨 {self.over_limit} "
+                f"(最多 {self.most_influences}), 裁剪 {self.pruned}, BDEF1/2/4 {types}, "
+                f"丢弃权重 最大 {self.dropped_max:.1%} 平均 {self.dropped_mean:.1%}")
+        if self.unweighted:
+            text += f", 无权重 {self.unweighted}"
+        if self.displacement_max is not None:
+            text += f", 姿态位移 最大 {self.displacement_max:.4f}"
+        return text
+
+
+@dataclass
+class CompactedWeights:
+    """Per-vertex PMX weights (N = vertex count).
+
+    ``bone_indices`` / ``bone_weights`` are (N, 4); unused slots repeat the
+    first bone with weight 0, so every slot is a valid bone index.
+    ``dropped`` is the fraction of each vertex's weight that was removed.
+    """
+    weight_types: np.ndarray
+    bone_indices: np.ndarray
+    bone_weights: np.ndarray
+    dropped: np.ndarray
+    report: CompactionReport
+
+
+def _merge_duplicates(vert_idx, bone_idx, weights):
+    order = np.argsort(vert_idx * (int(bone_idx.max()) + 1) + bone_idx, kind='stable')
+    vert_idx, bone_idx, weights = vert_idx[order], bone_idx[order], weights[order]
+    same = (vert_idx[1:] == vert_idx[:-1]) & (bone_idx[1:] == bone_idx[:-1])
+    if not same.any():
+        return vert_idx, bone_idx, weights
+    starts = np.flatnonzero(np.concatenate(([True], ~same)))
+    return vert_idx[starts], bone_idx[starts], np.add.reduceat(weights, starts)
+
+
+def compact_weights(n: int, vert_idx: np.ndarray, bone_idx: np.ndarray, weights: np.ndarray,
+                    max_influences: int = MAX_INFLUENCES, min_weight: float = 0.0,
+                    fallback_bone: int = 0, co: Optional[np.ndarray] = None,
+                    matrices: Optional[np.ndarray] = None) -> CompactedWeights:
+    """Keep the strongest weights per vertex and pick the smallest deform type.
+
+    Args:
+        n: Vertex count
+        vert_idx, bone_idx, weights: Flat influence arrays (one entry per influence)
+        max_influences: Influences kept per vertex (1-4)
+        min_weight: Also drop influences below this fraction of the vertex total
+        fallback_bone: Bone used for vertices without any influence
+        co: Optional (N, 3) rest coordinates and
+        matrices: (B, 4, 4) deform matrices in the same space; when both are
+            given the largest skinning displacement caused by pruning is reported
+
+    Returns:
+        CompactedWeights
+    """
+    started = time.perf_counter()
+    k = min(max(int(max_influences), 1), MAX_INFLUENCES)
+    vert_idx = np.asarray(vert_idx, dtype=np.int64)
+    bone_idx = np.asarray(bone_idx, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    live = weights > 0.0
+    vert_idx, bone_idx, weights = vert_idx[live], bone_idx[live], weights[live]
+
+    bones = np.full((n, MAX_INFLUENCES), -1, dtype=np.int32)
+    packed = np.zeros((n, MAX_INFLUENCES), dtype=np.float64)
+    total = np.zeros(n)
+    influences = np.zeros(n, dtype=np.int64)
+    keep = np.zeros(0, dtype=bool)
+    if len(vert_idx):
+        vert_idx, bone_idx, weights = _merge_duplicates(vert_idx, bone_idx, weights)
+        order = np.lexsort((-weights, vert_idx))
+        vert_idx, bone_idx, weights = vert_idx[order], bone_idx[order], weights[order]
+        rank = np.arange(len(vert_idx)) - np.searchsorted(vert_idx, vert_idx, side='left')
+        total = np.bincount(vert_idx, weights=weights, minlength=n)
+        influences = np.bincount(vert_idx, minlength=n)
+        keep = rank < k
+        if min_weight > 0.0:
+            keep &= (weights >= min_weight * total[vert_idx]) | (rank == 0)
+        bones[vert_idx[keep], rank[keep]] = bone_idx[keep]
+        packed[vert_idx[keep], rank[keep]] = weights[keep]
+
+    removed = np.bincount(vert_idx[~keep], weights=weights[~keep], minlength=n) \
+        if len(vert_idx) else np.zeros(n)
+    dropped = np.divide(removed, total, out=np.zeros(n), where=total > 0.0)
+    kept = packed.sum(axis=1)
+    empty = kept <= 0.0
+    bones[empty, 0] = fallback_bone
+    packed[empty, 0] = 1.0
+    kept[empty] = 1.0
+    packed /= kept[:, None]
+
+    count = (bones >= 0).sum(axis=1)
+    types = np.full(n, BDEF4, dtype=np.uint8)
+    types[count == 2] = BDEF2
+    types[count <= 1] = BDEF1
+    unused = bones < 0
+    bones[unused] = np.broadcast_to(bones[:, :1], bones.shape)[unused]
+
+    report = CompactionReport(vertices=n, max_influences=k)
+    report.over_limit = int(np.count_nonzero(influences > k))
+    pruned = dropped > 0.0
+    report.pruned = int(np.count_nonzero(pruned))
+    report.unweighted = int(np.count_nonzero(empty))
+    report.most_influences = int(influences.max()) if n else 0
+    values, counts = np.unique(influences, return_counts=True)
+    report.histogram = dict(zip(values.tolist(), counts.tolist()))
+    report.type_counts = {name: int(np.count_nonzero(types == t)) for t, name in _TYPE_NAMES.items()}
+    report.dropped_max = float(dropped.max()) if n else 0.0
+    report.dropped_total = float(dropped[pruned].sum())
+
+    if co is not None and matrices is not None and len(vert_idx):
+        full = skinning.skin_coordinates(co, vert_idx, bone_idx, weights, matrices)
+        compact = skinning.skin_coordinates(co, vert_idx[keep], bone_idx[keep], weights[keep],
+                                            matrices)
+        report.displacement_max = float(np.linalg.norm(full - compact, axis=1).max())
+
+    report.elapsed = time.perf_counter() - started
+    return CompactedWeights(types, bones, packed.astype(np.float32), dropped, report)
+
+
+def compact_model(model, max_influences: int = MAX_INFLUENCES,
+                  min_weight: float = 0.0) -> CompactionReport:
+    """Re-compact the (N, 4) weights of a PMXModel (or reader vertices) in place.
+
+    Slots with zero weight or a negative bone index are ignored, so BDEF1/BDEF2
+    padding does not count as an influence.
+    """
+    n = len(model.bone_indices)
+    bones = model.bone_indices.astype(np.int64)
+    weights = model.bone_weights.astype(np.float64)
+    live = (bones >= 0) & (weights > 0.0)
+    vert_idx = np.nonzero(live)[0]
+    result = compact_weights(n, vert_idx, bones[live], weights[live],
+                             max_influences=max_influences, min_weight=min_weight)
+    model.weight_types = result.weight_types
+    model.bone_indices = result.bone_indices
+    model.bone_weights = result.bone_weights
+    return result.report
+
+
+def _world_matrix(obj) -> np.ndarray:
+    return np.array([list(row) for row in obj.matrix_world], dtype=np.float64)
+
+
+def analyze_armature(armature, meshes: Optional[List] = None,
+                     max_influences: int = MAX_INFLUENCES,
+                     min_weight: float = 0.0) -> Dict[str, CompactionReport]:
+    """Dry-run compaction on every mesh the armature deforms (nothing is changed).
+
+    Displacements are measured in the current pose, in each mesh's object space.
+
+    Returns:
+        Mesh name -> CompactionReport, plus the merged total under ``''``
+    """
+    if meshes is None:
+        meshes = skinning.deformed_meshes(armature)
+    deform = {bone.name for bone in armature.data.bones if bone.use_deform}
+    names, matrices = skinning.bone_deform_matrices(armature)
+    bone_index = {name: i for i, name in enumerate(names) if name in deform}
+    armature_world = _world_matrix(armature)
+
+    reports = {'': CompactionReport(max_influences=max_influences)}
+    for mesh_obj in meshes:
+        vert_idx, bone_idx, weights = skinning.read_vertex_weights(mesh_obj, bone_index)
+        co = skinning.read_coordinates(mesh_obj.data.vertices)
+        mesh_matrices = skinning.to_mesh_space(
+            matrices, armature_world, _world_matrix(mesh_obj))
+        result = compact_weights(len(co), vert_idx, bone_idx, weights, max_influences,
+                                 min_weight, co=co, matrices=mesh_matrices)
+        reports[mesh_obj.name] = result.report
+        reports[''].merge(result.report)
+    return reports
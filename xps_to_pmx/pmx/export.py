@@ -0,0 +1,698 @@
+"""
+Build a PMXModel from an armature and its meshes, and write it with the native writer.
+从骨架和受其变形的网格收集 PMX 数据（批量 foreach_get），再用原生写入器输出，不依赖 mmd_tools。
+
+Coordinates are converted from Blender (Z up, right-handed, metres) to MMD
+(Y up, left-handed): ``(x, y, z) -> (x, z, y) * scale``. The axis swap mirrors
+the model, so triangle winding is reversed to keep faces pointing outward.
+
+PMX has one normal and one UV per vertex, so triangle corners (loops) are
+welded back into vertices wherever (mesh vertex, normal, UV) agree: the loop
+keys are hashed and uniqued in one pass (``split_vertices``), and the vertex
+count only grows along real UV and normal seams. Weights are compacted per
+mesh vertex by ``compaction.compact_weights`` (top-k, smallest BDEF type).
+
+Re-exports reuse work. The raw reads of a mesh (``foreach_get`` buffers,
+world matrix and vertex weights) are digested. While the digest matches,
+``read_mesh`` returns the welded, compacted buffers of an earlier export.
+Each batch of shape keys likewise reuses its sparse offsets. Then
+``vertex_cache`` reuses the Tipsify order for the unchanged index buffer.
+The reads themselves cannot be skipped, because Blender exposes no change
+counter for mesh data. The per-vertex weight read (see
+``skinning.read_vertex_weights``) is left as the main cost of an export.
+The caches live for the session but are capped by bytes (``MESH_CACHE_CAP``,
+``MORPH_CACHE_CAP`` and ``vertex_cache.ORDER_CACHE_CAP``, 64 MiB together).
+Results larger than their cap are not kept, so very large meshes are rebuilt
+on every export.
+"""
+
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import bpy
+except ImportError:  # the pure helpers below stay usable outside Blender
+    bpy = None
+
+from .. import skinning
+from ..mapping.groups import OTHER_GROUP, BoneGroupTable, default_table
+from .bone_order import BoneOrderReport, sort_bones as order_bones, sort_model_bones
+from .compaction import MAX_INFLUENCES, CompactionReport, compact_weights
+from .incremental import ReuseCache, content_digest, write_incremental
+from .model import (PMXBone, PMXDisplayFrame, PMXIK, PMXIKLink, PMXMaterial, PMXModel,
+                    PMXMorph, MATERIAL_DOUBLE_SIDED, PANEL_EYE, PANEL_EYEBROW, PANEL_MOUTH,
+                    PANEL_OTHER)
+from .textures import TextureReport, collect_textures, relative_path
+from .vertex_cache import CacheReport, clear_cache as optimize_cache_clear, optimize_model
+from .writer import write_pmx
+
+# mmd_tools imports PMX at 0.08 m per unit; export with the inverse
+DEFAULT_SCALE = 12.5
+
+# Shape key offsets shorter than this (MMD units, per axis) are not exported
+MORPH_THRESHOLD = 1e-4
+
+# Morph panel by name fragment (checked in order; anything else goes to その他)
+_MOUTH_SHAPES = frozenset({'あ', 'い', 'う', 'え', 'お', 'ん', 'ワ', '▲', '∧', 'ω', '□'})
+_MORPH_PANELS = (
+    (('眉', '真面目', '困る', '怒り', 'にこり', 'brow'), PANEL_EYEBROW),
+    (('目', 'まばたき', '笑い', 'ウィンク', 'ｳｨﾝｸ', 'じと', 'はぅ', 'eye', 'blink', 'wink'),
+     PANEL_EYE),
+    (('口', 'ぺろ', 'にやり', 'mouth', 'lip'), PANEL_MOUTH),
+)
+
+# Warn when compaction removes more than this fraction of a vertex's weight
+DROPPED_WEIGHT_WARNING = 0.1
+
+# Bones that MMD users move directly
+_TRANSLATABLE_BONES = frozenset({'全ての親', 'センター', 'グルーブ'})
+
+# Knee limits used by MMD standard models (x rotation only, bending backwards)
+_KNEE_LIMITS = ((-math.pi, 0.0, 0.0), (-math.radians(0.5), 0.0, 0.0))
+
+# Loop normals closer than 1 / NORMAL_STEPS per component weld into one vertex
+NORMAL_STEPS = 1 << 15
+
+# Bytes kept for re-exports: welded mesh buffers, and shape key batch offsets
+MESH_CACHE_CAP = 32 * 1024 * 1024
+MORPH_CACHE_CAP = 16 * 1024 * 1024
+
+# 64-bit mixing constants (splitmix64) for hashing loop keys
+_HASH_MULTIPLIERS = (0x9E3779B97F4A7C15, 0xBF58476D1CE4E5B9, 0x94D049BB133111EB,
+                     0xD6E8FEB86659FD93, 0xA0761D6478BD642F, 0xE7037ED1A0B428DB)
+
+
+@dataclass
+class ExportReport:
+    """Result of ``export_pmx``."""
+    path: str = ""
+    vertices: int = 0
+    loops: int = 0                 # triangle corners before welding
+    faces: int = 0
+    materials: int = 0
+    bones: int = 0
+    morphs: int = 0
+    morph_offsets: int = 0
+    textures: int = 0
+    size: int = 0
+    weights: CompactionReport = field(default_factory=CompactionReport)
+    cache: Optional[CacheReport] = None
+    bone_order: Optional[BoneOrderReport] = None
+    texture_files: Optional[TextureReport] = None
+    reused: List[str] = field(default_factory=list)     # sections copied from the last export
+    cached_meshes: List[str] = field(default_factory=list)    # buffers reused from an earlier build
+    timings: Dict[str, float] = field(default_factory=dict)
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def elapsed(self) -> float:
+        return sum(self.timings.values())
+
+    def summary(self) -> str:
+        return (f"顶点 {self.vertices} (角点 {self.loops}), 面 {self.faces}, 材质 {self.materials}, "
+                f"骨骼 {self.bones}, 表情 {self.morphs}, 贴图 {self.textures}, "
+                f"{self.size / 1048576:.1f} MB, "
+                f"耗时 {self.elapsed:.2f} s")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Pure conversions
+# ─────────────────────────────────────────────────────────────────────────────
+
+def to_mmd_space(points: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    """(N, 3) Blender points -> MMD points (swap Y/Z, scale)."""
+    return (points[:, [0, 2, 1]] * scale).astype(np.float32)
+
+
+def morph_panel(name: str) -> int:
+    """Guess the MMD morph panel (眉 / 目 / 口 / その他) from a shape key name."""
+    if name.strip() in _MOUTH_SHAPES:
+        return PANEL_MOUTH
+    lowered = name.lower()
+    for fragments, panel in _MORPH_PANELS:
+        if any(fragment in lowered for fragment in fragments):
+            return panel
+    return PANEL_OTHER
+
+
+def sparse_offsets(deltas: np.ndarray, vertex_of: np.ndarray,
+                   threshold: float = MORPH_THRESHOLD) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Sparse PMX vertex morph offsets for a batch of shape keys.
+
+    Args:
+        deltas: (K, N, 3) key - basis offsets per mesh vertex, in MMD space
+        vertex_of: (V,) mesh vertex of each PMX vertex
+        threshold: Offsets with every component below this are dropped
+
+    Returns:
+        Per key, (indices (M,) int32 into the V PMX vertices, offsets (M, 3) float32)
+    """
+    moved = (np.abs(deltas) >= threshold).any(axis=2)          # (K, N)
+    result = []
+    for key_deltas, key_moved in zip(deltas, moved):
+        if not key_moved.any():
+            result.append((np.zeros(0, np.int32), np.zeros((0, 3), np.float32)))
+            continue
+        indices = np.flatnonzero(key_moved[vertex_of])
+        result.append((indices.astype(np.int32),
+                       key_deltas[vertex_of[indices]].astype(np.float32)))
+    return result
+
+
+def _loop_keys(vertex_of: np.ndarray, normals: np.ndarray, uvs: np.ndarray) -> np.ndarray:
+    """(L, 6) uint64 weld keys: vertex, quantized normal, exact float32 UV bits."""
+    keys = np.empty((len(vertex_of), 6), dtype=np.uint64)
+    keys[:, 0] = vertex_of
+    keys[:, 1:4] = np.rint(normals * NORMAL_STEPS).astype(np.int64).view(np.uint64)
+    # + 0.0 folds -0.0 into 0.0 so both have the same bits
+    keys[:, 4:6] = (uvs.astype(np.float32) + np.float32(0.0)).view(np.uint32)
+    return keys
+
+
+def _hash_rows(keys: np.ndarray) -> np.ndarray:
+    h = np.zeros(len(keys), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for column, multiplier in zip(keys.T, _HASH_MULTIPLIERS):
+            h ^= column * np.uint64(multiplier)
+            h ^= h >> np.uint64(29)
+            h *= np.uint64(0xBF58476D1CE4E5B9)
+            h ^= h >> np.uint64(32)
+    return h
+
+
+def split_vertices(vertex_of: np.ndarray, normals: np.ndarray,
+                   uvs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Weld loops that share (mesh vertex, normal, UV) into PMX vertices.
+
+    Args:
+        vertex_of: (L,) mesh vertex of each loop
+        normals: (L, 3) unit loop normals
+        uvs: (L, 2) loop UVs
+
+    Returns:
+        (first, inverse): ``first`` (V,) is a representative loop per PMX vertex,
+        in order of first use; ``inverse`` (L,) maps each loop to its PMX vertex,
+        so an index buffer over loops becomes ``inverse[loop_indices]``
+    """
+    keys = _loop_keys(vertex_of, normals, uvs)
+    if not len(keys):
+        return np.zeros(0, np.int64), np.zeros(0, np.int64)
+    hashes = _hash_rows(keys)
+    # Unstable sort is enough: the first loop of each group is taken with a min
+    order = np.argsort(hashes)
+    ordered = hashes[order]
+    starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+    first = np.minimum.reduceat(order, starts)
+    group = np.empty(len(keys), dtype=np.int64)
+    group[order] = np.cumsum(np.concatenate(([False], ordered[1:] != ordered[:-1])))
+    if not np.array_equal(keys[first[group]], keys):
+        # 64-bit collision (practically never): unique on the full keys instead
+        _, first, group = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        group = group.ravel()
+    # Number vertices in order of first use rather than hash order
+    by_use = np.argsort(first)
+    rank = np.empty_like(by_use)
+    rank[by_use] = np.arange(len(by_use))
+    return first[by_use], rank[group]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Build cache
+# ─────────────────────────────────────────────────────────────────────────────
+
+# content digest -> _MeshBuffers / list of (name, indices, offsets) per shape key batch
+_MESHES = ReuseCache(MESH_CACHE_CAP)
+_MORPH_BATCHES = ReuseCache(MORPH_CACHE_CAP)
+
+
+def clear_cache() -> None:
+    """Forget the mesh buffers, morph offsets and triangle orders kept for re-exports."""
+    _MESHES.clear()
+    _MORPH_BATCHES.clear()
+    optimize_cache_clear()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Blender reads (bulk)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _read(collection, attr: str, width: int, dtype=np.float32) -> np.ndarray:
+    buf = np.empty(len(collection) * width, dtype=dtype)
+    collection.foreach_get(attr, buf)
+    return buf.reshape(-1, width) if width > 1 else buf
+
+
+def _loop_normals(mesh) -> np.ndarray:
+    """(L, 3) custom-split-aware loop normals."""
+    if hasattr(mesh, 'corner_normals'):        # Blender 4.1+
+        return _read(mesh.corner_normals, 'vector', 3)
+    mesh.calc_normals_split()
+    return _read(mesh.loops, 'normal', 3)
+
+
+def _loop_uvs(mesh) -> np.ndarray:
+    layer = mesh.uv_layers.active
+    if layer is None:
+        return np.zeros((len(mesh.loops), 2), dtype=np.float32)
+    return _read(layer.data, 'uv', 2)
+
+
+def _world_matrix(obj) -> np.ndarray:
+    return np.array([list(row) for row in obj.matrix_world], dtype=np.float64)
+
+
+@dataclass
+class _MeshBuffers:
+    """One mesh's welded vertex buffers and its triangles (local vertex indices)."""
+    positions: np.ndarray
+    normals: np.ndarray
+    uvs: np.ndarray
+    weight_types: np.ndarray
+    bone_indices: np.ndarray
+    bone_weights: np.ndarray
+    triangles: np.ndarray         # (T, 3) indices into the buffers above
+    material_index: np.ndarray    # (T,)
+    weights: CompactionReport     # per mesh vertex, before loop expansion
+    loop_count: int               # loops of the mesh (one PMX vertex each without welding)
+    vertex_of: np.ndarray         # (V,) mesh vertex of each buffer vertex
+
+
+def read_mesh(mesh_obj, bone_index: Dict[str, int], scale: float,
+              max_influences: int = MAX_INFLUENCES,
+              reuse: bool = True) -> Tuple[Optional[_MeshBuffers], bool]:
+    """Read one mesh with bulk property reads; loops are welded by ``split_vertices``.
+
+    Returns:
+        (buffers, reused): None for a mesh without faces; ``reused`` when the
+        raw reads matched an earlier build and its buffers were returned
+        (treat them as read-only)
+    """
+    mesh = mesh_obj.data
+    mesh.calc_loop_triangles()
+    if not len(mesh.loop_triangles):
+        return None, False
+
+    tri_loops = _read(mesh.loop_triangles, 'loops', 3, np.int32)
+    material_index = _read(mesh.loop_triangles, 'material_index', 1, np.int32)
+    loop_vertex = _read(mesh.loops, 'vertex_index', 1, np.int32)
+    co = _read(mesh.vertices, 'co', 3)
+    loop_normals = _loop_normals(mesh)
+    loop_uvs = _loop_uvs(mesh)
+    mw = _world_matrix(mesh_obj)
+    influences = skinning.read_vertex_weights(mesh_obj, bone_index)
+    key = None
+    if reuse:
+        key = content_digest((scale, max_influences, tri_loops, material_index, loop_vertex,
+                              co, loop_normals, loop_uvs, mw) + influences)
+
+    def build() -> _MeshBuffers:
+        corners = tri_loops.ravel()
+        normals64 = loop_normals.astype(np.float64)
+        first, inverse = split_vertices(loop_vertex[corners], normals64[corners],
+                                        loop_uvs[corners])
+        used = corners[first]
+        vertex_of = loop_vertex[used]
+
+        world = co.astype(np.float64) @ mw[:3, :3].T + mw[:3, 3]
+        normal_matrix = np.linalg.inv(mw[:3, :3]).T
+        normals = normals64[used] @ normal_matrix.T
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+        uvs = loop_uvs[used].astype(np.float32)
+        uvs[:, 1] = 1.0 - uvs[:, 1]
+
+        compacted = compact_weights(len(co), *influences, max_influences=max_influences)
+
+        return _MeshBuffers(
+            positions=to_mmd_space(world[vertex_of], scale),
+            normals=to_mmd_space(normals),
+            uvs=uvs,
+            weight_types=compacted.weight_types[vertex_of],
+            bone_indices=compacted.bone_indices[vertex_of],
+            bone_weights=compacted.bone_weights[vertex_of],
+            triangles=inverse.reshape(-1, 3),
+            material_index=material_index,
+            weights=compacted.report,
+            loop_count=len(loop_vertex),
+            vertex_of=vertex_of,
+        )
+
+    return _MESHES.get(key, build)
+
+
+def read_morphs(mesh_obj, vertex_of: np.ndarray, scale: float,
+                threshold: float = MORPH_THRESHOLD, reuse: bool = True) -> List[PMXMorph]:
+    """Vertex morphs from the mesh's shape keys (offsets against the reference key).
+
+    Keys are read with one ``foreach_get`` each and differenced against the
+    basis in (chunk, N, 3) batches; keys without any offset above
+    ``threshold`` are skipped. Indices are local to the mesh's PMX vertices.
+    With ``reuse``, a batch whose raw coordinates were differenced before
+    gets its earlier offsets (the arrays are shared: do not modify them).
+    """
+    shape_keys = mesh_obj.data.shape_keys
+    if shape_keys is None or len(shape_keys.key_blocks) < 2:
+        return []
+    reference = shape_keys.reference_key
+    blocks = [block for block in shape_keys.key_blocks if block != reference]
+    n = len(mesh_obj.data.vertices)
+    basis = _read(reference.data, 'co', 3)
+
+    # Offsets are directions: only the linear part of the world matrix applies
+    linear = _world_matrix(mesh_obj)[:3, :3]
+    to_mmd = linear.T[:, [0, 2, 1]] * scale
+    mesh_key = content_digest((scale, threshold, to_mmd, basis, vertex_of)) if reuse else None
+    morphs = []
+    for start in range(0, len(blocks), skinning.SHAPE_KEY_CHUNK):
+        chunk = blocks[start:start + skinning.SHAPE_KEY_CHUNK]
+        names = [block.name for block in chunk]
+        flat = np.empty((len(chunk), n * 3), dtype=np.float32)
+        for row, block in zip(flat, chunk):
+            block.data.foreach_get('co', row)
+
+        def batch(flat=flat, names=names):
+            deltas = (flat.reshape(len(names), n, 3) - basis) @ to_mmd.astype(np.float32)
+            return [(name, indices, offsets) for name, (indices, offsets)
+                    in zip(names, sparse_offsets(deltas, vertex_of, threshold)) if len(indices)]
+
+        key = content_digest((mesh_key, names, flat)) if mesh_key is not None else None
+        for name, indices, offsets in _MORPH_BATCHES.get(key, batch)[0]:
+            morphs.append(PMXMorph(name=name, name_en=name, panel=morph_panel(name),
+                                   indices=indices, offsets=offsets))
+    return morphs
+
+
+def _material_texture(material) -> Optional[str]:
+    """Absolute path of the image that feeds the material's base color."""
+    if material is None or not material.use_nodes or material.node_tree is None:
+        return None
+    nodes = material.node_tree.nodes
+    for node in nodes:
+        if node.type != 'BSDF_PRINCIPLED':
+            continue
+        base = node.inputs.get('Base Color')
+        if base and base.is_linked:
+            source = base.links[0].from_node
+            if source.type == 'TEX_IMAGE' and source.image:
+                return bpy.path.abspath(source.image.filepath, library=source.image.library)
+    for node in nodes:
+        if node.type == 'TEX_IMAGE' and node.image:
+            return bpy.path.abspath(node.image.filepath, library=node.image.library)
+    return None
+
+
+def build_material(mesh_obj, slot: int, textures: Dict[str, int]) -> PMXMaterial:
+    """PMX material for a slot; its texture is registered in ``textures`` (absolute path)."""
+    material = mesh_obj.material_slots[slot].material if slot < len(mesh_obj.material_slots) else None
+    name = material.name if material else f"{mesh_obj.name}_{slot}"
+    pmx_mat = PMXMaterial(name=name, name_en=name)
+    if material is not None:
+        r, g, b, a = material.diffuse_color
+        pmx_mat.diffuse = (r, g, b, a)
+        pmx_mat.ambient = (r * 0.5, g * 0.5, b * 0.5)
+        if material.use_backface_culling:
+            pmx_mat.flags &= ~MATERIAL_DOUBLE_SIDED
+        path = _material_texture(material)
+        if path:
+            path = os.path.normpath(path)
+            pmx_mat.texture = textures.setdefault(path, len(textures))
+    return pmx_mat
+
+
+def build_bones(armature, scale: float, warnings: List[str]) -> List[PMXBone]:
+    """PMX bones in ``armature.data.bones`` order (IK from pose constraints)."""
+    bones = armature.data.bones
+    index = {bone.name: i for i, bone in enumerate(bones)}
+    mw = _world_matrix(armature)
+    heads = _read(bones, 'head_local', 3).astype(np.float64) @ mw[:3, :3].T + mw[:3, 3]
+    tails = _read(bones, 'tail_local', 3).astype(np.float64) @ mw[:3, :3].T + mw[:3, 3]
+    mmd_heads = to_mmd_space(heads, scale)
+    mmd_offsets = to_mmd_space(tails - heads, scale)
+
+    result = []
+    for i, bone in enumerate(bones):
+        pmx_bone = PMXBone(
+            name=bone.name,
+            position=tuple(mmd_heads[i].tolist()),
+            parent=index[bone.parent.name] if bone.parent else -1,
+            tail_offset=tuple(mmd_offsets[i].tolist()),
+        )
+        connected = [child for child in bone.children if child.use_connect]
+        if connected:
+            pmx_bone.tail_bone = index[connected[0].name]
+        pmx_bone.translatable = (bone.parent is None or bone.name in _TRANSLATABLE_BONES
+                                 or 'IK' in bone.name or 'ＩＫ' in bone.name)
+        result.append(pmx_bone)
+
+    for pose_bone in armature.pose.bones:
+        _read_inherit(pose_bone, index, result)
+        for constraint in pose_bone.constraints:
+            if constraint.type == 'IK' and constraint.target == armature:
+                _read_ik(armature, pose_bone, constraint, index, result, warnings)
+    return result
+
+
+def _read_inherit(pose_bone, index: Dict[str, int], result: List[PMXBone]) -> None:
+    """付与 settings stored by mmd_tools on ``pose_bone.mmd_bone`` (if present)."""
+    mmd_bone = getattr(pose_bone, 'mmd_bone', None)
+    if mmd_bone is None:
+        return
+    parent = index.get(getattr(mmd_bone, 'additional_transform_bone', ''))
+    if parent is None:
+        return
+    pmx_bone = result[index[pose_bone.name]]
+    pmx_bone.inherit_parent = parent
+    pmx_bone.inherit_rotation = bool(getattr(mmd_bone, 'has_additional_rotation', False))
+    pmx_bone.inherit_translation = bool(getattr(mmd_bone, 'has_additional_location', False))
+    pmx_bone.inherit_weight = float(getattr(mmd_bone, 'additional_transform_influence', 1.0))
+
+
+def _read_ik(armature, pose_bone, constraint, index: Dict[str, int], result: List[PMXBone],
+             warnings: List[str]) -> None:
+    """Convert a Blender IK constraint to PMX IK on its target bone.
+
+    Blender puts the constraint on the last chain bone and pulls that bone's
+    tail to the target; PMX pulls a target bone's head, so the IK target is
+    the child whose head sits on that tail.
+    """
+    ik_bone = index.get(constraint.subtarget)
+    if ik_bone is None:
+        return
+    bone = pose_bone.bone
+    tail = bone.tail_local
+    target = None
+    for child in bone.children:
+        if (child.head_local - tail).length < 1e-4:
+            target = index[child.name]
+            break
+    if target is None:
+        warnings.append(f"IK {constraint.subtarget}: {bone.name} 的尾端没有子骨骼，跳过")
+        return
+
+    links = []
+    chain_count = constraint.chain_count or len(bone.parent_recursive) + 1
+    link = bone
+    while link is not None and len(links) < chain_count:
+        limits = _KNEE_LIMITS if 'ひざ' in link.name else None
+        links.append(PMXIKLink(bone=index[link.name], limits=limits))
+        link = link.parent
+    result[ik_bone].ik = PMXIK(target=target, links=links)
+
+
+def evaluation_order(armature, warnings: Optional[List[str]] = None) -> List[str]:
+    """Armature bone names in PMX evaluation order (see ``bone_order``).
+
+    For exporters that write bones straight from the armature.
+    """
+    bones = build_bones(armature, DEFAULT_SCALE, warnings if warnings is not None else [])
+    order, _, _ = order_bones(bones)
+    return [bones[i].name for i in order]
+
+
+def default_frames(bones: List[PMXBone], morphs: Optional[List[PMXMorph]] = None,
+                   table: Optional[BoneGroupTable] = None) -> List[PMXDisplayFrame]:
+    """Root and 表情 (every morph) special frames plus one frame per bone group.
+
+    Bones other than the root are framed by ``table`` (default: the compiled
+    ``mapping.groups`` table); bones it does not list go to その他.
+    """
+    if table is None:
+        table = default_table()
+    frames = [
+        PMXDisplayFrame(name="Root", name_en="Root", special=True,
+                        elements=[(0, 0)] if bones else []),
+        PMXDisplayFrame(name="表情", name_en="Exp", special=True,
+                        elements=[(1, i) for i in range(len(morphs or ()))]),
+    ]
+    index = {bone.name: i for i, bone in enumerate(bones)}
+    groups = table.partition((bone.name for bone in bones[1:]), other=OTHER_GROUP)
+    for group, names in groups.items():
+        frames.append(PMXDisplayFrame(name=group, name_en=table.name_en.get(group, group),
+                                      elements=[(0, index[name]) for name in names]))
+    return frames
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Model assembly
+# ─────────────────────────────────────────────────────────────────────────────
+
+def build_model(armature, meshes: List, scale: float = DEFAULT_SCALE,
+                report: Optional[ExportReport] = None,
+                max_influences: int = MAX_INFLUENCES,
+                morph_threshold: Optional[float] = MORPH_THRESHOLD,
+                reuse: bool = True) -> PMXModel:
+    """Collect a PMXModel from an armature and the meshes it deforms.
+
+    Shape keys with the same name on several meshes become one morph;
+    ``morph_threshold=None`` skips morphs entirely. ``model.textures`` holds
+    absolute source paths (``export_pmx`` collects or relativizes them).
+    ``reuse`` lets unchanged meshes and shape keys reuse earlier buffers
+    (see the module docstring).
+    """
+    report = report if report is not None else ExportReport()
+    # merge() only sums counters; the limit comes from the caller
+    report.weights.max_influences = max_influences
+    lap_start = time.perf_counter()
+
+    def lap(name):
+        nonlocal lap_start
+        now = time.perf_counter()
+        report.timings[name] = report.timings.get(name, 0.0) + now - lap_start
+        lap_start = now
+
+    model = PMXModel(name=armature.name, name_en=armature.name,
+                     comment="Exported by XPS to PMX", comment_en="Exported by XPS to PMX")
+    model.bones = build_bones(armature, scale, report.warnings)
+    bone_index = {bone.name: i for i, bone in enumerate(model.bones)}
+    lap('bones')
+
+    parts = []
+    textures: Dict[str, int] = {}
+    morphs: Dict[str, List[PMXMorph]] = {}
+    base = 0
+    for mesh_obj in meshes:
+        buffers, reused = read_mesh(mesh_obj, bone_index, scale, max_influences, reuse)
+        if buffers is None:
+            continue
+        if reused:
+            report.cached_meshes.append(mesh_obj.name)
+        report.weights.merge(buffers.weights)
+        report.loops += buffers.loop_count
+        if buffers.weights.dropped_max > DROPPED_WEIGHT_WARNING:
+            report.warnings.append(
+                f"{mesh_obj.name}: {buffers.weights.over_limit} 个顶点超过 "
+                f"{max_influences} 骨，最多丢弃 {buffers.weights.dropped_max:.0%} 权重")
+        # Group triangles by material slot; reverse winding for the mirrored axes
+        order = np.argsort(buffers.material_index, kind='stable')
+        tris = buffers.triangles[order][:, [0, 2, 1]] + base
+        slots, counts = np.unique(buffers.material_index[order], return_counts=True)
+        for slot, count in zip(slots.tolist(), counts.tolist()):
+            material = build_material(mesh_obj, slot, textures)
+            material.index_count = count * 3
+            model.materials.append(material)
+        parts.append((buffers, tris))
+        if morph_threshold is not None:
+            for morph in read_morphs(mesh_obj, buffers.vertex_of, scale, morph_threshold, reuse):
+                morph.indices = morph.indices + base
+                morphs.setdefault(morph.name, []).append(morph)
+        base += len(buffers.positions)
+    lap('meshes')
+
+    if parts:
+        model.positions = np.concatenate([b.positions for b, _ in parts])
+        model.normals = np.concatenate([b.normals for b, _ in parts])
+        model.uvs = np.concatenate([b.uvs for b, _ in parts])
+        model.weight_types = np.concatenate([b.weight_types for b, _ in parts])
+        model.bone_indices = np.concatenate([b.bone_indices for b, _ in parts])
+        model.bone_weights = np.concatenate([b.bone_weights for b, _ in parts])
+        model.indices = np.concatenate([t.ravel() for _, t in parts])
+    model.edge_scale = np.ones(model.vertex_count, dtype=np.float32)
+    model.textures = list(textures)
+    for name, pieces in morphs.items():
+        model.morphs.append(PMXMorph(
+            name=name, name_en=name, panel=pieces[0].panel,
+            indices=np.concatenate([m.indices for m in pieces]),
+            offsets=np.concatenate([m.offsets for m in pieces])))
+    report.morphs = len(model.morphs)
+    report.morph_offsets = sum(len(m.indices) for m in model.morphs)
+    model.frames = default_frames(model.bones, model.morphs)
+    lap('assemble')
+    return model
+
+
+def export_pmx(armature, path: str, meshes: Optional[List] = None,
+               scale: float = DEFAULT_SCALE, max_influences: int = MAX_INFLUENCES,
+               optimize_cache: bool = True,
+               morph_threshold: Optional[float] = MORPH_THRESHOLD,
+               copy_textures: bool = True, incremental: bool = True,
+               sort_bones: bool = True, reuse: bool = True) -> ExportReport:
+    """Export an armature and its deformed meshes to a PMX 2.0 file.
+
+    Args:
+        armature: Armature object
+        path: Output .pmx path
+        meshes: Meshes to export (defaults to ``skinning.deformed_meshes``)
+        scale: Blender units -> MMD units
+        max_influences: Bone influences kept per vertex (1-4, see ``compaction``)
+        optimize_cache: Reorder triangles and vertices for the vertex cache
+            (see ``vertex_cache``)
+        morph_threshold: Smallest exported shape key offset in MMD units
+            (None: no morphs)
+        copy_textures: Copy deduplicated textures next to the PMX (see
+            ``textures``); otherwise reference the sources by relative path
+        incremental: Re-encode only the sections that changed since the last
+            export to ``path`` (see ``incremental``)
+        sort_bones: Put bones in dependency order: parents, 付与 parents and
+            IK chains first (see ``bone_order``)
+        reuse: Reuse the welded buffers, morph offsets and triangle order of
+            meshes unchanged since an earlier export in this session
+
+    Returns:
+        ExportReport
+
+    Raises:
+        ValueError: if there is nothing to export
+    """
+    report = ExportReport(path=path)
+    if meshes is None:
+        meshes = skinning.deformed_meshes(armature)
+    if not meshes:
+        raise ValueError("没有受该骨架变形的网格")
+
+    output_dir = os.path.dirname(path)
+    model = build_model(armature, meshes, scale, report, max_influences, morph_threshold, reuse)
+    if sort_bones:
+        report.bone_order = sort_model_bones(model)
+        report.warnings.extend(f"骨骼循环依赖已忽略: {dependency}"
+                               for dependency in report.bone_order.dropped)
+        report.timings['bone_order'] = report.bone_order.elapsed
+    if copy_textures and model.textures:
+        table, remap, report.texture_files = collect_textures(model.textures, output_dir)
+        for material in model.materials:
+            if material.texture >= 0:
+                material.texture = remap[material.texture]
+        model.textures = table
+        report.warnings.extend(report.texture_files.warnings)
+        report.timings['textures'] = report.texture_files.elapsed
+    else:
+        model.textures = [relative_path(p, output_dir) for p in model.textures]
+    if optimize_cache:
+        report.cache = optimize_model(model, reuse=reuse)
+        report.timings['optimize'] = report.cache.elapsed
+
+    written = write_incremental(model, path) if incremental else write_pmx(model, path)
+    report.timings['write'] = written.elapsed
+    report.reused = written.reused
+    report.vertices = model.vertex_count
+    report.faces = model.face_count
+    report.materials = len(model.materials)
+    report.bones = len(model.bones)
+    report.textures = len(model.textures)
+    report.size = written.size
+    return report
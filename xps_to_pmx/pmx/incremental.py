@@ -0,0 +1,257 @@
+"""
+Incremental PMX re-export: only sections whose content changed are re-encoded.
+增量导出：按段记录内容哈希（旁路 JSON 文件），未变化的段直接按字节范围从上一次的 PMX 复制。
+
+Every write records, next to the PMX, the byte range and a digest of each
+section (``writer.SECTIONS``). The next write digests the new model the same
+way; sections with an unchanged digest are streamed from the previous file
+by byte range and only the others are encoded. The output still goes through
+``writer.write_sections``, so the replacement stays atomic.
+
+The large sections (vertices, faces, morphs) are digested from the model's
+arrays, which is much cheaper than encoding them; the small ones are encoded
+and their bytes digested. Every digest includes the index sizes the encoding
+depends on. The previous file is only trusted when its size and mtime still
+match the sidecar; bump ``SIDECAR_VERSION`` whenever the writer's encoding
+changes.
+
+This module does not import bpy.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .model import PMXModel
+from .writer import IndexSizes, WriteReport, iter_sections, write_sections
+
+SIDECAR_SUFFIX = '.sections.json'
+SIDECAR_VERSION = 1
+
+# Bytes read per chunk when copying a reused section
+COPY_CHUNK = 8 << 20
+
+
+def sidecar_path(path: str) -> str:
+    return path + SIDECAR_SUFFIX
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Digests
+# ─────────────────────────────────────────────────────────────────────────────
+
+def content_digest(items) -> str:
+    """BLAKE2b of a sequence of arrays (dtype, shape and data), bytes and reprs."""
+    digest = hashlib.blake2b(digest_size=16)
+    for item in items:
+        if isinstance(item, np.ndarray):
+            array = np.ascontiguousarray(item)
+            digest.update(f"{array.dtype.str}{array.shape}".encode())
+            digest.update(array.view(np.uint8).reshape(-1))
+        elif isinstance(item, (bytes, bytearray)):
+            digest.update(item)
+        else:
+            digest.update(repr(item).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def array_bytes(value) -> int:
+    """Bytes held by the NumPy arrays in ``value`` (tuples, lists, dataclasses)."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(array_bytes(item) for item in value)
+    if is_dataclass(value):
+        return sum(array_bytes(getattr(value, f.name)) for f in fields(value))
+    return 0
+
+
+class ReuseCache:
+    """Content digest -> computed value, LRU, capped by the bytes of its arrays.
+
+    Used to keep build results (welded buffers, morph offsets, triangle
+    orders) between exports. Values larger than the cap are not kept.
+    """
+
+    def __init__(self, memory_cap: int):
+        self.memory_cap = memory_cap
+        self._entries: 'OrderedDict[str, Tuple[Any, int]]' = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Optional[str], compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(value, reused): the value stored under ``key``, else ``compute()`` (stored)."""
+        if key is None:
+            return compute(), False
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry[0], True
+        value = compute()
+        size = array_bytes(value)
+        if size <= self.memory_cap:
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.memory_cap:
+                _, (_, dropped) = self._entries.popitem(last=False)
+                self._bytes -= dropped
+        return value, False
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+
+def _vertex_inputs(model: PMXModel, sizes: IndexSizes):
+    yield sizes.bone
+    for attr in ('positions', 'normals', 'uvs', 'weight_types', 'bone_indices',
+                 'bone_weights', 'edge_scale'):
+        yield getattr(model, attr)
+
+
+def _face_inputs(model: PMXModel, sizes: IndexSizes):
+    yield sizes.vertex
+    yield model.indices
+
+
+def _morph_inputs(model: PMXModel, sizes: IndexSizes):
+    yield sizes.vertex
+    yield len(model.morphs)
+    for morph in model.morphs:
+        yield (morph.name, morph.name_en, morph.panel, morph.kind)
+        yield np.asarray(morph.indices)
+        yield np.asarray(morph.offsets)
+
+
+# Sections digested from model arrays instead of their encoded bytes
+_ARRAY_INPUTS = {
+    'vertices': _vertex_inputs,
+    'faces': _face_inputs,
+    'morphs': _morph_inputs,
+}
+
+
+def section_digests(model: PMXModel, workers: Optional[int] = None) -> Dict[str, str]:
+    """Section name -> content digest of what ``writer.iter_sections`` would write."""
+    sizes = IndexSizes.for_model(model)
+    version = (SIDECAR_VERSION,)
+    digests = {}
+    for name, chunks in iter_sections(model):
+        if name not in _ARRAY_INPUTS:
+            digests[name] = content_digest(version + tuple(chunks))
+    # hashlib releases the GIL on large buffers, so the array sections hash in parallel
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {name: pool.submit(
+                       lambda f=inputs: content_digest(version + tuple(f(model, sizes))))
+                   for name, inputs in _ARRAY_INPUTS.items()}
+        for name, future in futures.items():
+            digests[name] = future.result()
+    return digests
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Sidecar
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _stat_key(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def load_sidecar(path: str) -> Optional[Dict[str, list]]:
+    """Section name -> [offset, length, digest] of ``path``, if still valid."""
+    try:
+        with open(sidecar_path(path), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('version') != SIDECAR_VERSION:
+        return None
+    stat = _stat_key(path)
+    if stat is None or data.get('file') != stat:
+        return None
+    sections = data.get('sections', {})
+    if sum(entry[1] for entry in sections.values()) != stat[0]:
+        return None
+    return sections
+
+
+def save_sidecar(path: str, report: WriteReport, digests: Dict[str, str]) -> None:
+    data = {
+        'version': SIDECAR_VERSION,
+        'file': _stat_key(path),
+        'sections': {name: [offset, length, digests[name]]
+                     for name, (offset, length) in report.sections.items()},
+    }
+    temp = sidecar_path(path) + '.tmp'
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+    os.replace(temp, sidecar_path(path))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Write
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _read_range(path: str, offset: int, length: int) -> Iterator[bytes]:
+    # Opened per section so the previous file is closed again before it is replaced
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while length > 0:
+            data = f.read(min(COPY_CHUNK, length))
+            if not data:
+                raise OSError(f"{path} 在增量导出过程中被截断")
+            length -= len(data)
+            yield data
+
+
+def write_incremental(model: PMXModel, path: str) -> WriteReport:
+    """Write ``model`` to ``path``, copying sections unchanged since the last write.
+
+    Falls back to a full write when there is no valid sidecar. The sidecar is
+    refreshed after every write.
+
+    Raises:
+        ValueError: if the model's buffers are inconsistent
+        OSError: if the file cannot be written
+    """
+    start = time.perf_counter()
+    model.check()
+    digests = section_digests(model)
+    previous = load_sidecar(path) or {}
+    reused = []
+
+    def sections():
+        for name, chunks in iter_sections(model):
+            entry = previous.get(name)
+            if entry is not None and entry[2] == digests[name]:
+                reused.append(name)
+                yield name, _read_range(path, entry[0], entry[1])
+            else:
+                yield name, chunks
+
+    report = write_sections(path, sections())
+    report.reused = reused
+    try:
+        save_sidecar(path, report, digests)
+    except OSError:
+        # A stale sidecar no longer matches the file's mtime and is ignored
+        pass
+    report.elapsed = time.perf_counter() - start
+    return report
@@ -0,0 +1,218 @@
+"""In-memory PMX 2.0 model: NumPy vertex / index buffers plus small record lists.
+
+Everything here is already in MMD space (Y up, left-handed, MMD units), so the
+writer only has to encode. Vertex attributes are parallel arrays indexed by
+PMX vertex index; materials own consecutive runs of ``indices``.
+
+This module does not import bpy.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Vertex deform types (PMX 2.0)
+BDEF1 = 0
+BDEF2 = 1
+BDEF4 = 2
+SDEF = 3
+
+# Bone flags
+BONE_TAIL_IS_BONE = 0x0001
+BONE_ROTATABLE = 0x0002
+BONE_TRANSLATABLE = 0x0004
+BONE_VISIBLE = 0x0008
+BONE_OPERABLE = 0x0010
+BONE_IK = 0x0020
+BONE_INHERIT_ROTATION = 0x0100
+BONE_INHERIT_TRANSLATION = 0x0200
+
+# Morph kinds
+MORPH_GROUP = 0
+MORPH_VERTEX = 1
+MORPH_BONE = 2
+MORPH_UV = 3
+MORPH_MATERIAL = 8
+
+# Morph panels (where MMD lists the morph)
+PANEL_EYEBROW = 1
+PANEL_EYE = 2
+PANEL_MOUTH = 3
+PANEL_OTHER = 4
+
+# Material flags
+MATERIAL_DOUBLE_SIDED = 0x01
+MATERIAL_GROUND_SHADOW = 0x02
+MATERIAL_SELF_SHADOW_MAP = 0x04
+MATERIAL_SELF_SHADOW = 0x08
+MATERIAL_EDGE = 0x10
+
+Vec3 = Tuple[float, float, float]
+
+
+@dataclass
+class PMXMaterial:
+    """One material; it draws the next ``index_count`` indices of the model."""
+    name: str
+    name_en: str = ""
+    diffuse: Tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0)
+    specular: Vec3 = (0.0, 0.0, 0.0)
+    specular_strength: float = 5.0
+    ambient: Vec3 = (0.5, 0.5, 0.5)
+    flags: int = (MATERIAL_DOUBLE_SIDED | MATERIAL_GROUND_SHADOW | MATERIAL_SELF_SHADOW_MAP
+                  | MATERIAL_SELF_SHADOW | MATERIAL_EDGE)
+    edge_color: Tuple[float, float, float, float] = (0.0, 0.0, 0.0, 1.0)
+    edge_size: float = 1.0
+    texture: int = -1
+    sphere_texture: int = -1
+    sphere_mode: int = 0
+    shared_toon: bool = True
+    toon: int = 0              # shared toon 0..9, or texture index when not shared
+    comment: str = ""
+    index_count: int = 0
+
+
+@dataclass
+class PMXIKLink:
+    bone: int
+    limits: Optional[Tuple[Vec3, Vec3]] = None   # (min, max) in radians
+
+
+@dataclass
+class PMXIK:
+    target: int
+    links: List[PMXIKLink] = field(default_factory=list)
+    loop_count: int = 40
+    limit_angle: float = 2.0    # radians per iteration
+
+
+@dataclass
+class PMXBone:
+    """One bone; ``position`` is the head in model space."""
+    name: str
+    name_en: str = ""
+    position: Vec3 = (0.0, 0.0, 0.0)
+    parent: int = -1
+    layer: int = 0
+    tail_bone: int = -1          # >= 0: tail points at this bone
+    tail_offset: Vec3 = (0.0, 0.0, 0.0)
+    rotatable: bool = True
+    translatable: bool = False
+    visible: bool = True
+    operable: bool = True
+    inherit_parent: int = -1
+    inherit_rotation: bool = False
+    inherit_translation: bool = False
+    inherit_weight: float = 1.0
+    ik: Optional[PMXIK] = None
+
+    @property
+    def flags(self) -> int:
+        flags = 0
+        if self.tail_bone >= 0:
+            flags |= BONE_TAIL_IS_BONE
+        if self.rotatable:
+            flags |= BONE_ROTATABLE
+        if self.translatable:
+            flags |= BONE_TRANSLATABLE
+        if self.visible:
+            flags |= BONE_VISIBLE
+        if self.operable:
+            flags |= BONE_OPERABLE
+        if self.ik is not None:
+            flags |= BONE_IK
+        if self.inherit_parent >= 0 and self.inherit_rotation:
+            flags |= BONE_INHERIT_ROTATION
+        if self.inherit_parent >= 0 and self.inherit_translation:
+            flags |= BONE_INHERIT_TRANSLATION
+        return flags
+
+
+@dataclass
+class PMXMorph:
+    """Vertex morph as sparse (vertex index, offset) pairs.
+
+    Other morph kinds are only read (``kind`` and ``count``); their offsets
+    are not kept.
+    """
+    name: str
+    name_en: str = ""
+    panel: int = PANEL_OTHER
+    kind: int = MORPH_VERTEX
+    indices: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int32))
+    offsets: np.ndarray = field(default_factory=lambda: np.zeros((0, 3), np.float32))
+    count: int = 0
+
+    def __post_init__(self):
+        if self.kind == MORPH_VERTEX:
+            self.count = len(self.indices)
+
+
+@dataclass
+class PMXDisplayFrame:
+    """Display frame; elements are (0, bone index) or (1, morph index)."""
+    name: str
+    name_en: str = ""
+    special: bool = False
+    elements: List[Tuple[int, int]] = field(default_factory=list)
+
+
+@dataclass
+class PMXModel:
+    """A complete PMX model.
+
+    Vertex arrays (N = vertex count):
+        positions (N, 3) float32, normals (N, 3) float32, uvs (N, 2) float32,
+        weight_types (N,) uint8, bone_indices (N, 4) int32,
+        bone_weights (N, 4) float32, edge_scale (N,) float32
+    ``indices`` holds three vertex indices per triangle, grouped by material.
+    ``morphs`` are vertex morphs (sparse offsets in model space).
+    """
+    name: str = ""
+    name_en: str = ""
+    comment: str = ""
+    comment_en: str = ""
+    positions: np.ndarray = field(default_factory=lambda: np.zeros((0, 3), np.float32))
+    normals: np.ndarray = field(default_factory=lambda: np.zeros((0, 3), np.float32))
+    uvs: np.ndarray = field(default_factory=lambda: np.zeros((0, 2), np.float32))
+    weight_types: np.ndarray = field(default_factory=lambda: np.zeros(0, np.uint8))
+    bone_indices: np.ndarray = field(default_factory=lambda: np.zeros((0, 4), np.int32))
+    bone_weights: np.ndarray = field(default_factory=lambda: np.zeros((0, 4), np.float32))
+    edge_scale: np.ndarray = field(default_factory=lambda: np.zeros(0, np.float32))
+    indices: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    textures: List[str] = field(default_factory=list)
+    materials: List[PMXMaterial] = field(default_factory=list)
+    bones: List[PMXBone] = field(default_factory=list)
+    morphs: List[PMXMorph] = field(default_factory=list)
+    frames: List[PMXDisplayFrame] = field(default_factory=list)
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.positions)
+
+    @property
+    def face_count(self) -> int:
+        return len(self.indices) // 3
+
+    def check(self) -> None:
+        """Raise ValueError if the buffers are inconsistent."""
+        n = self.vertex_count
+        for attr, shape in (('normals', (n, 3)), ('uvs', (n, 2)), ('weight_types', (n,)),
+                            ('bone_indices', (n, 4)), ('bone_weights', (n, 4)),
+                            ('edge_scale', (n,))):
+            if getattr(self, attr).shape != shape:
+                raise ValueError(f"{attr} has shape {getattr(self, attr).shape}, expected {shape}")
+        if len(self.indices) % 3:
+            raise ValueError("index count is not a multiple of 3")
+        if len(self.indices) and (self.indices.min() < 0 or self.indices.max() >= n):
+            raise ValueError("vertex index out of range")
+        if sum(m.index_count for m in self.materials) != len(self.indices):
+            raise ValueError("material index counts do not add up to the index buffer")
+        for morph in self.morphs:
+            if morph.kind != MORPH_VERTEX:
+                raise ValueError(f"morph '{morph.name}': only vertex morphs can be written")
+            if morph.offsets.shape != (len(morph.indices), 3):
+                raise ValueError(f"morph '{morph.name}': offsets do not match its indices")
+            if len(morph.indices) and (morph.indices.min() < 0 or morph.indices.max() >= n):
+                raise ValueError(f"morph '{morph.name}': vertex index out of range")
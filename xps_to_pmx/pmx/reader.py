@@ -0,0 +1,736 @@
+"""
+Memory-mapped, lazy PMX 2.0 / 2.1 reader.
+PMX 读取器：文件用 mmap 映射，各段按需解析成 NumPy 数组，不在 Python 中逐顶点建对象。
+
+Sections are parsed in file order and only as far as needed: asking for the
+bones parses (and remembers the byte ranges of) everything before them, but
+vertex attributes are only materialised when ``vertices`` is accessed.
+
+Vertex records have variable size (the deform type decides), so their offsets
+are found by scanning runs: from a record of type ``t`` the next records are
+assumed to be ``t`` as well and their type bytes are checked in one vectorized
+read; the first mismatch is exactly aligned, so the scan continues from there.
+Files where every vertex has the same type are read as a zero-copy structured
+view of the map.
+
+Usage:
+    with PMXReader(path) as pmx:
+        pmx.header.vertex_size, pmx.vertices.positions, pmx.bones[0].name
+
+This module does not import bpy.
+"""
+
+import mmap
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .model import (BDEF1, BDEF2, BDEF4, SDEF, MORPH_VERTEX, PMXBone, PMXDisplayFrame, PMXIK,
+                    PMXIKLink, PMXMaterial, PMXMorph, BONE_TAIL_IS_BONE, BONE_TRANSLATABLE,
+                    BONE_ROTATABLE, BONE_VISIBLE, BONE_OPERABLE, BONE_IK,
+                    BONE_INHERIT_ROTATION, BONE_INHERIT_TRANSLATION)
+from .bone_order import order_violations
+from .writer import SECTIONS
+
+QDEF = 4   # PMX 2.1, same layout as BDEF4
+
+_BONE_FIXED_AXIS = 0x0400
+_BONE_LOCAL_AXES = 0x0800
+_BONE_EXTERNAL_PARENT = 0x2000
+
+_SIGNED = {1: '<i1', 2: '<i2', 4: '<i4'}
+_UNSIGNED_VERTEX = {1: '<u1', 2: '<u2', 4: '<i4'}
+
+# Morph offset sizes without the leading index (by morph kind)
+_MORPH_TAIL = {0: 4, 1: 12, 2: 28, 3: 16, 4: 16, 5: 16, 6: 16, 7: 16, 8: 113, 9: 4, 10: 25}
+
+
+class PMXFormatError(ValueError):
+    """The file is not a PMX file or is truncated / corrupt."""
+
+
+@dataclass
+class PMXHeader:
+    version: float
+    encoding: int
+    additional_uvs: int
+    vertex_size: int
+    texture_size: int
+    material_size: int
+    bone_size: int
+    morph_size: int
+    rigid_body_size: int
+    name: str = ""
+    name_en: str = ""
+    comment: str = ""
+    comment_en: str = ""
+
+
+@dataclass
+class PMXVertices:
+    """Vertex attributes as arrays (N = vertex count).
+
+    ``bone_indices`` is (N, 4) with -1 in unused slots; ``bone_weights`` is
+    (N, 4) with the implied weights filled in (BDEF1 = 1.0, BDEF2 = w, 1 - w).
+    """
+    positions: np.ndarray
+    normals: np.ndarray
+    uvs: np.ndarray
+    weight_types: np.ndarray
+    bone_indices: np.ndarray
+    bone_weights: np.ndarray
+    edge_scale: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+
+class _Cursor:
+    """Sequential struct reads over the mapped buffer."""
+
+    def __init__(self, buf, pos: int, header: Optional[PMXHeader] = None):
+        self.buf = buf
+        self.pos = pos
+        self.header = header
+
+    def unpack(self, fmt: str):
+        try:
+            values = struct.unpack_from(fmt, self.buf, self.pos)
+        except struct.error as e:
+            raise PMXFormatError(f"truncated at byte {self.pos}") from e
+        self.pos += struct.calcsize(fmt)
+        return values
+
+    def one(self, fmt: str):
+        return self.unpack(fmt)[0]
+
+    def floats(self, count: int) -> Tuple[float, ...]:
+        return self.unpack(f'<{count}f')
+
+    def text(self) -> str:
+        length = self.one('<i')
+        if length < 0 or self.pos + length > len(self.buf):
+            raise PMXFormatError(f"bad text length {length} at byte {self.pos - 4}")
+        data = bytes(self.buf[self.pos:self.pos + length])
+        self.pos += length
+        encoding = 'utf-16-le' if self.header is None or self.header.encoding == 0 else 'utf-8'
+        return data.decode(encoding, errors='replace')
+
+    def skip(self, count: int) -> None:
+        self.pos += count
+        if self.pos > len(self.buf):
+            raise PMXFormatError("truncated")
+
+
+_INDEX_FMT = {1: '<b', 2: '<h', 4: '<i'}
+
+
+def _index(cursor: _Cursor, size: int) -> int:
+    return cursor.one(_INDEX_FMT[size])
+
+
+class PMXReader:
+    """Lazy reader over a memory-mapped PMX file.
+
+    Attributes (parsed on first access):
+        header, vertex_count, vertices, indices, textures, materials, bones,
+        morphs, frames, rigid_body_count, joint_count
+        sections: section name -> (byte offset, byte length), for the
+            sections parsed so far (all of them after ``parse_all``)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:  # empty file
+            self._file.close()
+            raise PMXFormatError("empty file") from e
+        self.data = np.frombuffer(self._map, dtype=np.uint8)
+        self.sections: Dict[str, Tuple[int, int]] = {}
+        self._parsed: Dict[str, object] = {}
+        self._end = 0
+        self._vertex_scan = None
+        self.header = self._parse_header()
+
+    # ─── Lifetime ────────────────────────────────────────────────────────────
+
+    def close(self) -> None:
+        if self._map is not None:
+            # Arrays viewing the map must not outlive it
+            self.data = None
+            self._parsed.pop('vertices', None)
+            self._parsed.pop('faces', None)
+            self._vertex_scan = None
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # still exported by a caller's view; released with it
+            self._map = None
+            self._file.close()
+
+    def __enter__(self) -> 'PMXReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ─── Header ──────────────────────────────────────────────────────────────
+
+    def _parse_header(self) -> PMXHeader:
+        cursor = _Cursor(self._map, 0)
+        magic = bytes(self._map[:4])
+        if magic != b'PMX ':
+            raise PMXFormatError(f"not a PMX file (magic {magic!r})")
+        cursor.skip(4)
+        version, count = cursor.unpack('<fB')
+        if count < 8:
+            raise PMXFormatError(f"globals block too short ({count})")
+        globals_ = cursor.unpack(f'<{count}B')
+        header = PMXHeader(version, *globals_[:8])
+        if header.encoding not in (0, 1):
+            raise PMXFormatError(f"unknown text encoding {header.encoding}")
+        for size in (header.vertex_size, header.texture_size, header.material_size,
+                     header.bone_size, header.morph_size, header.rigid_body_size):
+            if size not in (1, 2, 4):
+                raise PMXFormatError(f"bad index size {size}")
+        cursor.header = header
+        header.name = cursor.text()
+        header.name_en = cursor.text()
+        header.comment = cursor.text()
+        header.comment_en = cursor.text()
+        self.sections['header'] = (0, cursor.pos)
+        self._end = cursor.pos
+        return header
+
+    # ─── Section driver ──────────────────────────────────────────────────────
+
+    def _section(self, name: str):
+        """Parse sections in file order up to ``name`` and return its value."""
+        if name in self._parsed:
+            return self._parsed[name]
+        for section in SECTIONS[1:]:
+            if section in self.sections:
+                continue
+            start = self._end
+            cursor = _Cursor(self._map, start, self.header)
+            value = getattr(self, f'_parse_{section}')(cursor)
+            self.sections[section] = (start, cursor.pos - start)
+            self._end = cursor.pos
+            if value is not None:
+                self._parsed[section] = value
+            if section == name:
+                break
+        return self._parsed.get(name)
+
+    def parse_all(self) -> 'PMXReader':
+        """Parse every section (vertex attributes stay lazy)."""
+        self._section(SECTIONS[-1])
+        return self
+
+    # ─── Vertices ────────────────────────────────────────────────────────────
+
+    def _record_sizes(self) -> Dict[int, int]:
+        h = self.header
+        common = 32 + 16 * h.additional_uvs + 1
+        b = h.bone_size
+        return {
+            BDEF1: common + b + 4,
+            BDEF2: common + 2 * b + 4 + 4,
+            BDEF4: common + 4 * b + 16 + 4,
+            SDEF: common + 2 * b + 4 + 36 + 4,
+            QDEF: common + 4 * b + 16 + 4,
+        }
+
+    def _parse_vertices(self, cursor: _Cursor):
+        count = cursor.one('<i')
+        if count < 0:
+            raise PMXFormatError(f"bad vertex count {count}")
+        start = cursor.pos
+        sizes = self._record_sizes()
+        type_at = 32 + 16 * self.header.additional_uvs
+        offsets, types = _scan_records(self.data, start, count, type_at, sizes)
+        end = int(offsets[-1]) + sizes[int(types[-1])] if count else start
+        self._vertex_scan = (offsets, types)
+        cursor.pos = end
+        return None
+
+    @property
+    def vertex_count(self) -> int:
+        self._section('vertices')
+        return len(self._vertex_scan[0])
+
+    @property
+    def vertices(self) -> PMXVertices:
+        vertices = self._parsed.get('vertices')
+        if vertices is None:
+            self._section('vertices')
+            vertices = self._parsed['vertices'] = self._decode_vertices()
+        return vertices
+
+    def _decode_vertices(self) -> PMXVertices:
+        offsets, types = self._vertex_scan
+        n = len(offsets)
+        h = self.header
+        b = _SIGNED[h.bone_size]
+        uv_skip = 16 * h.additional_uvs
+        positions = np.empty((n, 3), np.float32)
+        normals = np.empty((n, 3), np.float32)
+        uvs = np.empty((n, 2), np.float32)
+        bones = np.full((n, 4), -1, np.int32)
+        weights = np.zeros((n, 4), np.float32)
+        edge = np.empty(n, np.float32)
+
+        for t in np.unique(types).tolist():
+            width = {BDEF1: 1, BDEF2: 2, SDEF: 2}.get(t, 4)
+            fields = [('pos', '<f4', (3,)), ('nrm', '<f4', (3,)), ('uv', '<f4', (2,))]
+            if uv_skip:
+                fields.append(('auv', 'V%d' % uv_skip))
+            fields += [('type', 'u1'), ('bone', b, (width,))]
+            if t in (BDEF2, SDEF):
+                fields.append(('weight', '<f4'))
+            elif t in (BDEF4, QDEF):
+                fields.append(('weight', '<f4', (4,)))
+            if t == SDEF:
+                fields.append(('sdef', '<f4', (9,)))
+            fields.append(('edge', '<f4'))
+            dtype = np.dtype(fields)
+
+            sel = np.flatnonzero(types == t)
+            if len(sel) == n and n > 1 and np.all(np.diff(offsets) == dtype.itemsize):
+                rec = np.ndarray(n, dtype=dtype, buffer=self._map, offset=int(offsets[0]))
+            else:
+                rec = _gather(self.data, offsets[sel], dtype)
+            positions[sel] = rec['pos']
+            normals[sel] = rec['nrm']
+            uvs[sel] = rec['uv']
+            bones[sel, :width] = rec['bone']
+            edge[sel] = rec['edge']
+            if t == BDEF1:
+                weights[sel, 0] = 1.0
+            elif t in (BDEF2, SDEF):
+                weights[sel, 0] = rec['weight']
+                weights[sel, 1] = 1.0 - rec['weight']
+            else:
+                weights[sel] = rec['weight']
+            del rec
+        return PMXVertices(positions, normals, uvs, types.copy(), bones, weights, edge)
+
+    # ─── Faces / textures / materials ────────────────────────────────────────
+
+    def _parse_faces(self, cursor: _Cursor):
+        count = cursor.one('<i')
+        size = self.header.vertex_size
+        if count < 0 or cursor.pos + count * size > len(self._map):
+            raise PMXFormatError(f"bad index count {count}")
+        indices = np.ndarray(count, dtype=_UNSIGNED_VERTEX[size], buffer=self._map,
+                             offset=cursor.pos)
+        cursor.pos += count * size
+        return indices
+
+    @property
+    def indices(self) -> np.ndarray:
+        """Flat vertex index buffer (three per triangle), a read-only view of the map."""
+        return self._section('faces')
+
+    def _parse_textures(self, cursor: _Cursor):
+        return [cursor.text() for _ in range(cursor.one('<i'))]
+
+    @property
+    def textures(self) -> List[str]:
+        return self._section('textures')
+
+    def _parse_materials(self, cursor: _Cursor):
+        h = self.header
+        materials = []
+        for _ in range(cursor.one('<i')):
+            mat = PMXMaterial(name=cursor.text(), name_en=cursor.text())
+            values = cursor.floats(11)
+            mat.diffuse, mat.specular = values[0:4], values[4:7]
+            mat.specular_strength, mat.ambient = values[7], values[8:11]
+            mat.flags = cursor.one('<B')
+            edge = cursor.floats(5)
+            mat.edge_color, mat.edge_size = edge[:4], edge[4]
+            mat.texture = _index(cursor, h.texture_size)
+            mat.sphere_texture = _index(cursor, h.texture_size)
+            mat.sphere_mode, shared = cursor.unpack('<BB')
+            mat.shared_toon = bool(shared)
+            mat.toon = cursor.one('<B') if shared else _index(cursor, h.texture_size)
+            mat.comment = cursor.text()
+            mat.index_count = cursor.one('<i')
+            materials.append(mat)
+        return materials
+
+    @property
+    def materials(self) -> List[PMXMaterial]:
+        return self._section('materials')
+
+    # ─── Bones ───────────────────────────────────────────────────────────────
+
+    def _parse_bones(self, cursor: _Cursor):
+        size = self.header.bone_size
+        bones = []
+        for _ in range(cursor.one('<i')):
+            bone = PMXBone(name=cursor.text(), name_en=cursor.text())
+            bone.position = cursor.floats(3)
+            bone.parent = _index(cursor, size)
+            bone.layer, flags = cursor.unpack('<iH')
+            if flags & BONE_TAIL_IS_BONE:
+                bone.tail_bone = _index(cursor, size)
+            else:
+                bone.tail_offset = cursor.floats(3)
+            bone.rotatable = bool(flags & BONE_ROTATABLE)
+            bone.translatable = bool(flags & BONE_TRANSLATABLE)
+            bone.visible = bool(flags & BONE_VISIBLE)
+            bone.operable = bool(flags & BONE_OPERABLE)
+            if flags & (BONE_INHERIT_ROTATION | BONE_INHERIT_TRANSLATION):
+                bone.inherit_parent = _index(cursor, size)
+                bone.inherit_weight = cursor.one('<f')
+                bone.inherit_rotation = bool(flags & BONE_INHERIT_ROTATION)
+                bone.inherit_translation = bool(flags & BONE_INHERIT_TRANSLATION)
+            if flags & _BONE_FIXED_AXIS:
+                cursor.skip(12)
+            if flags & _BONE_LOCAL_AXES:
+                cursor.skip(24)
+            if flags & _BONE_EXTERNAL_PARENT:
+                cursor.skip(4)
+            if flags & BONE_IK:
+                ik = PMXIK(target=_index(cursor, size))
+                ik.loop_count, ik.limit_angle = cursor.unpack('<if')
+                for _ in range(cursor.one('<i')):
+                    link = PMXIKLink(bone=_index(cursor, size))
+                    if cursor.one('<B'):
+                        values = cursor.floats(6)
+                        link.limits = (values[:3], values[3:])
+                    ik.links.append(link)
+                bone.ik = ik
+            bones.append(bone)
+        return bones
+
+    @property
+    def bones(self) -> List[PMXBone]:
+        return self._section('bones')
+
+    # ─── Morphs / frames / physics ───────────────────────────────────────────
+
+    def _parse_morphs(self, cursor: _Cursor):
+        h = self.header
+        index_size = {0: h.morph_size, 1: h.vertex_size, 2: h.bone_size, 8: h.material_size,
+                      9: h.morph_size, 10: h.rigid_body_size}
+        morphs = []
+        for _ in range(cursor.one('<i')):
+            name, name_en = cursor.text(), cursor.text()
+            panel, kind = cursor.unpack('<BB')
+            count = cursor.one('<i')
+            if kind not in _MORPH_TAIL or count < 0:
+                raise PMXFormatError(f"bad morph kind {kind} / count {count}")
+            isize = index_size.get(kind, h.vertex_size)
+            record = isize + _MORPH_TAIL[kind]
+            if cursor.pos + count * record > len(self._map):
+                raise PMXFormatError(f"morph '{name}' runs past the end of the file")
+            if kind == MORPH_VERTEX:
+                dtype = np.dtype([('index', _UNSIGNED_VERTEX[isize]), ('offset', '<f4', (3,))])
+                rec = np.ndarray(count, dtype=dtype, buffer=self._map, offset=cursor.pos)
+                morph = PMXMorph(name, name_en, panel, kind,
+                                 indices=rec['index'].astype(np.int32),
+                                 offsets=rec['offset'].copy())
+                del rec
+            else:
+                morph = PMXMorph(name, name_en, panel, kind, count=count)
+            cursor.pos += count * record
+            morphs.append(morph)
+        return morphs
+
+    @property
+    def morphs(self) -> List[PMXMorph]:
+        return self._section('morphs')
+
+    def _parse_frames(self, cursor: _Cursor):
+        h = self.header
+        frames = []
+        for _ in range(cursor.one('<i')):
+            frame = PMXDisplayFrame(name=cursor.text(), name_en=cursor.text())
+            frame.special = bool(cursor.one('<B'))
+            for _ in range(cursor.one('<i')):
+                kind = cursor.one('<B')
+                frame.elements.append((kind, _index(cursor, h.morph_size if kind else h.bone_size)))
+            frames.append(frame)
+        return frames
+
+    @property
+    def frames(self) -> List[PMXDisplayFrame]:
+        return self._section('frames')
+
+    def _parse_rigid_bodies(self, cursor: _Cursor):
+        count = cursor.one('<i')
+        for _ in range(count):
+            cursor.text()
+            cursor.text()
+            cursor.skip(self.header.bone_size + 1 + 2 + 1 + 4 * 14 + 1)
+        return count
+
+    @property
+    def rigid_body_count(self) -> int:
+        return self._section('rigid_bodies')
+
+    def _parse_joints(self, cursor: _Cursor):
+        count = cursor.one('<i')
+        for _ in range(count):
+            cursor.text()
+            cursor.text()
+            cursor.skip(1 + 2 * self.header.rigid_body_size + 4 * 24)
+        return count
+
+    @property
+    def joint_count(self) -> int:
+        return self._section('joints')
+
+
+def _scan_records(data: np.ndarray, start: int, count: int, type_at: int,
+                  sizes: Dict[int, int], streak: int = 32) -> Tuple[np.ndarray, np.ndarray]:
+    """Offsets and deform types of ``count`` variable-size vertex records.
+
+    Short runs are stepped one record at a time; once a run reaches ``streak``
+    records it is extended by vectorized look-ahead with a doubling window.
+    """
+    view = memoryview(data)
+    limit = len(data)
+    runs = []   # (first offset, record size, type, length)
+    i = 0
+    pos = start
+    while i < count:
+        if pos + type_at >= limit:
+            raise PMXFormatError(f"vertex {i} runs past the end of the file")
+        t = view[pos + type_at]
+        size = sizes.get(t)
+        if size is None:
+            raise PMXFormatError(f"vertex {i}: unknown deform type {t}")
+        run, nxt = 1, pos + size
+        while (run < streak and i + run < count and nxt + type_at < limit
+               and view[nxt + type_at] == t):
+            run += 1
+            nxt += size
+        look = streak
+        while run >= streak:
+            k = min(look, count - i - run)
+            if k <= 0:
+                break
+            candidates = nxt + size * np.arange(k, dtype=np.int64)
+            candidates = candidates[candidates + type_at < limit]
+            same = data[candidates + type_at] == t
+            step = len(same) if same.all() else int(np.argmin(same))
+            run += step
+            nxt += size * step
+            if step < k:
+                break
+            look *= 2
+        runs.append((pos, size, t, run))
+        i += run
+        pos = nxt
+    if pos > limit:
+        raise PMXFormatError("vertex section runs past the end of the file")
+
+    if not runs:
+        return np.zeros(0, np.int64), np.zeros(0, np.uint8)
+    first, size, kind, length = (np.array(col, dtype=np.int64) for col in zip(*runs))
+    run_start = np.repeat(np.cumsum(length) - length, length)
+    offsets = np.repeat(first, length) + np.repeat(size, length) * (np.arange(count) - run_start)
+    return offsets, np.repeat(kind, length).astype(np.uint8)
+
+
+def _gather(data: np.ndarray, offsets: np.ndarray, dtype: np.dtype,
+            chunk: int = 65536) -> np.ndarray:
+    """Copy records of ``dtype`` found at ``offsets`` into a packed array."""
+    width = dtype.itemsize
+    out = np.empty(len(offsets), dtype=dtype)
+    raw = out.view(np.uint8).reshape(-1, width)
+    steps = np.arange(width, dtype=np.int64)
+    for start in range(0, len(offsets), chunk):
+        part = offsets[start:start + chunk]
+        raw[start:start + len(part)] = data[part[:, None] + steps]
+    return out
+
+
+def read_pmx(path: str) -> PMXReader:
+    """Open a PMX file and parse every section (vertex arrays stay lazy)."""
+    return PMXReader(path).parse_all()
+
+
+# ─── Validation ──────────────────────────────────────────────────────────────
+
+WEIGHT_TOLERANCE = 1e-3
+MAX_LISTED = 5   # sample indices quoted per finding
+
+
+@dataclass
+class ValidationReport:
+    """Findings of ``validate``; errors break MMD, warnings are wasteful or suspicious."""
+    path: str = ""
+    vertex_count: int = 0
+    face_count: int = 0
+    bone_count: int = 0
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def summary(self) -> str:
+        lines = [f"{self.path}: {self.vertex_count} vertices, {self.face_count} faces, "
+                 f"{self.bone_count} bones ({self.elapsed:.2f}s)"]
+        lines += [f"  ❌ {e}" for e in self.errors]
+        lines += [f"  ⚠️ {w}" for w in self.warnings]
+        if self.ok and not self.warnings:
+            lines.append("  ✅ no problems found")
+        return "\n".join(lines)
+
+
+def _sample(mask: np.ndarray) -> str:
+    hits = np.flatnonzero(mask)
+    listed = ", ".join(str(i) for i in hits[:MAX_LISTED].tolist())
+    return f"{len(hits)} (e.g. {listed})"
+
+
+def _check_vertices(pmx: PMXReader, bone_count: int, report: ValidationReport) -> None:
+    v = pmx.vertices
+    types, bones, weights = v.weight_types, v.bone_indices, v.bone_weights
+    used = bones >= 0
+    bad = (bones >= bone_count).any(axis=1) | (used.sum(axis=1) == 0)
+    if bad.any():
+        report.errors.append(f"vertices with bone index out of range: {_sample(bad)}")
+    if not np.isfinite(v.positions).all():
+        report.errors.append(f"non-finite vertex positions: "
+                             f"{_sample(~np.isfinite(v.positions).all(axis=1))}")
+
+    four = (types == BDEF4) | (types == QDEF)
+    off = four & (np.abs(weights.sum(axis=1) - 1.0) > WEIGHT_TOLERANCE)
+    if off.any():
+        report.errors.append(f"BDEF4 weights not summing to 1: {_sample(off)}")
+    two = (types == BDEF2) | (types == SDEF)
+    out = two & ((weights[:, 0] < 0.0) | (weights[:, 0] > 1.0))
+    if out.any():
+        report.errors.append(f"BDEF2 weight outside [0, 1]: {_sample(out)}")
+    negative = four & (weights < 0.0).any(axis=1)
+    if negative.any():
+        report.errors.append(f"negative BDEF4 weights: {_sample(negative)}")
+
+    # Influence count vs the declared type
+    live = (weights > WEIGHT_TOLERANCE) & used
+    influences = live.sum(axis=1)
+    oversized = (four & (influences <= 2)) | ((types == BDEF2) & (influences <= 1))
+    if oversized.any():
+        report.warnings.append(f"vertices whose type is larger than their influences: "
+                               f"{_sample(oversized)}")
+    ordered = np.sort(np.where(live, bones, -1 - np.arange(4)), axis=1)
+    duplicate = (np.diff(ordered, axis=1) == 0).any(axis=1)
+    if duplicate.any():
+        report.warnings.append(f"vertices listing the same bone twice: {_sample(duplicate)}")
+
+
+def _check_bones(bones: List[PMXBone], report: ValidationReport) -> None:
+    n = len(bones)
+
+    def bad(i):
+        return not -1 <= i < n
+
+    for i, bone in enumerate(bones):
+        refs = [('parent', bone.parent), ('tail', bone.tail_bone),
+                ('inherit parent', bone.inherit_parent)]
+        if bone.ik is not None:
+            refs.append(('IK target', bone.ik.target))
+            refs += [('IK link', link.bone) for link in bone.ik.links]
+        for what, ref in refs:
+            if bad(ref):
+                report.errors.append(f"bone {i} '{bone.name}': {what} {ref} out of range")
+
+    # Parent, 付与 and IK dependencies against MMD's (layer, index) evaluation order
+    report.warnings += order_violations(bones)
+
+    # Cycles: walk each chain at most n steps
+    parents = np.array([b.parent if 0 <= b.parent < n else -1 for b in bones], dtype=np.int64)
+    cursor = parents.copy()
+    for _ in range(n):
+        live = cursor >= 0
+        if not live.any():
+            break
+        cursor[live] = parents[cursor[live]]
+    if (cursor >= 0).any():
+        report.errors.append(f"bones in a parent cycle: {_sample(cursor >= 0)}")
+
+
+def validate(source: Union[str, PMXReader]) -> ValidationReport:
+    """Check the structure of a PMX file (a path or an open ``PMXReader``).
+
+    Index bounds (faces, materials, textures, bones, IK, morphs, frames),
+    weight sums and ranges, deform type vs number of influences, and bone
+    evaluation order (``bone_order.order_violations``). Everything is vectorized over the vertex and index arrays,
+    so files of hundreds of MB validate in seconds.
+    """
+    started = time.perf_counter()
+    pmx = PMXReader(source) if isinstance(source, str) else source
+    report = ValidationReport(path=pmx.path)
+    try:
+        try:
+            pmx.parse_all()
+        except PMXFormatError as e:
+            report.errors.append(f"unreadable: {e}")
+            return report
+        n, bones = pmx.vertex_count, pmx.bones
+        indices = pmx.indices
+        report.vertex_count, report.face_count = n, len(indices) // 3
+        report.bone_count = len(bones)
+
+        if len(indices) % 3:
+            report.errors.append(f"index count {len(indices)} is not a multiple of 3")
+        if len(indices) and int(indices.max()) >= n:
+            report.errors.append(f"face indices out of range: {_sample(indices >= n)}")
+        if len(indices) >= 3:
+            tris = indices[:len(indices) - len(indices) % 3].reshape(-1, 3)
+            degenerate = ((tris[:, 0] == tris[:, 1]) | (tris[:, 1] == tris[:, 2])
+                          | (tris[:, 0] == tris[:, 2]))
+            if degenerate.any():
+                report.warnings.append(f"degenerate triangles: {_sample(degenerate)}")
+
+        textures = len(pmx.textures)
+        total = 0
+        for i, mat in enumerate(pmx.materials):
+            total += mat.index_count
+            if mat.index_count % 3:
+                report.errors.append(f"material {i} '{mat.name}': index count "
+                                     f"{mat.index_count} is not a multiple of 3")
+            refs = [mat.texture, mat.sphere_texture] + ([] if mat.shared_toon else [mat.toon])
+            if any(not -1 <= t < textures for t in refs):
+                report.errors.append(f"material {i} '{mat.name}': texture index out of range")
+        if total != len(indices):
+            report.errors.append(f"material index counts add up to {total}, "
+                                 f"the index buffer has {len(indices)}")
+
+        _check_bones(bones, report)
+        if n:
+            _check_vertices(pmx, len(bones), report)
+
+        morphs = pmx.morphs
+        for i, morph in enumerate(morphs):
+            if morph.kind == MORPH_VERTEX and len(morph.indices) and (
+                    int(morph.indices.max()) >= n or int(morph.indices.min()) < 0):
+                report.errors.append(f"morph {i} '{morph.name}': vertex index out of range")
+        for frame in pmx.frames:
+            for kind, index in frame.elements:
+                limit = len(morphs) if kind else len(bones)
+                if not 0 <= index < limit:
+                    report.errors.append(f"display frame '{frame.name}': "
+                                         f"{'morph' if kind else 'bone'} {index} out of range")
+        end = pmx.sections['joints'][0] + pmx.sections['joints'][1]
+        if end != len(pmx.data):
+            report.warnings.append(f"{len(pmx.data) - end} trailing bytes after the last section")
+    finally:
+        report.elapsed = time.perf_counter() - started
+        if isinstance(source, str):
+            pmx.close()
+    return report
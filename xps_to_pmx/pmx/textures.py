@@ -0,0 +1,250 @@
+"""
+Collect a model's textures next to the exported PMX, deduplicated by content.
+贴图收集：按文件内容哈希去重，线程池并发哈希与复制，重复导出时跳过未变化的文件。
+
+XPS packs often reference one image through several paths, or ship the same
+image under different names. Sources are hashed in a thread pool (hashlib
+releases the GIL on large reads), identical contents become one file in
+``<output>/<subdir>/``, and the PMX texture table is rewritten to those
+relative paths. Copies (and conversions of formats MMD cannot read) also run
+in the pool.
+
+A manifest in the texture folder remembers the size, mtime and digest of
+every source and every written file, so a re-export only hashes files that
+changed and skips copies whose destination already has the right content.
+
+This module does not import bpy.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # conversion is optional; such textures are copied as they are
+    Image = None
+
+DEFAULT_SUBDIR = "tex"
+MANIFEST_NAME = ".texture_manifest.json"
+HASH_CHUNK = 1 << 20
+
+# Formats MMD cannot load, converted to PNG when Pillow is available
+CONVERT_TO_PNG = frozenset({'.tif', '.tiff', '.webp', '.psd'})
+
+
+@dataclass
+class TextureReport:
+    """Result of ``collect_textures``."""
+    sources: int = 0
+    unique: int = 0
+    copied: int = 0
+    converted: int = 0
+    skipped: int = 0               # destination already had the same content
+    missing: int = 0
+    bytes_written: int = 0
+    warnings: List[str] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        return (f"引用 {self.sources}, 去重后 {self.unique}, 复制 {self.copied}, "
+                f"转换 {self.converted}, 未变化跳过 {self.skipped}, 缺失 {self.missing}, "
+                f"{self.bytes_written / 1048576:.1f} MB, 耗时 {self.elapsed:.2f} s")
+
+
+def file_digest(path: str) -> str:
+    """Content hash of a file (BLAKE2b, 128 bit)."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _stat_key(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class _Manifest:
+    """(size, mtime) -> digest memo for sources and written files."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.sources: Dict[str, list] = {}
+        self.files: Dict[str, list] = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.sources = data.get('sources', {})
+            self.files = data.get('files', {})
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def lookup(table: Dict[str, list], key: str, stat: Optional[Tuple[int, int]]) -> Optional[str]:
+        entry = table.get(key)
+        if stat is None or not entry or tuple(entry[:2]) != stat:
+            return None
+        return entry[2]
+
+    def save(self) -> None:
+        data = {'sources': self.sources, 'files': self.files}
+        temp = self.path + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(temp, self.path)
+
+
+def _digest_cached(path: str, table: Dict[str, list], key: str) -> Optional[str]:
+    stat = _stat_key(path)
+    if stat is None:
+        return None
+    known = _Manifest.lookup(table, key, stat)
+    if known is not None:
+        return known
+    digest = file_digest(path)
+    table[key] = [stat[0], stat[1], digest]
+    return digest
+
+
+def _destination_names(groups: Dict[str, List[str]]) -> Dict[str, str]:
+    """Digest -> file name; the first source's name, suffixed when names clash."""
+    names: Dict[str, str] = {}
+    taken = set()
+    for digest, paths in groups.items():
+        stem, ext = os.path.splitext(os.path.basename(paths[0]))
+        if ext.lower() in CONVERT_TO_PNG and Image is not None:
+            ext = '.png'
+        name = stem + ext
+        if name.lower() in taken:
+            name = f"{stem}_{digest[:8]}{ext}"
+        taken.add(name.lower())
+        names[digest] = name
+    return names
+
+
+def _converts(source: str, name: str) -> bool:
+    return os.path.splitext(source)[1].lower() != os.path.splitext(name)[1].lower()
+
+
+def _write(source: str, target: str) -> Tuple[bool, int]:
+    """Copy or convert ``source`` to ``target`` atomically; returns (converted, bytes)."""
+    temp = target + '.tmp'
+    converted = _converts(source, target)
+    try:
+        if converted:
+            with Image.open(source) as image:
+                image.save(temp, format='PNG')
+        else:
+            shutil.copyfile(source, temp)
+        os.replace(temp, target)
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+    return converted, os.path.getsize(target)
+
+
+def collect_textures(paths: List[str], output_dir: str, subdir: str = DEFAULT_SUBDIR,
+                     workers: Optional[int] = None) -> Tuple[List[str], List[int], TextureReport]:
+    """Copy textures next to the PMX, one file per distinct content.
+
+    Args:
+        paths: Absolute source paths (the model's texture table)
+        output_dir: Folder of the PMX file
+        subdir: Texture folder inside ``output_dir``
+        workers: Thread count (default: ThreadPoolExecutor's)
+
+    Returns:
+        (table, remap, report): ``table`` is the new texture table (paths
+        relative to ``output_dir``), ``remap[i]`` is the new index of
+        ``paths[i]``
+    """
+    started = time.perf_counter()
+    report = TextureReport(sources=len(paths))
+    folder = os.path.join(output_dir, subdir)
+    os.makedirs(folder, exist_ok=True)
+    manifest = _Manifest(os.path.join(folder, MANIFEST_NAME))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = list(pool.map(
+            lambda p: _digest_cached(p, manifest.sources, os.path.normcase(os.path.abspath(p))),
+            paths))
+
+        groups: Dict[str, List[str]] = {}
+        for path, digest in zip(paths, digests):
+            if digest is None:
+                report.missing += 1
+                report.warnings.append(f"贴图不存在: {path}")
+            else:
+                groups.setdefault(digest, []).append(path)
+        names = _destination_names(groups)
+        report.unique = len(groups)
+
+        def target_current(digest: str) -> bool:
+            target = os.path.join(folder, names[digest])
+            if not os.path.exists(target):
+                return False
+            if _converts(groups[digest][0], names[digest]):
+                # Converted output has other bytes: trust the manifest entry only
+                return _Manifest.lookup(manifest.files, names[digest], _stat_key(target)) == digest
+            return _digest_cached(target, manifest.files, names[digest]) == digest
+
+        current = dict(zip(groups, pool.map(target_current, groups)))
+        pending = [digest for digest in groups if not current[digest]]
+        report.skipped = len(groups) - len(pending)
+
+        def write(digest: str):
+            target = os.path.join(folder, names[digest])
+            try:
+                result = _write(groups[digest][0], target)
+            except (OSError, ValueError) as e:
+                return digest, None, str(e)
+            return digest, result, None
+
+        for digest, result, error in pool.map(write, pending):
+            if error is not None:
+                report.warnings.append(f"贴图复制失败: {groups[digest][0]} ({error})")
+                continue
+            converted, size = result
+            report.converted += converted
+            report.copied += not converted
+            report.bytes_written += size
+            stat = _stat_key(os.path.join(folder, names[digest]))
+            manifest.files[names[digest]] = [stat[0], stat[1], digest]
+
+    if Image is None and any(os.path.splitext(p)[1].lower() in CONVERT_TO_PNG for p in paths):
+        report.warnings.append("未安装 Pillow，TIFF/WebP/PSD 贴图按原格式复制，MMD 可能无法读取")
+
+    order = {digest: i for i, digest in enumerate(groups)}
+    table = [os.path.join(subdir, names[digest]) for digest in groups]
+    remap = []
+    for path, digest in zip(paths, digests):
+        if digest is None:  # keep a reference to the missing file
+            digest = path
+            if digest not in order:
+                order[digest] = len(table)
+                table.append(relative_path(path, output_dir))
+        remap.append(order[digest])
+    try:
+        manifest.save()
+    except OSError as e:
+        report.warnings.append(f"无法写入贴图清单: {e}")
+    report.elapsed = time.perf_counter() - started
+    return table, remap, report
+
+
+def relative_path(path: str, output_dir: str) -> str:
+    """``path`` relative to ``output_dir`` (unchanged across Windows drives)."""
+    try:
+        return os.path.relpath(path, output_dir) if output_dir else path
+    except ValueError:  # different drive on Windows
+        return path
@@ -0,0 +1,210 @@
+"""
+Post-transform vertex cache optimization for exported models.
+顶点缓存优化：按材质重排三角形（Tipsify），再按首次使用重排顶点，并报告前后 ACMR。
+
+Triangles are reordered inside each material's index run (materials must
+stay contiguous) with Tipsify (Sander, Nehab & Barczak 2007): fan around a
+vertex that is still in the simulated cache, choose the next fanning vertex
+among the ones just touched, and fall back to a dead-end stack when the fan
+runs dry. It runs in linear time and, unlike Forsyth's algorithm, needs no
+per-vertex score updates, which keeps the pure-Python loop cheap enough to run
+on every export.
+
+Vertices are then renumbered in order of first use so the vertex fetch walks
+the buffer forwards. Quality is reported as ACMR (average cache miss ratio:
+vertex shader invocations per triangle) for a FIFO cache of ``CACHE_SIZE``.
+
+Tipsify and the two ACMR passes are pure-Python loops (seconds on a
+500k-triangle model). ``optimize_model`` therefore keeps recent results,
+keyed on a digest of the index buffer and the material runs, up to
+``ORDER_CACHE_CAP`` bytes. A
+re-export whose meshes did not change gets the triangle order back without
+running them again. Vertices are renumbered every time because that step is
+vectorized.
+
+This module does not import bpy.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from .incremental import ReuseCache, content_digest
+from .model import PMXModel
+
+# FIFO entries assumed for both the optimization and the ACMR figures
+CACHE_SIZE = 32
+
+# Bytes of optimized index buffers kept for re-exports
+ORDER_CACHE_CAP = 16 * 1024 * 1024
+
+# digest of (indices, runs, cache size) -> (optimized indices, ACMR before, ACMR after)
+_ORDERS = ReuseCache(ORDER_CACHE_CAP)
+
+
+@dataclass
+class CacheReport:
+    """Result of ``optimize_model``."""
+    triangles: int = 0
+    acmr_before: float = 0.0
+    acmr_after: float = 0.0
+    cache_size: int = CACHE_SIZE
+    reused: bool = False           # triangle order taken from an earlier export
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        source = ", 复用" if self.reused else ""
+        return (f"ACMR {self.acmr_before:.3f} → {self.acmr_after:.3f} "
+                f"(FIFO {self.cache_size}, {self.triangles} 面{source}, {self.elapsed:.2f} s)")
+
+
+def acmr(indices: np.ndarray, cache_size: int = CACHE_SIZE) -> float:
+    """Average cache miss ratio of a triangle list under a FIFO vertex cache."""
+    if len(indices) < 3:
+        return 0.0
+    flat = np.asarray(indices).tolist()
+    # A vertex is cached while fewer than ``cache_size`` misses happened since it was loaded
+    loaded = [-cache_size - 1] * (max(flat) + 1)
+    misses = 0
+    for v in flat:
+        if misses - loaded[v] > cache_size:
+            loaded[v] = misses
+            misses += 1
+    return misses / (len(flat) // 3)
+
+
+def tipsify(triangles: np.ndarray, vertex_count: int, cache_size: int = CACHE_SIZE) -> np.ndarray:
+    """Return a cache-friendly order of ``triangles`` ((T, 3) indices < ``vertex_count``)."""
+    count = len(triangles)
+    if count == 0:
+        return np.zeros(0, dtype=np.int64)
+    flat = np.ascontiguousarray(triangles, dtype=np.int64).ravel()
+
+    # Vertex -> triangles adjacency in CSR form
+    live_np = np.bincount(flat, minlength=vertex_count)
+    offsets = np.concatenate(([0], np.cumsum(live_np))).tolist()
+    adjacency = (np.argsort(flat, kind='stable') // 3).tolist()
+    live = live_np.tolist()
+    corners = flat.tolist()
+
+    stamp = [0] * vertex_count
+    emitted = bytearray(count)
+    order: List[int] = []
+    dead_end: List[int] = []
+    clock = cache_size + 1
+    cursor = 0
+    fan = int(np.argmax(live_np > 0))
+
+    emit, push = order.append, dead_end.append
+    while fan >= 0:
+        candidates = []
+        touch = candidates.append
+        for tri in adjacency[offsets[fan]:offsets[fan + 1]]:
+            if emitted[tri]:
+                continue
+            emitted[tri] = 1
+            emit(tri)
+            for v in corners[3 * tri:3 * tri + 3]:
+                push(v)
+                touch(v)
+                live[v] -= 1
+                if clock - stamp[v] > cache_size:
+                    stamp[v] = clock
+                    clock += 1
+
+        # Next fan: the touched vertex that stays in cache the longest
+        fan, best = -1, -1
+        for v in candidates:
+            if live[v] > 0:
+                age = clock - stamp[v]
+                priority = age if age + 2 * live[v] <= cache_size else 0
+                if priority > best:
+                    fan, best = v, priority
+        if fan < 0:
+            while dead_end:
+                v = dead_end.pop()
+                if live[v] > 0:
+                    fan = v
+                    break
+        if fan < 0:
+            while cursor < vertex_count and live[cursor] == 0:
+                cursor += 1
+            fan = cursor if cursor < vertex_count else -1
+    return np.array(order, dtype=np.int64)
+
+
+def optimize_triangles(indices: np.ndarray, runs: List[int],
+                       cache_size: int = CACHE_SIZE) -> np.ndarray:
+    """Tipsify each run of ``indices`` (index counts per material) independently."""
+    result = np.empty_like(indices)
+    start = 0
+    for run in runs:
+        part = indices[start:start + run]
+        if len(part) >= 6:
+            vertices, local = np.unique(part, return_inverse=True)
+            triangles = local.reshape(-1, 3)
+            order = tipsify(triangles, len(vertices), cache_size)
+            part = vertices[triangles[order]].ravel()
+        result[start:start + run] = part
+        start += run
+    result[start:] = indices[start:]
+    return result
+
+
+def first_use_order(indices: np.ndarray, vertex_count: int) -> np.ndarray:
+    """Old vertex index for each new slot: used vertices by first use, then the rest."""
+    first = np.full(vertex_count, len(indices), dtype=np.int64)
+    used, position = np.unique(indices, return_index=True)
+    first[used] = position
+    return np.argsort(first, kind='stable')
+
+
+def reorder_vertices(model: PMXModel) -> np.ndarray:
+    """Renumber the model's vertices in order of first use (in place).
+
+    Returns:
+        (N,) array mapping old vertex index -> new vertex index
+    """
+    n = model.vertex_count
+    order = first_use_order(model.indices, n)
+    remap = np.empty(n, dtype=np.int64)
+    remap[order] = np.arange(n)
+    for attr in ('positions', 'normals', 'uvs', 'weight_types', 'bone_indices',
+                 'bone_weights', 'edge_scale'):
+        setattr(model, attr, getattr(model, attr)[order])
+    model.indices = remap[model.indices]
+    for morph in model.morphs:
+        morph.indices = remap[morph.indices].astype(np.int32)
+    return remap
+
+
+def optimize_model(model: PMXModel, cache_size: int = CACHE_SIZE,
+                   reuse: bool = True) -> CacheReport:
+    """Reorder triangles per material and vertices by first use (in place).
+
+    With ``reuse``, an index buffer optimized before (same indices, material
+    runs and cache size) gets its earlier result without running Tipsify.
+    """
+    started = time.perf_counter()
+    report = CacheReport(triangles=model.face_count, cache_size=cache_size)
+    runs = [material.index_count for material in model.materials]
+    key = content_digest((cache_size, runs, model.indices)) if reuse else None
+
+    def optimize():
+        # ACMR is invariant under the vertex renumbering, so both figures are computed here
+        before = acmr(model.indices, cache_size)
+        indices = optimize_triangles(model.indices, runs, cache_size)
+        return indices, before, acmr(indices, cache_size)
+
+    (model.indices, report.acmr_before, report.acmr_after), report.reused = \
+        _ORDERS.get(key, optimize)
+    reorder_vertices(model)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def clear_cache() -> None:
+    """Forget the optimized index buffers kept for re-exports."""
+    _ORDERS.clear()
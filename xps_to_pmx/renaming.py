@@ -0,0 +1,227 @@
+"""
+Bulk bone renaming with collision-safe two-phase naming.
+批量重命名骨骼：先改为唯一临时名，再改为目标名，交换 / 链式映射不会产生 ``.001``。
+
+Renaming items one by one breaks on swaps (A→B, B→A) and chains (A→B, B→C):
+the second name is still taken when the first rename happens, so Blender
+appends ``.001``. Here every rename first moves its item to a unique temporary
+name, and only then assigns the final names, so the final names are all free.
+
+Bones are renamed through ``Bone.name`` in Object Mode; Blender propagates
+each rename to constraints, drivers and the vertex groups of meshes that use
+the armature. Vertex group names are then reconciled only on the meshes the
+armature deforms (``skinning.deformed_meshes``): each group is compared with
+the name it had before, mapped through the rename table, so the result is the
+same whether or not Blender already renamed it.
+
+The planning helpers are pure Python; ``bulk_rename`` needs Blender.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import bpy
+except ImportError:  # planning helpers stay usable outside Blender
+    bpy = None
+
+# Blender ID / bone / vertex group names are limited to 63 bytes
+MAX_NAME_BYTES = 63
+
+_TEMP_PREFIX = "~xpspmx_tmp_"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Planning (pure)
+# ─────────────────────────────────────────────────────────────────────────────
+
+@dataclass
+class RenamePlan:
+    """Renames that can be applied without collisions.
+
+    Attributes:
+        renames: old name -> new name, in the order of the input map
+        skipped: old name -> reason the rename was not planned
+    """
+    renames: Dict[str, str] = field(default_factory=dict)
+    skipped: Dict[str, str] = field(default_factory=dict)
+
+
+def plan_renames(names: Iterable[str], rename_map: Dict[str, str]) -> RenamePlan:
+    """Select the renames of ``rename_map`` that can be applied to ``names``.
+
+    A rename is skipped when its source does not exist, its target is empty or
+    too long, another source already claimed the same target, or the target is
+    held by an item that keeps its name. Identity renames are dropped.
+
+    Args:
+        names: Current names of the collection
+        rename_map: Requested old name -> new name
+
+    Returns:
+        RenamePlan
+    """
+    existing = set(names)
+    plan = RenamePlan()
+    claimed: Dict[str, str] = {}
+
+    for old, new in rename_map.items():
+        if old not in existing:
+            plan.skipped[old] = "not found"
+        elif not new:
+            plan.skipped[old] = "empty target name"
+        elif new == old:
+            continue
+        elif len(new.encode('utf-8')) > MAX_NAME_BYTES:
+            plan.skipped[old] = f"'{new}' is longer than {MAX_NAME_BYTES} bytes"
+        elif new in claimed:
+            plan.skipped[old] = f"'{new}' is already the target of '{claimed[new]}'"
+        else:
+            claimed[new] = old
+            plan.renames[old] = new
+
+    # A target is only free if its current owner is renamed away. Dropping a
+    # rename keeps its source name taken, which can block another target, so
+    # repeat until nothing changes.
+    changed = True
+    while changed:
+        changed = False
+        for old, new in list(plan.renames.items()):
+            if new in existing and new not in plan.renames:
+                plan.skipped[old] = f"'{new}' already exists"
+                del plan.renames[old]
+                changed = True
+    return plan
+
+
+def temp_names(count: int, taken) -> List[str]:
+    """Return ``count`` temporary names that are not in ``taken``."""
+    result = []
+    i = 0
+    while len(result) < count:
+        name = f"{_TEMP_PREFIX}{i}"
+        if name not in taken:
+            result.append(name)
+        i += 1
+    return result
+
+
+def apply_two_phase(items: Dict[str, object], renames: Dict[str, str]) -> None:
+    """Rename ``items`` (name -> object with a ``name`` attribute) in two passes.
+
+    Args:
+        items: Current name -> item, for every item of the collection
+        renames: Collision-free old name -> new name (from ``plan_renames``)
+    """
+    if not renames:
+        return
+    taken = set(items)
+    taken.update(renames.values())
+    staged = []
+    for (old, new), temp in zip(renames.items(), temp_names(len(renames), taken)):
+        item = items[old]
+        item.name = temp
+        staged.append((item, new))
+    for item, new in staged:
+        item.name = new
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Blender
+# ─────────────────────────────────────────────────────────────────────────────
+
+@dataclass
+class RenameReport:
+    """Result of ``bulk_rename``.
+
+    Attributes:
+        bones: Bone renames applied (old -> new)
+        vertex_groups: Mesh name -> vertex group renames applied (old -> new)
+        skipped: Bone old name -> reason it was not renamed
+        vertex_group_skipped: Mesh name -> {old name: reason}
+        elapsed: Seconds spent
+    """
+    bones: Dict[str, str] = field(default_factory=dict)
+    vertex_groups: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    skipped: Dict[str, str] = field(default_factory=dict)
+    vertex_group_skipped: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def vertex_group_count(self) -> int:
+        return sum(len(renames) for renames in self.vertex_groups.values())
+
+    def summary(self) -> str:
+        return (f"重命名骨骼 {len(self.bones)} 个, 顶点组 {self.vertex_group_count} 个"
+                f"（{len(self.vertex_groups)} 个网格）, 跳过 {len(self.skipped)} 个, "
+                f"耗时 {self.elapsed * 1000:.1f} ms")
+
+
+def _rename_vertex_groups(mesh_obj, before: List[str], bone_renames: Dict[str, str],
+                          report: RenameReport) -> None:
+    """Bring a mesh's vertex groups in line with the bone renames.
+
+    ``before`` holds the group names (by index) before the bones were renamed.
+    """
+    groups = list(mesh_obj.vertex_groups)
+    current = {vg.name: vg for vg in groups}
+    wanted = {}
+    for vg, old in zip(groups, before):
+        new = bone_renames.get(old, old)
+        if vg.name != new:
+            wanted[vg.name] = new
+
+    plan = plan_renames(current, wanted)
+    apply_two_phase(current, plan.renames)
+
+    applied = {
+        old: vg.name for vg, old in zip(groups, before) if vg.name != old
+    }
+    if applied:
+        report.vertex_groups[mesh_obj.name] = applied
+    if plan.skipped:
+        report.vertex_group_skipped[mesh_obj.name] = plan.skipped
+
+
+def bulk_rename(armature, rename_map: Dict[str, str],
+                meshes: Optional[List] = None) -> RenameReport:
+    """Rename bones and the matching vertex groups in one collision-safe pass.
+
+    Args:
+        armature: Armature object
+        rename_map: Bone old name -> new name
+        meshes: Meshes whose vertex groups follow the bones
+            (defaults to ``skinning.deformed_meshes(armature)``)
+
+    Returns:
+        RenameReport
+    """
+    from . import modes, skinning
+
+    start = time.perf_counter()
+    report = RenameReport()
+
+    # Bone.name is writable in Object Mode and avoids an Edit Mode round trip
+    modes.set_mode('OBJECT', armature)
+
+    bones = {bone.name: bone for bone in armature.data.bones}
+    plan = plan_renames(bones, rename_map)
+    report.skipped = plan.skipped
+
+    if meshes is None:
+        meshes = skinning.deformed_meshes(armature)
+    before = {mesh_obj.name: [vg.name for vg in mesh_obj.vertex_groups] for mesh_obj in meshes}
+
+    apply_two_phase(bones, plan.renames)
+    report.bones = dict(plan.renames)
+    if plan.renames:
+        from .mapping import snapshot
+        snapshot.invalidate(armature)
+
+    if plan.renames:
+        for mesh_obj in meshes:
+            _rename_vertex_groups(mesh_obj, before[mesh_obj.name], plan.renames, report)
+
+    report.elapsed = time.perf_counter() - start
+    return report
@@ -4,9 +4,14 @@
 在 Blender Python 控制台中运行：
 1. 导入 XPS 模型，选中骨架
 2. 运行此脚本测试自动检测和映射功能
+
+test_bone_order / test_pmx_round_trip 不需要 Blender，可在普通 Python 中运行。
 """
 
-import bpy
+try:
+    import bpy
+except ImportError:  # the bpy-free tests still run outside Blender
+    bpy = None
 from . import mapping
 
 
@@ -118,6 +123,243 @@ def test_config_serialization(config):
     return json_str
 
 
+def _build_synthetic_config(bone_count=2000, records=None):
+    """Build a synthetic configuration the size of a large auto-mapped XPS model.
+
+    Names are created at runtime (as JSON loading or Blender bone access does),
+    so every record gets its own string objects unless they are interned.
+    ``records`` supplies the record classes (default: the real data model).
+    """
+    DS = mapping.data_structures
+    records = records or DS
+    mmd_names = [f"骨{i % 120}" for i in range(bone_count)]
+    config = DS.MappingConfiguration(name="memory_benchmark")
+    for i in range(bone_count):
+        xps_name = f"bone_{i:04d}"
+        parent = f"bone_{i // 2:04d}" if i else None
+        config.bone_mappings[xps_name] = records.BoneMapping(
+            xps_name=xps_name,
+            mmd_name="".join(mmd_names[i]),
+            confidence=0.9,
+            parent_xps=parent,
+            parent_mmd="".join(mmd_names[i // 2]) if i else None,
+            bone_type="".join(DS.BoneType.ARM.value),
+            source_info="".join("auto_detect"),
+        )
+        config.weight_rules.append(records.WeightMappingRule(
+            source_bone=xps_name,
+            target_bone="".join(mmd_names[i]),
+            falloff_type="".join(DS.FalloffType.LINEAR.value),
+            order=i,
+        ))
+        if i % 4 == 0:
+            config.unmapped_bones.append(records.UnmappedBone(
+                xps_name=xps_name,
+                parent_xps=parent,
+                suggestions=["".join(mmd_names[i // 2])],
+            ))
+    return config
+
+
+def _baseline_records():
+    """The record classes as plain dataclasses: per-instance __dict__, no interning.
+
+    Same fields and defaults as the data model, without ``__slots__`` and
+    without the interning ``__post_init__`` (the data model before slotting).
+    """
+    import dataclasses
+    from types import SimpleNamespace
+
+    def plain(cls):
+        spec = []
+        for f in dataclasses.fields(cls):
+            if f.default_factory is not dataclasses.MISSING:
+                spec.append((f.name, f.type, dataclasses.field(default_factory=f.default_factory)))
+            elif f.default is not dataclasses.MISSING:
+                spec.append((f.name, f.type, dataclasses.field(default=f.default)))
+            else:
+                spec.append((f.name, f.type))
+        return dataclasses.make_dataclass(cls.__name__, spec)
+
+    DS = mapping.data_structures
+    return SimpleNamespace(BoneMapping=plain(DS.BoneMapping),
+                           WeightMappingRule=plain(DS.WeightMappingRule),
+                           UnmappedBone=plain(DS.UnmappedBone))
+
+
+def _measure(build):
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def test_config_memory(bone_count=2000):
+    """Benchmark per-config memory held in the mapping_ui session store.
+
+    Both sides build the whole configuration through ``_build_synthetic_config``
+    and store it; only the record classes differ.
+    """
+    if bpy is not None:
+        from . import mapping_ui
+        store = mapping_ui._GLOBAL_CONFIG['sessions']
+    else:  # the same store class mapping_ui uses
+        store = mapping.session.SessionStore()
+
+    print("\n" + "="*60)
+    print(f"TEST 5: 配置内存占用（{bone_count} 骨骼）")
+    print("="*60)
+
+    benchmark_key = "memory_benchmark"
+    baseline = _baseline_records()
+
+    def store_config(records=None):
+        config = _build_synthetic_config(bone_count, records)
+        store.put(benchmark_key, "", config)
+        return config
+
+    _, legacy_bytes = _measure(lambda: store_config(baseline))
+    store.discard(benchmark_key)
+    _, slotted_bytes = _measure(store_config)
+    store.discard(benchmark_key)
+
+    print(f"  之前（dict 实例 + 重复字符串）：{legacy_bytes / 1024:.1f} KiB")
+    print(f"  之后（__slots__ + 字符串驻留）：{slotted_bytes / 1024:.1f} KiB")
+    ok = 0 < slotted_bytes < legacy_bytes
+    if ok:
+        print(f"✓ 内存减少 {(1 - slotted_bytes / legacy_bytes) * 100:.0f}%")
+    else:
+        print("❌ 内存没有减少")
+    return ok
+
+
+def _build_leg_bones():
+    """A left leg in the order a naive exporter might write it.
+
+    足ＩＫ comes before its chain and 足D (付与 from 足) comes before 足ＩＫ.
+    """
+    from .pmx.model import PMXBone, PMXIK, PMXIKLink
+
+    bones = [
+        PMXBone(name="全ての親"),
+        PMXBone(name="左足ＩＫ", parent=0),
+        PMXBone(name="左足D", parent=4, inherit_parent=5, inherit_rotation=True),
+        PMXBone(name="左つま先ＩＫ", parent=1),
+        PMXBone(name="下半身", parent=0),
+        PMXBone(name="左足", parent=4),
+        PMXBone(name="左ひざ", parent=5),
+        PMXBone(name="左足首", parent=6),
+        PMXBone(name="左つま先", parent=7),
+    ]
+    bones[1].ik = PMXIK(target=7, links=[PMXIKLink(bone=6), PMXIKLink(bone=5)])
+    bones[3].ik = PMXIK(target=8, links=[PMXIKLink(bone=7)])
+    return bones
+
+
+def test_bone_order():
+    """Check the PMX bone evaluation order (no Blender data needed)."""
+    from .pmx import bone_order
+    from .pmx.model import PMXModel
+
+    print("\n" + "="*60)
+    print("TEST 6: PMX 骨骼顺序")
+    print("="*60)
+
+    model = PMXModel(name="bone_order")
+    model.bones = _build_leg_bones()
+    names = [bone.name for bone in model.bones]
+    before = bone_order.order_violations(model.bones)
+    print(f"  排序前违反依赖：{len(before)}")
+
+    report = bone_order.sort_model_bones(model)
+    after = bone_order.order_violations(model.bones)
+    order = [bone.name for bone in model.bones]
+    print(f"  {report.summary()}")
+    print(f"  新顺序：{' → '.join(order)}")
+
+    index = {name: i for i, name in enumerate(order)}
+    expected = [("全ての親", "左足"), ("左足首", "左足ＩＫ"), ("左足ＩＫ", "左足D"),
+                ("左つま先", "左つま先ＩＫ")]
+    ok = not after and before and order[0] == names[0] and \
+        all(index[a] < index[b] for a, b in expected)
+    again, _, _ = bone_order.sort_bones(model.bones)
+    ok = ok and again == list(range(len(order)))
+    print("✓ 骨骼顺序正确" if ok else f"❌ 骨骼顺序错误：{after}")
+    return ok
+
+
+def _build_mixed_weight_model():
+    """Three bones and one quad whose vertices use BDEF1, BDEF2 and BDEF4."""
+    import numpy as np
+    from .pmx.model import BDEF1, BDEF2, BDEF4, PMXBone, PMXMaterial, PMXModel, PMXMorph
+
+    model = PMXModel(name="round_trip", name_en="round_trip")
+    model.bones = [PMXBone(name="全ての親"), PMXBone(name="センター", parent=0),
+                   PMXBone(name="上半身", parent=1, position=(0.0, 10.0, 0.0))]
+    model.positions = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]], np.float32)
+    model.normals = np.tile(np.array([0, 0, -1], np.float32), (4, 1))
+    model.uvs = np.array([[0, 1], [1, 1], [1, 0], [0, 0]], np.float32)
+    model.weight_types = np.array([BDEF1, BDEF2, BDEF4, BDEF2], np.uint8)
+    model.bone_indices = np.array([[1, -1, -1, -1], [1, 2, -1, -1], [0, 1, 2, -1],
+                                   [2, 0, -1, -1]], np.int32)
+    model.bone_weights = np.array([[1, 0, 0, 0], [0.75, 0.25, 0, 0], [0.5, 0.3, 0.2, 0],
+                                   [0.6, 0.4, 0, 0]], np.float32)
+    model.edge_scale = np.ones(4, np.float32)
+    model.indices = np.array([0, 2, 1, 0, 3, 2], np.int64)
+    model.materials = [PMXMaterial(name="材質1", index_count=6)]
+    model.morphs = [PMXMorph(name="あ", indices=np.array([2, 3], np.int32),
+                             offsets=np.array([[0, 0.1, 0], [0, 0.2, 0]], np.float32))]
+    return model
+
+
+def test_pmx_round_trip():
+    """Write a mixed BDEF1/2/4 model, read it back and validate it (no Blender data needed)."""
+    import os
+    import tempfile
+
+    import numpy as np
+    from .pmx import reader, writer
+
+    print("\n" + "="*60)
+    print("TEST 7: PMX 写入 → 读取 → 验证")
+    print("="*60)
+
+    model = _build_mixed_weight_model()
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "round_trip.pmx")
+        written = writer.write_pmx(model, path)
+        with reader.read_pmx(path) as pmx:
+            report = reader.validate(pmx)
+            vertices = pmx.vertices
+            used = model.bone_indices >= 0
+            problems = [name for name, same in [
+                ("positions", np.allclose(vertices.positions, model.positions)),
+                ("uvs", np.allclose(vertices.uvs, model.uvs)),
+                ("weight types", np.array_equal(vertices.weight_types, model.weight_types)),
+                ("bone indices", np.array_equal(vertices.bone_indices[used],
+                                                model.bone_indices[used])),
+                ("bone weights", np.allclose(vertices.bone_weights[used],
+                                             model.bone_weights[used], atol=1e-6)),
+                ("faces", np.array_equal(pmx.indices, model.indices)),
+                ("bones", [b.name for b in pmx.bones] == [b.name for b in model.bones]),
+                ("morphs", len(pmx.morphs) == 1
+                 and np.array_equal(pmx.morphs[0].indices, model.morphs[0].indices)),
+            ] if not same]
+
+    print(f"  写入 {written.size} 字节")
+    print("  " + report.summary().replace("\n", "\n  "))
+    ok = report.ok and not report.warnings and not problems
+    print("✓ 往返一致且验证通过" if ok else f"❌ 往返不一致：{problems or report.errors}")
+    return ok
+
+
 def test_full_workflow():
     """Run full workflow test."""
     print("\n" + "#"*60)